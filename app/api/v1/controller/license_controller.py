@@ -1,17 +1,40 @@
-from fastapi import APIRouter, status, Depends
-from app.dto.license_request_dto import LicenseGenerateRequest, LicenseUseRequest, LicenseValidateRequest, LicenseBlockToggle, ResetLicenseAmtRequest, IncreaseLicenseUsageLimitAmtRequest, DecreaseLicenseUsageLimitAmtRequest
-from app.dto.license_response_dto import LicenseResponse
+from fastapi import APIRouter, status, Depends, HTTPException, Query
+from fastapi.responses import StreamingResponse
+from app.dto.license_request_dto import LicenseGenerateRequest, LicenseUseRequest, LicenseValidateRequest, LicenseBlockToggle, ResetLicenseAmtRequest, IncreaseLicenseUsageLimitAmtRequest, DecreaseLicenseUsageLimitAmtRequest, LicenseBatchGenerateRequest, LicenseTemplate, LicenseBulkValidateRequest, LicenseCounterSlotsRequest
+from app.dto.license_response_dto import LicenseStatsItem, LicenseStatsResponse, LicenseUsageBucket, LicenseUsageAnalyticsResponse, LicenseResponse, LicenseTokenResponse, LicenseBatchResponse, LicenseBatchItemResult, LicenseListItem, LicensePageResponse
+from app.enums.license_batch_item_status import LicenseBatchItemStatus
+from app.utils.license_key_generator import generate_raw_license_key, build_license_key_hint
+from app.core.config import settings
 from app.models.schema.license_schema import License as LicenseSchema
-from app.services.license_service import LicenseService
+from app.models.license import License
+from app.enums.license_type import LicenseType
+from app.services.license_service import LicenseService, license_lookup_flight
 from sqlalchemy.ext.asyncio import AsyncSession
-from app.core.database import get_db
+from app.core.database import get_db, get_read_db, get_read_sessionmaker, AsyncSessionLocal
+from app.core.rate_limit import license_rate_limit, rate_limit_stats
+from app.utils.license_cache import license_cache
+from app.services.license_usage_write_behind import license_usage_write_behind
+from app.services.license_sharded_usage import license_sharded_usage
+from app.services.license_expiry_sweeper import license_expiry_sweeper
+from app.services.license_token_revocation import license_token_revocations
+from app.services.license_key_filter import license_key_filter
+from app.services.license_usage_events import license_usage_events
+from app.services.license_stats import license_stats_summary
+from app.utils.license_export import LICENSE_EXPORT_COLUMNS, EXPORT_MEDIA_TYPES, encode_license_rows, gzip_chunks
+from typing import List, Optional, AsyncGenerator
+from datetime import datetime, timedelta
 import logging
+import time
 
-license_router = APIRouter(prefix="/license", tags=["License"])
+license_router = APIRouter(prefix="/license", tags=["License"], dependencies=[Depends(license_rate_limit)])
 logger = logging.getLogger(__name__)
 
-async def get_license_service(db: AsyncSession = Depends(get_db)) -> LicenseService:
-    return LicenseService(db=db)
+async def get_license_service(
+    db: AsyncSession = Depends(get_db),
+    read_db: AsyncSession = Depends(get_read_db)
+) -> LicenseService:
+    #sessions connect lazily, an unused replica session costs no connection
+    return LicenseService(db=db, read_db=read_db)
 
 @license_router.post("/register-license", status_code=status.HTTP_200_OK)
 async def generate_license(
@@ -19,7 +42,7 @@ async def generate_license(
     license_service: LicenseService = Depends(get_license_service)
 ) -> LicenseResponse:
 
-    license_hint = "X" * 4 + request.raw_key[4:-2] + "X" * 2
+    license_hint = build_license_key_hint(request.raw_key)
 
     response = LicenseResponse()
     try:
@@ -29,7 +52,7 @@ async def generate_license(
             request.expiration_date,
             request.use_limit,
             license_hint,
-            request.license_type
+            request.license_type.name
         )
 
         if result is None:
@@ -59,13 +82,141 @@ async def generate_license(
         response.errorMessage = f"An unexpected error occurred: {str(e)}"
     return response
 
+@license_router.post("/register-licenses", status_code=status.HTTP_200_OK)
+async def generate_licenses(
+    request: LicenseBatchGenerateRequest,
+    license_service: LicenseService = Depends(get_license_service)
+) -> LicenseBatchResponse:
+
+    response = LicenseBatchResponse()
+    requested_count = len(request.licenses) if request.licenses is not None else request.count
+    if requested_count > settings.LICENSE_BATCH_MAX_ITEMS:
+        response.isError = True
+        response.errorMessage = f"A batch can contain at most {settings.LICENSE_BATCH_MAX_ITEMS} licenses."
+        return response
+
+    server_generated = request.licenses is None
+    if server_generated:
+        template = request.template or LicenseTemplate()
+        license_requests = [
+            LicenseGenerateRequest(
+                rawKey=generate_raw_license_key(),
+                licenseType=template.license_type,
+                expirationDate=template.expiration_date,
+                useLimit=template.use_limit
+            )
+            for _ in range(request.count)
+        ]
+    else:
+        license_requests = request.licenses
+
+    started_at = time.perf_counter()
+    try:
+        statuses = await license_service.convert_to_hashed_license_entries(license_requests)
+    except Exception as e:
+        logger.error(f"Failed to create licenses in batch: {e}", exc_info=True)
+        response.isError = True
+        response.message = "Failed to create license keys."
+        response.errorMessage = f"An unexpected error occurred: {str(e)}"
+        return response
+    elapsed = time.perf_counter() - started_at
+
+    for index, (license_request, item_status) in enumerate(zip(license_requests, statuses)):
+        item = LicenseBatchItemResult(index=index, status=item_status)
+        if item_status == LicenseBatchItemStatus.CREATED:
+            item.licenseKeyHint = build_license_key_hint(license_request.raw_key)
+            if server_generated:
+                item.rawKey = license_request.raw_key
+            response.createdCount += 1
+        elif item_status == LicenseBatchItemStatus.DUPLICATE:
+            item.errorMessage = "Duplicate license key."
+            response.duplicateCount += 1
+        else:
+            item.errorMessage = "License creation failed. Invalid license data or server error."
+            response.failedCount += 1
+        response.results.append(item)
+
+    response.elapsedSeconds = elapsed
+    response.licensesPerSecond = response.createdCount / elapsed if elapsed > 0 else 0.0
+    response.success = response.createdCount == requested_count
+    response.isError = response.createdCount == 0 and requested_count > 0
+    response.message = f"{response.createdCount} of {requested_count} license keys generated."
+    logger.info(f"Batch license registration: {response.message} ({response.licensesPerSecond:.1f} licenses/sec)")
+    return response
+
+@license_router.post("/register-token", status_code=status.HTTP_200_OK)
+async def generate_license_token(
+    request: LicenseTemplate,
+    license_service: LicenseService = Depends(get_license_service)
+) -> LicenseTokenResponse:
+
+    response = LicenseTokenResponse()
+    try:
+        token = await license_service.issue_signed_license_token(
+            request.license_type,
+            request.expiration_date,
+            request.use_limit
+        )
+    except Exception as e:
+        logger.error(f"Failed to issue license token: {e}", exc_info=True)
+        response.isError = True
+        response.message = "Failed to issue license token."
+        response.errorMessage = f"An unexpected error occurred: {str(e)}"
+        return response
+
+    if token is None:
+        logger.warning("Failed to store the issued license token")
+        response.isError = True
+        response.errorMessage = "License token creation failed due to the server error."
+        return response
+
+    response.success = True
+    response.message = "License token successfully issued."
+    response.licenseToken = token
+    response.useLimit = request.use_limit
+    response.licenseType = request.license_type
+    return response
+
 @license_router.post("/validate-license", status_code=status.HTTP_200_OK)
 async def validate_license(
     request: LicenseValidateRequest,
     license_service: LicenseService = Depends(get_license_service)
 ) -> LicenseResponse:
-    result : LicenseSchema = await license_service.verify_license(request.license_key)
+    result : License = await license_service.verify_license(request.license_key)
+    return build_validate_response(result)
+
+@license_router.post("/validate-licenses", status_code=status.HTTP_200_OK)
+async def validate_licenses(
+    request: LicenseBulkValidateRequest,
+    stream: bool = False,
+    license_service: LicenseService = Depends(get_license_service)
+) -> List[LicenseResponse]:
+    if len(request.license_keys) > settings.LICENSE_BULK_VALIDATE_MAX_KEYS:
+        raise HTTPException(
+            status_code=status.HTTP_413_REQUEST_ENTITY_TOO_LARGE,
+            detail=f"At most {settings.LICENSE_BULK_VALIDATE_MAX_KEYS} keys can be validated at once."
+        )
+
+    if stream:
+        #the request scoped session is closed before a streamed body is sent, so the stream owns its session
+        return StreamingResponse(
+            stream_validate_responses(request.license_keys),
+            media_type="application/x-ndjson"
+        )
+
+    responses = []
+    async for results in license_service.iter_verified_licenses(request.license_keys):
+        responses.extend(build_validate_response(result) for result in results)
+    return responses
+
+async def stream_validate_responses(raw_license_keys: List[str]) -> AsyncGenerator[str, None]:
+    #primary for db so use_primary reads stay on it, the replica (when in rotation) for read_db
+    async with AsyncSessionLocal() as session, get_read_sessionmaker()() as read_session:
+        license_service = LicenseService(db=session, read_db=read_session)
+        async for results in license_service.iter_verified_licenses(raw_license_keys):
+            yield "".join(build_validate_response(result).model_dump_json() + "\n" for result in results)
 
+def build_validate_response(result: Optional[License]) -> LicenseResponse:
     response = LicenseResponse()
     if result is None:
         response.success = False
@@ -80,22 +231,149 @@ async def validate_license(
     return response
 
 
+@license_router.get("/licenses", status_code=status.HTTP_200_OK)
+async def list_licenses(
+    after_id: Optional[int] = None,
+    limit: int = Query(100, ge=1),
+    is_used: Optional[bool] = None,
+    is_blocked: Optional[bool] = None,
+    search: Optional[str] = Query(None, description="Substring of the license key hint"),
+    license_service: LicenseService = Depends(get_license_service)
+) -> LicensePageResponse:
+    limit = min(limit, settings.LICENSE_LIST_MAX_PAGE_SIZE)
+    licenses = await license_service.list_licenses(after_id, limit, is_used, is_blocked, search)
+
+    response = LicensePageResponse()
+    for license in licenses:
+        response.items.append(LicenseListItem(
+            licenseId=license.license_id,
+            licenseKeyHint=license.license_key_hint,
+            licenseType=license.license_type,
+            createdDate=license.created_date,
+            lastUsedDate=license.last_used_date,
+            expirationDate=license.expiration_date,
+            isUsed=license.is_used,
+            isBlocked=license.is_blocked,
+            isExpired=license.is_expired,
+            useCounts=license.use_counts,
+            useLimit=license.use_limit
+        ))
+    if len(licenses) == limit:
+        response.nextAfterId = licenses[-1].license_id
+    return response
+
+@license_router.get("/stats", status_code=status.HTTP_200_OK)
+async def get_license_stats(
+    license_service: LicenseService = Depends(get_license_service)
+) -> LicenseStatsResponse:
+    #served from the pre-aggregated stats table, no COUNT(*) over the license table
+    response = LicenseStatsResponse()
+    for row in await license_stats_summary.get(license_service.license_repo):
+        item = LicenseStatsItem(
+            licenseType=row["license_type"],
+            totalCount=row["total_count"],
+            usedCount=row["used_count"],
+            blockedCount=row["blocked_count"],
+            expiredCount=row["expired_count"]
+        )
+        response.byLicenseType.append(item)
+        response.totals.totalCount += item.totalCount
+        response.totals.usedCount += item.usedCount
+        response.totals.blockedCount += item.blockedCount
+        response.totals.expiredCount += item.expiredCount
+    return response
+
+@license_router.get("/usage-analytics", status_code=status.HTTP_200_OK)
+async def get_usage_analytics(
+    granularity: str = Query("day", pattern="^(hour|day)$"),
+    start: Optional[datetime] = None,
+    end: Optional[datetime] = None,
+    license_type: Optional[LicenseType] = None,
+    license_id: Optional[int] = None,
+    license_service: LicenseService = Depends(get_license_service)
+) -> LicenseUsageAnalyticsResponse:
+    end = end or datetime.now()
+    start = start or end - timedelta(days=30)
+    if start > end or end - start > timedelta(days=settings.LICENSE_USAGE_ANALYTICS_MAX_DAYS):
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail=f"start must be before end and the range at most {settings.LICENSE_USAGE_ANALYTICS_MAX_DAYS} days."
+        )
+    if granularity == "hour" and license_id is None:
+        #hourly rollups are kept per license, per type totals only exist per day
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail="Hourly usage requires license_id."
+        )
+
+    rows = await license_service.get_usage_analytics(start, end, granularity == "hour", license_type, license_id)
+
+    response = LicenseUsageAnalyticsResponse(granularity=granularity)
+    for row in rows:
+        if license_id is None:
+            bucket_start = datetime.combine(row.bucket_date, datetime.min.time())
+        elif isinstance(row.bucket, datetime):
+            bucket_start = row.bucket
+        else:
+            bucket_start = datetime.combine(row.bucket, datetime.min.time())
+        response.buckets.append(LicenseUsageBucket(
+            bucketStart=bucket_start,
+            licenseType=row.license_type,
+            licenseId=license_id,
+            acceptedCount=row.accepted_count,
+            rejectedCount=row.rejected_count
+        ))
+    return response
+
+@license_router.get("/export", status_code=status.HTTP_200_OK)
+async def export_licenses(
+    export_format: str = Query("ndjson", alias="format", pattern="^(ndjson|csv)$"),
+    gzip: bool = False,
+    is_used: Optional[bool] = None,
+    is_blocked: Optional[bool] = None
+) -> StreamingResponse:
+    body = stream_license_export(export_format, is_used, is_blocked)
+    filename = f"licenses.{export_format}"
+    media_type = EXPORT_MEDIA_TYPES[export_format]
+    if gzip:
+        body = gzip_chunks(body)
+        filename += ".gz"
+        media_type = "application/gzip"
+
+    return StreamingResponse(
+        body,
+        media_type=media_type,
+        headers={"Content-Disposition": f'attachment; filename="{filename}"'}
+    )
+
+async def stream_license_export(
+    export_format: str,
+    is_used: Optional[bool],
+    is_blocked: Optional[bool]
+) -> AsyncGenerator[bytes, None]:
+    async with AsyncSessionLocal() as session, get_read_sessionmaker()() as read_session:
+        license_service = LicenseService(db=session, read_db=read_session)
+        rows = license_service.stream_license_rows(LICENSE_EXPORT_COLUMNS, is_used, is_blocked)
+        async for chunk in encode_license_rows(rows, export_format):
+            yield chunk
+
 @license_router.patch("/license-increase-count", status_code=status.HTTP_200_OK)
 async def license_increase_count(
     request: LicenseUseRequest,
     license_service: LicenseService = Depends(get_license_service)
 ) -> LicenseResponse:
-    result : LicenseSchema = await license_service.verify_and_use_license(request.license_key)
+    result : bool = await license_service.verify_and_use_license(request.license_key)
 
     response = LicenseResponse()
-    if result is None:
+    if not result:
         response.success = False
         response.message = "User is not allowed to use provided license key"
         response.isError = True
+        return response
 
     response.success = True
     response.message = "User has used the license"
-    response.licenseType = result.license_key_hint
+    response.licenseType = LicenseService.license_key_hint(request.license_key)
     response.isError = False
     return response
 
@@ -130,4 +408,58 @@ async def set_license_in_use(
     license_service: LicenseService = Depends(get_license_service)
 ) -> bool:
     result = await license_service.decrease_usage_limit(request.license_key, request.decrease_amt)
-    return result
\ No newline at end of file
+    return result
+
+@license_router.patch("/counter-slots", status_code=status.HTTP_200_OK)
+async def set_license_counter_slots(
+    request: LicenseCounterSlotsRequest,
+    license_service: LicenseService = Depends(get_license_service)
+) -> bool:
+    if request.counter_slots > settings.LICENSE_MAX_COUNTER_SLOTS:
+        raise HTTPException(
+            status_code=status.HTTP_422_UNPROCESSABLE_ENTITY,
+            detail=f"counterSlots can be at most {settings.LICENSE_MAX_COUNTER_SLOTS}."
+        )
+    result = await license_service.set_counter_slots(request.license_key, request.counter_slots)
+    return result
+
+@license_router.get("/cache-stats", status_code=status.HTTP_200_OK)
+async def get_license_cache_stats() -> dict:
+    return license_cache.stats()
+
+@license_router.get("/write-behind-stats", status_code=status.HTTP_200_OK)
+async def get_license_write_behind_stats() -> dict:
+    return license_usage_write_behind.stats()
+
+@license_router.get("/sharded-usage-stats", status_code=status.HTTP_200_OK)
+async def get_license_sharded_usage_stats() -> dict:
+    return license_sharded_usage.stats()
+
+@license_router.get("/expiry-sweeper-stats", status_code=status.HTTP_200_OK)
+async def get_license_expiry_sweeper_stats() -> dict:
+    return license_expiry_sweeper.stats()
+
+@license_router.get("/token-revocation-stats", status_code=status.HTTP_200_OK)
+async def get_license_token_revocation_stats() -> dict:
+    return license_token_revocations.stats()
+
+@license_router.get("/key-filter-stats", status_code=status.HTTP_200_OK)
+async def get_license_key_filter_stats() -> dict:
+    return license_key_filter.stats()
+
+@license_router.get("/rate-limit-stats", status_code=status.HTTP_200_OK)
+async def get_license_rate_limit_stats() -> dict:
+    return rate_limit_stats()
+
+@license_router.get("/lookup-flight-stats", status_code=status.HTTP_200_OK)
+async def get_license_lookup_flight_stats() -> dict:
+    #shared is the number of lookups that were saved
+    return license_lookup_flight.stats()
+
+@license_router.get("/usage-event-stats", status_code=status.HTTP_200_OK)
+async def get_license_usage_event_stats() -> dict:
+    return license_usage_events.stats()
+
+@license_router.get("/stats-summary-stats", status_code=status.HTTP_200_OK)
+async def get_license_stats_summary_stats() -> dict:
+    return license_stats_summary.stats()
\ No newline at end of file
@@ -0,0 +1,32 @@
+from fastapi import APIRouter, status
+from app.core.db_metrics import route_db_histograms
+from app.core.database import async_engine, replica_engines, replica_lag_seconds, is_replica_healthy
+from app.core.config import settings
+import logging
+
+metrics_router = APIRouter(prefix="/metrics", tags=["Metrics"])
+logger = logging.getLogger(__name__)
+
+@metrics_router.get("/db", status_code=status.HTTP_200_OK)
+async def get_db_route_metrics() -> dict:
+    return route_db_histograms.to_dict()
+
+@metrics_router.get("/replicas", status_code=status.HTTP_200_OK)
+async def get_replica_metrics() -> list:
+    return [
+        {"replica": index, "lagSeconds": lag, "inRotation": is_replica_healthy(index)}
+        for index, lag in enumerate(replica_lag_seconds)
+    ]
+
+@metrics_router.get("/pool", status_code=status.HTTP_200_OK)
+async def get_pool_metrics() -> dict:
+    engines = {"primary": async_engine}
+    engines.update({f"replica{index}": engine for index, engine in enumerate(replica_engines)})
+    return {
+        "prePingPolicy": settings.DB_POOL_PRE_PING_POLICY,
+        "poolTimeoutSeconds": settings.DB_POOL_TIMEOUT_SECONDS,
+        "poolRecycleSeconds": settings.DB_POOL_RECYCLE_SECONDS,
+        # multiply by the worker count and compare with MySQL max_connections
+        "maxConnectionsPerEngine": settings.DB_POOL_SIZE + settings.DB_MAX_OVERFLOW,
+        "engines": {name: engine.sync_engine.pool.metrics() for name, engine in engines.items()},
+    }
@@ -1,6 +1,14 @@
 from fastapi import APIRouter, status, HTTPException, Depends, BackgroundTasks
+from sqlalchemy.ext.asyncio import AsyncSession
+from app.core.config import settings
+from app.core.database import get_db
 from app.services.slack_service import SlackService
+from app.services.slack_outbound_queue import slack_outbound_queue
+from app.services.slack_dedup import slack_deduplicator
+from app.services.slack_channel_directory import slack_channel_directory
+from app.repositories.slack_outbound_repository import SlackOutboundRepository
 from app.dto.slack_request_dto import SlackPostRequest
+from app.dto.slack_response_dto import SlackQueuedMessageResponse, SlackOutboundMessageStatusResponse
 import logging
 
 logger = logging.getLogger(__name__)
@@ -9,33 +17,113 @@ slack_router = APIRouter(prefix="/slack", tags=["Slack"])
 def get_slack_service() -> SlackService:
     return SlackService()
 
-def post_slack_message_in_background(service: SlackService, 
-                                     slack_data: SlackPostRequest):
+def get_slack_outbound_repository(db: AsyncSession = Depends(get_db)) -> SlackOutboundRepository:
+    return SlackOutboundRepository(db=db)
+
+async def resolve_slack_channel(slack_data: SlackPostRequest, service: SlackService) -> None:
+    #"#name" becomes the channel ID, so dedup, coalescing and channel pacing all key on the ID
+    channel_id = await slack_channel_directory.resolve(slack_data.channel, service.slack_client)
+    if channel_id is None:
+        raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail=f"Slack channel {slack_data.channel} not found.")
+    slack_data.channel = channel_id
+
+async def post_slack_message_in_background(service: SlackService,
+                                           slack_data: SlackPostRequest,
+                                           dedup_entry=None):
+    delivered = False
     try:
-        slack_response = service.post_formatted_message(slack_data)
-        if not slack_response:
+        slack_response = await service.post_formatted_message(slack_data)
+        if not slack_response.get("ok"):
             logger.error(f"Failed to send formatted slack message from background task: {slack_response}")
+        else:
+            delivered = True
+            if dedup_entry is not None:
+                dedup_entry.slack_ts = slack_response.get("ts")
+                dedup_entry.pending = False
     except Exception as e:
         logger.error(f"Error occured during the background task: {e}")
+    finally:
+        if dedup_entry is not None and not delivered:
+            #the next occurrence has to reach Slack instead of being suppressed
+            slack_deduplicator.release(dedup_entry)
 
 
 @slack_router.post("/post-formatted-message", status_code=status.HTTP_200_OK)
 async def post_slack_formatted_message(
     slack_data: SlackPostRequest,
     background_tasks: BackgroundTasks,
-    service: SlackService = Depends(get_slack_service) #Depds injection
-):
+    service: SlackService = Depends(get_slack_service), #Depds injection
+    outbound_repo: SlackOutboundRepository = Depends(get_slack_outbound_repository)
+) -> SlackQueuedMessageResponse:
     logger.info(f"Received request to post formatted Slack message to channel: {slack_data.channel}")
-    background_tasks.add_task(post_slack_message_in_background, service, slack_data)
-    #Alternatively you can use "from fastapi.concurrency import run_in_threadpool" if you have fixed with async and sync blocking code internally
+    await resolve_slack_channel(slack_data, service)
+
+    dedup_entry = None
+    if settings.SLACK_DEDUP_ENABLED:
+        is_repeat, dedup_entry = slack_deduplicator.check(slack_data)
+        if is_repeat:
+            return SlackQueuedMessageResponse(
+                messageId=dedup_entry.message_id,
+                status="SUPPRESSED",
+                message="Same Slack message was posted recently, counted in the repeat summary."
+            )
+
+    if not settings.SLACK_OUTBOUND_QUEUE_ENABLED:
+        #the post is awaited on the event loop, Slack latency no longer blocks the worker
+        background_tasks.add_task(post_slack_message_in_background, service, slack_data, dedup_entry)
+        return SlackQueuedMessageResponse(status="BACKGROUND", message="Slack message is being processed in the background.")
+
+    #persisted before returning, the outbound workers deliver it with retries
+    try:
+        message_id = await slack_outbound_queue.enqueue(outbound_repo, slack_data)
+    except Exception:
+        if dedup_entry is not None:
+            slack_deduplicator.release(dedup_entry)
+        raise
+    if dedup_entry is not None:
+        dedup_entry.message_id = message_id
+    return SlackQueuedMessageResponse(messageId=message_id, message="Slack message is queued for delivery.")
+
+@slack_router.get("/messages/{message_id}", status_code=status.HTTP_200_OK)
+async def get_slack_message_status(
+    message_id: int,
+    outbound_repo: SlackOutboundRepository = Depends(get_slack_outbound_repository)
+) -> SlackOutboundMessageStatusResponse:
+    message = await outbound_repo.get_message(message_id)
+    if message is None:
+        raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="Slack message not found.")
+    return SlackOutboundMessageStatusResponse(
+        messageId=message.message_id,
+        channel=message.channel,
+        status=message.status,
+        attempts=message.attempts,
+        createdAt=message.created_at,
+        nextAttemptAt=message.next_attempt_at,
+        sentAt=message.sent_at,
+        slackTs=message.slack_ts,
+        lastError=message.last_error
+    )
+
+@slack_router.get("/queue-stats", status_code=status.HTTP_200_OK)
+async def get_slack_queue_stats(
+    outbound_repo: SlackOutboundRepository = Depends(get_slack_outbound_repository)
+) -> dict:
+    return await slack_outbound_queue.stats(outbound_repo)
+
+@slack_router.get("/dedup-stats", status_code=status.HTTP_200_OK)
+async def get_slack_dedup_stats() -> dict:
+    return slack_deduplicator.stats()
 
-    return {"message": "Slack message is being processed in the background."}
+@slack_router.get("/channel-cache-stats", status_code=status.HTTP_200_OK)
+async def get_slack_channel_cache_stats() -> dict:
+    return slack_channel_directory.stats()
 
 
 @slack_router.post("/test-message", status_code=status.HTTP_200_OK)
 async def send_slack_message(
     slack_data: SlackPostRequest
 ):
+    await resolve_slack_channel(slack_data, get_slack_service())
     success = await get_slack_service().post_formatted_message(
         slack_data
     )
@@ -1,8 +1,12 @@
-from sqlalchemy.ext.asyncio import create_async_engine, async_sessionmaker, AsyncSession
+from sqlalchemy.ext.asyncio import create_async_engine, async_sessionmaker, AsyncSession, AsyncEngine
 from sqlalchemy.orm import declarative_base
 from sqlalchemy.exc import SQLAlchemyError, OperationalError
 from app.core.config import settings
-from typing import AsyncGenerator
+from app.core.migrations import run_migrations
+from app.core.db_metrics import InstrumentedAsyncQueuePool, instrument_engine, enable_idle_pre_ping
+from typing import AsyncGenerator, List, Optional
+import asyncio
+import itertools
 import logging
 
 SQLALCHEMY_DATABASE_URL = settings.DATABASE_URL
@@ -10,11 +14,22 @@ SQLALCHEMY_DATABASE_URL = settings.DATABASE_URL
 logger = logging.getLogger(__name__)
 logger.info(f"Database URL: {SQLALCHEMY_DATABASE_URL}")
 
-async_engine = create_async_engine(
-    SQLALCHEMY_DATABASE_URL,
-    pool_pre_ping=True,
-    pool_recycle=3600,
-)
+def _create_engine(url: str) -> AsyncEngine:
+    engine = create_async_engine(
+        url,
+        poolclass=InstrumentedAsyncQueuePool,
+        pool_size=settings.DB_POOL_SIZE,
+        max_overflow=settings.DB_MAX_OVERFLOW,
+        pool_timeout=settings.DB_POOL_TIMEOUT_SECONDS,
+        pool_recycle=settings.DB_POOL_RECYCLE_SECONDS,
+        pool_pre_ping=settings.DB_POOL_PRE_PING_POLICY == "always",
+    )
+    if settings.DB_POOL_PRE_PING_POLICY == "idle":
+        enable_idle_pre_ping(engine, settings.DB_POOL_PRE_PING_IDLE_SECONDS)
+    instrument_engine(engine)
+    return engine
+
+async_engine = _create_engine(SQLALCHEMY_DATABASE_URL)
 
 AsyncSessionLocal = async_sessionmaker(
     bind=async_engine,
@@ -24,8 +39,68 @@ AsyncSessionLocal = async_sessionmaker(
     expire_on_commit=False
 )
 
+# Read replicas stay out of rotation until the lag monitor has seen them in sync
+replica_engines: List[AsyncEngine] = [_create_engine(replica_url) for replica_url in settings.DATABASE_REPLICA_URLS]
+
+ReplicaSessionLocals = [
+    async_sessionmaker(
+        bind=replica_engine,
+        class_=AsyncSession,
+        autocommit=False,
+        autoflush=False,
+        expire_on_commit=False
+    )
+    for replica_engine in replica_engines
+]
+replica_lag_seconds: List[Optional[float]] = [None] * len(replica_engines)
+_replica_round_robin = itertools.count()
+
 Base = declarative_base()
 
+def is_replica_healthy(index: int) -> bool:
+    lag = replica_lag_seconds[index]
+    return lag is not None and lag <= settings.DB_REPLICA_MAX_LAG_SECONDS
+
+def get_read_sessionmaker() -> async_sessionmaker:
+    # Round robin over replicas within the lag threshold, the primary when none is
+    healthy = [index for index in range(len(ReplicaSessionLocals)) if is_replica_healthy(index)]
+    if not healthy:
+        return AsyncSessionLocal
+    return ReplicaSessionLocals[healthy[next(_replica_round_robin) % len(healthy)]]
+
+async def _read_replica_lag(engine: AsyncEngine) -> Optional[float]:
+    async with engine.connect() as conn:
+        try:
+            result = await conn.exec_driver_sql("SHOW REPLICA STATUS")
+        except SQLAlchemyError:
+            # MySQL before 8.0.22
+            await conn.rollback()
+            result = await conn.exec_driver_sql("SHOW SLAVE STATUS")
+        status = result.mappings().first()
+
+    if status is None:
+        return None
+    lag = status.get("Seconds_Behind_Source", status.get("Seconds_Behind_Master"))
+    # NULL while the replication threads are stopped
+    return float(lag) if lag is not None else None
+
+async def monitor_replica_lag():
+    while True:
+        for index, replica_engine in enumerate(replica_engines):
+            was_healthy = is_replica_healthy(index)
+            try:
+                replica_lag_seconds[index] = await _read_replica_lag(replica_engine)
+            except Exception as e:
+                replica_lag_seconds[index] = None
+                logger.error(f"Failed to read lag of read replica #{index}: {e}")
+
+            if was_healthy != is_replica_healthy(index):
+                logger.warning(
+                    f"Read replica #{index} {'back in' if not was_healthy else 'taken out of'} rotation, "
+                    f"lag={replica_lag_seconds[index]}s"
+                )
+        await asyncio.sleep(settings.DB_REPLICA_LAG_CHECK_INTERVAL_SECONDS)
+
 """
 Dependency function that provides an asynchronous database session.
 The session is automatically closed after the request is finished.
@@ -39,15 +114,22 @@ async def get_db() -> AsyncGenerator[AsyncSession, None]:
             pass
 
 """
-Initializes the database by creating all defined tables.
-This should be called when the application starts up.
+Dependency function that provides a session for read-only queries.
+It is bound to a read replica when one is within the lag threshold, otherwise to the primary.
+"""
+async def get_read_db() -> AsyncGenerator[AsyncSession, None]:
+    async with get_read_sessionmaker()() as session:
+        yield session
+
+"""
+Brings the database schema up to date by applying pending versioned scripts
+from app/db-script. This should be called when the application starts up.
 """
 async def init_db():
-    logger.info("Attempting to initialize database tables...")
+    logger.info("Checking database schema version...")
     try:
-        async with async_engine.begin() as conn:
-            await conn.run_sync(Base.metadata.create_all)
-        logger.info("Database tables initialized.")
+        await run_migrations(async_engine)
+        logger.info("Database schema is up to date.")
     except OperationalError as e:
         logger.error(
             f"Database connection failed during initialization: {e}. "
@@ -0,0 +1,230 @@
+import time
+from bisect import bisect_left
+from collections import deque
+from contextlib import asynccontextmanager
+from contextvars import ContextVar, Token
+from typing import Any, AsyncIterator, Dict, List, Optional, Tuple
+
+from sqlalchemy import event, exc
+from sqlalchemy.ext.asyncio import AsyncEngine
+from sqlalchemy.pool import AsyncAdaptedQueuePool
+
+class RequestDbStats:
+    __slots__ = ("statements", "commits", "rollbacks", "db_time", "pool_wait_time")
+
+    def __init__(self):
+        self.statements = 0
+        self.commits = 0
+        self.rollbacks = 0
+        self.db_time = 0.0
+        self.pool_wait_time = 0.0
+
+    @property
+    def round_trips(self) -> int:
+        return self.statements + self.commits + self.rollbacks
+
+# Set per request by the middleware. SQLAlchemy runs the sync event hooks in a greenlet
+# that shares the caller's context, so the hooks see the stats of the current request.
+_request_db_stats: ContextVar[Optional[RequestDbStats]] = ContextVar("request_db_stats", default=None)
+
+def start_request_db_stats() -> Tuple[RequestDbStats, Token]:
+    stats = RequestDbStats()
+    return stats, _request_db_stats.set(stats)
+
+def reset_request_db_stats(token: Token) -> None:
+    _request_db_stats.reset(token)
+
+CHECKOUT_WAIT_SAMPLE_SIZE = 2048
+
+class InstrumentedAsyncQueuePool(AsyncAdaptedQueuePool):
+    """AsyncAdaptedQueuePool that measures how long a checkout waited for a connection."""
+
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        self.checkout_waits: deque = deque(maxlen=CHECKOUT_WAIT_SAMPLE_SIZE) # most recent waits in seconds
+        self.checkouts = 0
+        self.checkout_timeouts = 0
+        self.pre_ping_failures = 0
+
+    def _do_get(self):
+        started_at = time.perf_counter()
+        try:
+            return super()._do_get()
+        except exc.TimeoutError:
+            self.checkout_timeouts += 1
+            raise
+        finally:
+            waited = time.perf_counter() - started_at
+            self.checkouts += 1
+            self.checkout_waits.append(waited)
+            stats = _request_db_stats.get()
+            if stats is not None:
+                stats.pool_wait_time += waited
+
+    def metrics(self) -> Dict[str, Any]:
+        waits_ms = sorted(wait * 1000 for wait in self.checkout_waits)
+
+        def percentile(fraction: float) -> float:
+            if not waits_ms:
+                return 0.0
+            return waits_ms[min(len(waits_ms) - 1, int(fraction * len(waits_ms)))]
+
+        return {
+            "poolSize": self.size(),
+            "maxOverflow": self._max_overflow,
+            "checkedOut": self.checkedout(),
+            "checkedIn": self.checkedin(),
+            "overflowInUse": max(0, self.overflow()),
+            "checkouts": self.checkouts,
+            "checkoutTimeouts": self.checkout_timeouts,
+            "prePingFailures": self.pre_ping_failures,
+            "checkoutWaitMs": {
+                "samples": len(waits_ms),
+                "p50": percentile(0.50),
+                "p90": percentile(0.90),
+                "p99": percentile(0.99),
+                "max": waits_ms[-1] if waits_ms else 0.0,
+            },
+        }
+
+def _before_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+    conn.info.setdefault("query_started_at", []).append(time.perf_counter())
+
+def _after_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+    started_at = conn.info["query_started_at"].pop()
+    stats = _request_db_stats.get()
+    if stats is not None:
+        stats.statements += 1
+        stats.db_time += time.perf_counter() - started_at
+
+def _handle_error(exception_context):
+    if exception_context.is_pre_ping:
+        return
+
+    # a failed statement never reaches after_cursor_execute
+    started = exception_context.connection.info.get("query_started_at") if exception_context.connection is not None else None
+    if started:
+        started.pop()
+
+def _on_commit(conn):
+    stats = _request_db_stats.get()
+    if stats is not None:
+        stats.commits += 1
+
+def _on_rollback(conn):
+    stats = _request_db_stats.get()
+    if stats is not None:
+        stats.rollbacks += 1
+
+def enable_idle_pre_ping(engine: AsyncEngine, idle_seconds: float) -> None:
+    """
+    Pings a connection on checkout only when it sat unused in the pool for longer than
+    idle_seconds, instead of the extra round trip on every checkout of pool_pre_ping.
+    """
+    sync_engine = engine.sync_engine
+
+    @event.listens_for(sync_engine.pool, "checkin")
+    def _stamp_checkin(dbapi_connection, connection_record):
+        connection_record.info["checked_in_at"] = time.monotonic()
+
+    @event.listens_for(sync_engine.pool, "checkout")
+    def _ping_if_idle(dbapi_connection, connection_record, connection_proxy):
+        checked_in_at = connection_record.info.get("checked_in_at")
+        if checked_in_at is None or time.monotonic() - checked_in_at < idle_seconds:
+            return
+        try:
+            sync_engine.dialect.do_ping(dbapi_connection)
+        except Exception:
+            pool = sync_engine.pool
+            if isinstance(pool, InstrumentedAsyncQueuePool):
+                pool.pre_ping_failures += 1
+            # the pool discards this connection and retries the checkout with a fresh one
+            raise exc.DisconnectionError()
+
+def instrument_engine(engine: AsyncEngine) -> None:
+    sync_engine = engine.sync_engine
+    event.listen(sync_engine, "before_cursor_execute", _before_cursor_execute)
+    event.listen(sync_engine, "after_cursor_execute", _after_cursor_execute)
+    event.listen(sync_engine, "handle_error", _handle_error)
+
+    # SQLAlchemy leaves exception_context.engine unset for pre-ping errors, so the
+    # engine's pool is taken from this closure, read at call time in case of dispose()
+    def _count_pre_ping_failure(exception_context):
+        if exception_context.is_pre_ping and isinstance(sync_engine.pool, InstrumentedAsyncQueuePool):
+            sync_engine.pool.pre_ping_failures += 1
+
+    event.listen(sync_engine, "handle_error", _count_pre_ping_failure)
+    event.listen(sync_engine, "commit", _on_commit)
+    event.listen(sync_engine, "rollback", _on_rollback)
+
+class Histogram:
+    __slots__ = ("bounds", "buckets", "count", "total")
+
+    def __init__(self, bounds: List[float]):
+        self.bounds = bounds
+        self.buckets = [0] * (len(bounds) + 1) # last bucket is +Inf
+        self.count = 0
+        self.total = 0.0
+
+    def observe(self, value: float) -> None:
+        self.buckets[bisect_left(self.bounds, value)] += 1
+        self.count += 1
+        self.total += value
+
+    def to_dict(self) -> Dict[str, Any]:
+        labels = [f"le_{bound:g}" for bound in self.bounds] + ["le_inf"]
+        return {
+            "count": self.count,
+            "sum": self.total,
+            "avg": (self.total / self.count) if self.count else 0.0,
+            "buckets": dict(zip(labels, self.buckets)),
+        }
+
+ROUND_TRIP_BUCKETS = [0, 1, 2, 3, 4, 5, 8, 12, 20, 50]
+TIME_MS_BUCKETS = [1, 2, 5, 10, 25, 50, 100, 250, 500, 1000, 2500]
+
+class RouteDbHistograms:
+    """Aggregated per-route distributions of round trips, DB time and pool wait time."""
+
+    def __init__(self):
+        self._routes: Dict[str, Dict[str, Histogram]] = {}
+
+    def record(self, route: str, stats: RequestDbStats) -> None:
+        histograms = self._routes.get(route)
+        if histograms is None:
+            histograms = {
+                "roundTrips": Histogram(ROUND_TRIP_BUCKETS),
+                "dbTimeMs": Histogram(TIME_MS_BUCKETS),
+                "poolWaitMs": Histogram(TIME_MS_BUCKETS),
+            }
+            self._routes[route] = histograms
+        histograms["roundTrips"].observe(stats.round_trips)
+        histograms["dbTimeMs"].observe(stats.db_time * 1000)
+        histograms["poolWaitMs"].observe(stats.pool_wait_time * 1000)
+
+    def to_dict(self) -> Dict[str, Any]:
+        return {
+            route: {name: histogram.to_dict() for name, histogram in histograms.items()}
+            for route, histograms in self._routes.items()
+        }
+
+
+route_db_histograms = RouteDbHistograms()
+
+@asynccontextmanager
+async def db_round_trip_budget(max_round_trips: int) -> AsyncIterator[RequestDbStats]:
+    """
+    Test helper that fails when the wrapped code needs more DB round trips than allowed.
+
+        async with db_round_trip_budget(1):
+            await license_service.verify_and_use_license("ABCDEFGHIJKLM")
+    """
+    stats, token = start_request_db_stats()
+    try:
+        yield stats
+    finally:
+        reset_request_db_stats(token)
+    assert stats.round_trips <= max_round_trips, (
+        f"Expected at most {max_round_trips} DB round trips, got {stats.round_trips} "
+        f"({stats.statements} statements, {stats.commits} commits, {stats.rollbacks} rollbacks)"
+    )
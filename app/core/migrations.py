@@ -0,0 +1,202 @@
+import hashlib
+import re
+import time
+from pathlib import Path
+from typing import List, NamedTuple, Optional
+
+from sqlalchemy import text
+from sqlalchemy.exc import ProgrammingError
+from sqlalchemy.ext.asyncio import AsyncConnection, AsyncEngine
+from app.core.config import settings
+import logging
+
+logger = logging.getLogger(__name__)
+
+MIGRATION_DIR = Path(__file__).resolve().parent.parent / "db-script"
+MIGRATION_FILE_PATTERN = re.compile(r"^V(\d+)__(\w+)\.sql$")
+MIGRATION_LOCK_NAME = "event_bridge_schema_migration"
+
+# V01 creates this table; when it already exists without schema_version, the database
+# was set up by create_all or by hand and V01 is baselined instead of run again
+V01_TABLE_NAME = "client_download_license"
+
+# The scripts are also meant to be run by hand, so they carry their own transaction
+# and USE statements. MySQL commits DDL implicitly anyway, the runner skips those.
+SKIPPED_STATEMENT_PATTERN = re.compile(r"^(START\s+TRANSACTION|BEGIN|COMMIT|ROLLBACK|USE\s)", re.IGNORECASE)
+
+SCHEMA_VERSION_TABLE_DDL = """
+CREATE TABLE IF NOT EXISTS schema_version (
+    version INT NOT NULL PRIMARY KEY,
+    description VARCHAR(200) NOT NULL,
+    script VARCHAR(200) NOT NULL,
+    checksum CHAR(64) NOT NULL,
+    applied_date TIMESTAMP DEFAULT CURRENT_TIMESTAMP NOT NULL,
+    execution_ms INT NOT NULL DEFAULT 0,
+    baselined BOOL NOT NULL DEFAULT FALSE
+)
+"""
+
+class Migration(NamedTuple):
+    version: int
+    description: str
+    path: Path
+
+    @property
+    def checksum(self) -> str:
+        return hashlib.sha256(self.path.read_bytes()).hexdigest()
+
+def discover_migrations(migration_dir: Path = MIGRATION_DIR) -> List[Migration]:
+    migrations = []
+    for path in migration_dir.glob("V*.sql"):
+        matched = MIGRATION_FILE_PATTERN.match(path.name)
+        if matched is None:
+            logger.warning(f"Ignoring migration script with unexpected name: {path.name}")
+            continue
+        migrations.append(Migration(int(matched.group(1)), matched.group(2).replace("_", " "), path))
+
+    migrations.sort(key=lambda migration: migration.version)
+    versions = [migration.version for migration in migrations]
+    if len(versions) != len(set(versions)):
+        raise RuntimeError(f"Duplicate migration versions in {migration_dir}")
+    return migrations
+
+def split_sql_statements(script: str) -> List[str]:
+    statements = []
+    current = []
+    quote: Optional[str] = None
+    for line in script.splitlines():
+        if quote is None and line.strip().startswith("--"):
+            continue
+        for char in line:
+            if quote is not None:
+                if char == quote:
+                    quote = None
+            elif char in ("'", '"', "`"):
+                quote = char
+            elif char == ";":
+                statements.append("".join(current))
+                current = []
+                continue
+            current.append(char)
+        current.append("\n")
+    statements.append("".join(current))
+
+    return [
+        statement.strip()
+        for statement in statements
+        if statement.strip() and not SKIPPED_STATEMENT_PATTERN.match(statement.strip())
+    ]
+
+async def _get_current_version(conn: AsyncConnection) -> Optional[int]:
+    try:
+        result = await conn.execute(text("SELECT COALESCE(MAX(version), 0) FROM schema_version"))
+        return int(result.scalar_one())
+    except ProgrammingError:
+        # schema_version does not exist yet
+        await conn.rollback()
+        return None
+
+async def _table_exists(conn: AsyncConnection, table_name: str) -> bool:
+    result = await conn.execute(
+        text(
+            "SELECT COUNT(*) FROM information_schema.tables "
+            "WHERE table_schema = DATABASE() AND table_name = :table_name"
+        ),
+        {"table_name": table_name}
+    )
+    return result.scalar_one() > 0
+
+async def _verify_checksums(conn: AsyncConnection, migrations: List[Migration]) -> None:
+    # An applied script that was edited afterwards no longer describes the schema, stop before serving
+    result = await conn.execute(text("SELECT version, checksum FROM schema_version"))
+    applied = {int(version): checksum for version, checksum in result}
+    changed = [
+        migration.path.name
+        for migration in migrations
+        if migration.version in applied and applied[migration.version] != migration.checksum
+    ]
+    if changed:
+        raise RuntimeError(
+            f"Applied migration scripts were modified: {', '.join(changed)}. "
+            f"Add a new V-script instead of editing an applied one."
+        )
+
+async def _record_migration(conn: AsyncConnection, migration: Migration, execution_ms: int, baselined: bool) -> None:
+    await conn.execute(
+        text(
+            "INSERT INTO schema_version (version, description, script, checksum, execution_ms, baselined) "
+            "VALUES (:version, :description, :script, :checksum, :execution_ms, :baselined)"
+        ),
+        {
+            "version": migration.version,
+            "description": migration.description,
+            "script": migration.path.name,
+            "checksum": migration.checksum,
+            "execution_ms": execution_ms,
+            "baselined": baselined,
+        }
+    )
+    await conn.commit()
+
+async def _apply_pending(conn: AsyncConnection, migrations: List[Migration]) -> None:
+    current_version = await _get_current_version(conn)
+    if current_version is None:
+        await conn.exec_driver_sql(SCHEMA_VERSION_TABLE_DDL)
+        await conn.commit()
+        current_version = 0
+        # Databases set up by hand or by create_all before the runner existed start from a baseline
+        baseline_version = settings.DB_MIGRATION_BASELINE_VERSION
+        if baseline_version < 1 and await _table_exists(conn, V01_TABLE_NAME):
+            logger.info(f"{V01_TABLE_NAME} exists without schema_version, baselining V01")
+            baseline_version = 1
+        for migration in migrations:
+            if migration.version <= baseline_version:
+                await _record_migration(conn, migration, 0, baselined=True)
+                current_version = migration.version
+        if current_version:
+            logger.info(f"Baselined schema at version {current_version}")
+
+    for migration in migrations:
+        if migration.version <= current_version:
+            continue
+
+        logger.info(f"Applying migration V{migration.version:02d} {migration.description}")
+        started_at = time.perf_counter()
+        for statement in split_sql_statements(migration.path.read_text(encoding="utf-8")):
+            await conn.exec_driver_sql(statement)
+        await conn.commit()
+        execution_ms = int((time.perf_counter() - started_at) * 1000)
+
+        await _record_migration(conn, migration, execution_ms, baselined=False)
+        logger.info(f"Applied migration V{migration.version:02d} in {execution_ms} ms")
+
+async def run_migrations(engine: AsyncEngine) -> None:
+    """
+    Applies the versioned scripts in app/db-script that are newer than the version
+    recorded in schema_version. When the schema is current this is a single SELECT.
+    """
+    migrations = discover_migrations()
+    if not migrations:
+        return
+    latest_version = migrations[-1].version
+
+    async with engine.connect() as conn:
+        current_version = await _get_current_version(conn)
+        if current_version is not None:
+            await _verify_checksums(conn, migrations)
+        if current_version is not None and current_version >= latest_version:
+            logger.info(f"Database schema is current at version {current_version}")
+            return
+
+        # Several workers may boot at once, only one of them applies migrations
+        result = await conn.execute(
+            text("SELECT GET_LOCK(:name, :timeout)"),
+            {"name": MIGRATION_LOCK_NAME, "timeout": settings.DB_MIGRATION_LOCK_TIMEOUT_SECONDS}
+        )
+        if result.scalar_one() != 1:
+            raise RuntimeError("Timed out waiting for the schema migration lock")
+        try:
+            await _apply_pending(conn, migrations)
+        finally:
+            await conn.execute(text("SELECT RELEASE_LOCK(:name)"), {"name": MIGRATION_LOCK_NAME})
+            await conn.commit()
@@ -0,0 +1,86 @@
+import math
+from typing import Any, Dict, Optional, Tuple
+
+from fastapi import HTTPException, Request, status
+
+from app.core.config import settings
+from app.utils.license_key_generator import convert_to_hashed_license_key
+from app.utils.token_bucket import TokenBucketLimiter
+import logging
+
+logger = logging.getLogger(__name__)
+
+# one limiter per (route name, scope), created on first use
+_limiters: Dict[Tuple[str, str], Optional[TokenBucketLimiter]] = {}
+
+def _get_limiter(route_name: str, scope: str, limits: Dict[str, float]) -> Optional[TokenBucketLimiter]:
+    limiter_key = (route_name, scope)
+    if limiter_key not in _limiters:
+        rate = limits.get(route_name, limits.get("default"))
+        #a missing or non-positive rate leaves the route unlimited for that scope
+        _limiters[limiter_key] = TokenBucketLimiter(
+            rate_per_second=rate,
+            burst=rate * settings.RATE_LIMIT_BURST_SECONDS,
+            max_buckets=settings.RATE_LIMIT_MAX_BUCKETS
+        ) if rate and rate > 0 else None
+    return _limiters[limiter_key]
+
+def _client_address(request: Request) -> str:
+    if settings.RATE_LIMIT_TRUST_FORWARDED_FOR:
+        forwarded_for = request.headers.get("x-forwarded-for")
+        if forwarded_for:
+            return forwarded_for.split(",")[0].strip()
+    return request.client.host if request.client else "unknown"
+
+async def _request_license_key(request: Request) -> Optional[str]:
+    if request.method not in ("POST", "PATCH", "PUT"):
+        return None
+    try:
+        #FastAPI has already parsed the body, request.json() returns the cached value
+        body = await request.json()
+    except Exception:
+        return None
+    if isinstance(body, dict):
+        license_key = body.get("licenseKey") or body.get("rawKey")
+        if isinstance(license_key, str):
+            return license_key
+    return None
+
+def _reject(scope: str, route_name: str, retry_after: float) -> None:
+    logger.info(f"Rate limited {route_name} by {scope}, retry after {retry_after:.2f}s")
+    raise HTTPException(
+        status_code=status.HTTP_429_TOO_MANY_REQUESTS,
+        detail=f"Too many requests for this {scope}. Retry later.",
+        headers={"Retry-After": str(max(1, math.ceil(retry_after)))}
+    )
+
+async def license_rate_limit(request: Request) -> None:
+    """
+    Router dependency of the license routes. Runs before the session dependencies
+    of the endpoint, so a rejected request never checks out a DB connection.
+    """
+    if not settings.RATE_LIMIT_ENABLED:
+        return
+    route = request.scope.get("route")
+    route_name = route.path.rsplit("/", 1)[-1] if route is not None else request.url.path
+
+    client_limiter = _get_limiter(route_name, "client", settings.RATE_LIMIT_PER_CLIENT)
+    if client_limiter is not None:
+        retry_after = client_limiter.acquire(_client_address(request))
+        if retry_after > 0:
+            _reject("client", route_name, retry_after)
+
+    key_limiter = _get_limiter(route_name, "license key", settings.RATE_LIMIT_PER_LICENSE_KEY)
+    if key_limiter is not None:
+        license_key = await _request_license_key(request)
+        if license_key is not None:
+            retry_after = key_limiter.acquire(convert_to_hashed_license_key(license_key))
+            if retry_after > 0:
+                _reject("license key", route_name, retry_after)
+
+def rate_limit_stats() -> Dict[str, Any]:
+    return {
+        f"{route_name}:{scope}": limiter.stats()
+        for (route_name, scope), limiter in _limiters.items()
+        if limiter is not None
+    }
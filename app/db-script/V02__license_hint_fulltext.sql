@@ -0,0 +1,14 @@
+START TRANSACTION;
+
+-- 환경별 다음중 하나 선택
+-- USE DEV_EVENT_BRIDGE;
+-- USE UAT_EVENT_BRIDGE;
+-- USE PROD_EVENT_BRIDGE;
+
+-- 라이선스 힌트 부분 검색용 ngram FULLTEXT 인덱스 (ngram_token_size 기본값 2)
+ALTER TABLE client_download_license
+    ADD FULLTEXT INDEX ft_license_key_hint (license_key_hint) WITH PARSER ngram;
+
+SELECT 'ft_license_key_hint index has been created successfully' AS Message;
+
+COMMIT;
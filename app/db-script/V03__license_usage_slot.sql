@@ -0,0 +1,23 @@
+START TRANSACTION;
+
+-- 환경별 다음중 하나 선택
+-- USE DEV_EVENT_BRIDGE;
+-- USE UAT_EVENT_BRIDGE;
+-- USE PROD_EVENT_BRIDGE;
+
+-- 0 이면 기존 use_counts 단일 컬럼 사용, N 이면 사용량을 N 개 슬롯 row 로 분산
+ALTER TABLE client_download_license ADD COLUMN counter_slots INT NOT NULL DEFAULT 0;
+
+-- 공유 라이선스(데모, 구독) 사용량 분산 카운터. use_counts 는 슬롯 합계
+CREATE TABLE IF NOT EXISTS client_download_license_usage_slot (
+    license_id INT NOT NULL,
+    slot_id INT NOT NULL,
+    use_counts INT NOT NULL DEFAULT 0,
+    PRIMARY KEY (license_id, slot_id),
+    CONSTRAINT fk_usage_slot_license FOREIGN KEY (license_id)
+        REFERENCES client_download_license (license_id) ON DELETE CASCADE
+);
+
+SELECT 'client_download_license_usage_slot table has been created successfully' AS Message;
+
+COMMIT;
@@ -0,0 +1,16 @@
+START TRANSACTION;
+
+-- 환경별 다음중 하나 선택
+-- USE DEV_EVENT_BRIDGE;
+-- USE UAT_EVENT_BRIDGE;
+-- USE PROD_EVENT_BRIDGE;
+
+-- 만료 스위퍼가 표시하는 만료 상태
+ALTER TABLE client_download_license ADD COLUMN is_expired BOOL NOT NULL DEFAULT FALSE;
+
+-- 스위퍼의 is_expired = FALSE AND expiration_date < NOW() 조건을 범위 스캔으로 처리
+CREATE INDEX idx_license_expiration ON client_download_license (is_expired, expiration_date);
+
+SELECT 'is_expired column and idx_license_expiration index have been created successfully' AS Message;
+
+COMMIT;
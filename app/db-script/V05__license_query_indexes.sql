@@ -0,0 +1,21 @@
+START TRANSACTION;
+
+-- 환경별 다음중 하나 선택
+-- USE DEV_EVENT_BRIDGE;
+-- USE UAT_EVENT_BRIDGE;
+-- USE PROD_EVENT_BRIDGE;
+
+-- 목록 조회 필터 (is_used / is_blocked)
+CREATE INDEX idx_license_blocked_used ON client_download_license (is_blocked, is_used);
+
+-- 최근 사용 라이선스 조회
+CREATE INDEX idx_license_last_used_date ON client_download_license (last_used_date);
+
+-- 라이선스 타입별 조회 및 통계
+CREATE INDEX idx_license_type ON client_download_license (license_type);
+
+-- expiration_date 는 V04 의 idx_license_expiration (is_expired, expiration_date) 가 담당
+
+SELECT 'license query indexes have been created successfully' AS Message;
+
+COMMIT;
@@ -0,0 +1,40 @@
+START TRANSACTION;
+
+-- 환경별 다음중 하나 선택
+-- USE DEV_EVENT_BRIDGE;
+-- USE UAT_EVENT_BRIDGE;
+-- USE PROD_EVENT_BRIDGE;
+
+-- 라이선스 사용 이벤트 (append-only, 서버가 배치로 기록). 라이선스 삭제 후에도 이력 유지를 위해 FK 없음
+CREATE TABLE IF NOT EXISTS client_download_license_usage_event (
+    event_id BIGINT NOT NULL AUTO_INCREMENT,
+    license_id INT NOT NULL,
+    license_type VARCHAR(50) NOT NULL,
+    used_at DATETIME(3) NOT NULL,
+    accepted BOOLEAN NOT NULL,
+    PRIMARY KEY (event_id),
+    INDEX idx_usage_event_license (license_id, used_at)
+);
+
+-- 라이선스별 시간 단위 집계 (이벤트 기록과 같은 트랜잭션에서 증분 갱신)
+CREATE TABLE IF NOT EXISTS client_download_license_usage_hourly (
+    license_id INT NOT NULL,
+    bucket_start DATETIME NOT NULL,
+    license_type VARCHAR(50) NOT NULL,
+    accepted_count INT NOT NULL DEFAULT 0,
+    rejected_count INT NOT NULL DEFAULT 0,
+    PRIMARY KEY (license_id, bucket_start)
+);
+
+-- 라이선스 타입별 일 단위 집계
+CREATE TABLE IF NOT EXISTS client_download_license_usage_daily (
+    bucket_date DATE NOT NULL,
+    license_type VARCHAR(50) NOT NULL,
+    accepted_count BIGINT NOT NULL DEFAULT 0,
+    rejected_count BIGINT NOT NULL DEFAULT 0,
+    PRIMARY KEY (bucket_date, license_type)
+);
+
+SELECT 'license usage event and rollup tables have been created successfully' AS Message;
+
+COMMIT;
\ No newline at end of file
@@ -0,0 +1,26 @@
+START TRANSACTION;
+
+-- 환경별 다음중 하나 선택
+-- USE DEV_EVENT_BRIDGE;
+-- USE UAT_EVENT_BRIDGE;
+-- USE PROD_EVENT_BRIDGE;
+
+-- 라이선스 타입별 통계 (전체, 사용, 차단, 만료). 라이선스 변경과 같은 트랜잭션에서 증분 갱신
+CREATE TABLE IF NOT EXISTS client_download_license_stats (
+    license_type VARCHAR(50) NOT NULL,
+    total_count BIGINT NOT NULL DEFAULT 0,
+    used_count BIGINT NOT NULL DEFAULT 0,
+    blocked_count BIGINT NOT NULL DEFAULT 0,
+    expired_count BIGINT NOT NULL DEFAULT 0,
+    PRIMARY KEY (license_type)
+);
+
+-- 기존 라이선스로 초기값 계산
+INSERT INTO client_download_license_stats (license_type, total_count, used_count, blocked_count, expired_count)
+SELECT license_type, COUNT(*), SUM(is_used), SUM(is_blocked), SUM(is_expired)
+FROM client_download_license
+GROUP BY license_type;
+
+SELECT 'client_download_license_stats table has been created successfully' AS Message;
+
+COMMIT;
\ No newline at end of file
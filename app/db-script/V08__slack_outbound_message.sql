@@ -0,0 +1,27 @@
+START TRANSACTION;
+
+-- 환경별 다음중 하나 선택
+-- USE DEV_EVENT_BRIDGE;
+-- USE UAT_EVENT_BRIDGE;
+-- USE PROD_EVENT_BRIDGE;
+
+-- 슬랙 발송 대기열. 워커가 SKIP LOCKED 로 가져가 발송하고, 실패 시 next_attempt_at 으로 재시도 예약
+CREATE TABLE IF NOT EXISTS slack_outbound_message (
+    message_id BIGINT NOT NULL AUTO_INCREMENT,
+    channel VARCHAR(100) NOT NULL,
+    message_type INT NOT NULL,
+    payload JSON NOT NULL,
+    status VARCHAR(20) NOT NULL DEFAULT 'PENDING', -- PENDING, SENDING, SENT, DEAD
+    attempts INT NOT NULL DEFAULT 0,
+    next_attempt_at DATETIME(3) NOT NULL,
+    created_at DATETIME(3) NOT NULL,
+    sent_at DATETIME(3) NULL,
+    slack_ts VARCHAR(50) NULL,
+    last_error VARCHAR(500) NULL,
+    PRIMARY KEY (message_id),
+    INDEX idx_slack_outbound_due (status, next_attempt_at)
+);
+
+SELECT 'slack_outbound_message table has been created successfully' AS Message;
+
+COMMIT;
\ No newline at end of file
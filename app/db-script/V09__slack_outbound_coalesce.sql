@@ -0,0 +1,14 @@
+START TRANSACTION;
+
+-- 환경별 다음중 하나 선택
+-- USE DEV_EVENT_BRIDGE;
+-- USE UAT_EVENT_BRIDGE;
+-- USE PROD_EVENT_BRIDGE;
+
+-- 같은 채널, 메시지 타입의 메시지를 시간 창 단위로 묶어 하나의 다이제스트로 발송
+ALTER TABLE slack_outbound_message ADD COLUMN coalesce_key VARCHAR(150) NULL;
+CREATE INDEX idx_slack_outbound_coalesce ON slack_outbound_message (coalesce_key, status, next_attempt_at);
+
+SELECT 'slack_outbound_message coalesce_key column has been added successfully' AS Message;
+
+COMMIT;
\ No newline at end of file
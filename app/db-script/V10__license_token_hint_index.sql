@@ -0,0 +1,14 @@
+START TRANSACTION;
+
+-- 환경별 다음중 하나 선택
+-- USE DEV_EVENT_BRIDGE;
+-- USE UAT_EVENT_BRIDGE;
+-- USE PROD_EVENT_BRIDGE;
+
+-- 서명 토큰 폐기 목록 조회 (license_key_hint LIKE 'TKN-%') 를 전체 스캔 대신 범위 스캔으로
+-- is_blocked, use_counts, use_limit 를 포함해 인덱스만으로 폐기 여부를 판단
+CREATE INDEX idx_license_key_hint ON client_download_license (license_key_hint, is_blocked, use_counts, use_limit);
+
+SELECT 'license key hint index has been created successfully' AS Message;
+
+COMMIT;
\ No newline at end of file
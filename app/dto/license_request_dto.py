@@ -1,5 +1,5 @@
-from pydantic import BaseModel, Field, StringConstraints
-from typing import Optional
+from pydantic import BaseModel, Field, StringConstraints, model_validator
+from typing import Optional, List
 from datetime import datetime
 from typing_extensions import Annotated
 from app.enums.license_type import LicenseType
@@ -105,3 +105,60 @@ class DecreaseLicenseUsageLimitAmtRequest(BaseModel):
         }
     }
 
+#Case 7 shared attributes for server-side generated licenses
+class LicenseTemplate(BaseModel):
+    license_type: LicenseType = Field(LicenseType.UNKNOWN_LICENSE, alias="licenseType")
+    expiration_date: Optional[datetime] = Field(None, alias="expirationDate")
+    use_limit: int = Field(10, ge=1, alias="useLimit")
+
+#Case 8 when admin requests for many licenses at once
+#either provide the licenses one by one, or a count with a template to generate keys on the server
+class LicenseBatchGenerateRequest(BaseModel):
+    licenses: Optional[List[LicenseGenerateRequest]] = Field(None, alias="licenses")
+    count: Optional[int] = Field(None, ge=1, alias="count")
+    template: Optional[LicenseTemplate] = Field(None, alias="template")
+
+    @model_validator(mode="after")
+    def check_licenses_or_count(self):
+        if (self.licenses is None) == (self.count is None):
+            raise ValueError("Provide either 'licenses' or 'count' with an optional 'template'")
+        return self
+
+    model_config = {
+        "json_schema_extra": {
+            "example": {
+                "count": 100,
+                "template": {
+                    "licenseType": 1,
+                    "expirationDate": "2025-12-31T23:59:59",
+                    "useLimit": 50
+                }
+            }
+        }
+    }
+
+#Case 9 when a license server proxy validates a whole fleet of keys at once
+class LicenseBulkValidateRequest(BaseModel):
+    license_keys: List[str] = Field(min_length=1, alias="licenseKeys")
+
+    model_config = {
+        "json_schema_extra": {
+            "example": {
+                "licenseKeys": ["ABCDEFGHIJKLM", "NOPQRSTUVWXYZ"],
+            }
+        }
+    }
+
+#Case 10 spreads the usage counter of a shared license over N slot rows, 0 turns sharding off
+class LicenseCounterSlotsRequest(BaseModel):
+    license_key: str = Field(alias="licenseKey")
+    counter_slots: int = Field(ge=0, alias="counterSlots")
+
+    model_config = {
+        "json_schema_extra": {
+            "example": {
+                "licenseKey": "ABCDEFGHIJKLM",
+                "counterSlots": 16
+            }
+        }
+    }
@@ -1,6 +1,8 @@
 from pydantic import BaseModel, Field
 from datetime import datetime
+from typing import List, Optional
 from app.enums.license_type import LicenseType
+from app.enums.license_batch_item_status import LicenseBatchItemStatus
 
 class LicenseResponse(BaseModel):
     success: bool = Field(default=False)
@@ -10,4 +12,65 @@ class LicenseResponse(BaseModel):
     hashedLicenseKey: str = Field(default="")
     errorMessage: str = Field(default="")
     licenseType: LicenseType = Field(default=None)
-    expirationDate: datetime = Field(default=datetime.now())
\ No newline at end of file
+    expirationDate: datetime = Field(default=datetime.now())
+
+class LicenseTokenResponse(LicenseResponse):
+    licenseToken: str = Field(default="") # signed token, only returned once at issue time
+
+class LicenseBatchItemResult(BaseModel):
+    index: int = Field(default=0)
+    status: LicenseBatchItemStatus = Field(default=LicenseBatchItemStatus.FAILED)
+    rawKey: str = Field(default="") # only filled for server-generated keys
+    licenseKeyHint: str = Field(default="")
+    errorMessage: str = Field(default="")
+
+class LicenseBatchResponse(BaseModel):
+    success: bool = Field(default=False)
+    message: str = Field(default="")
+    isError: bool = Field(default=False)
+    errorMessage: str = Field(default="")
+    createdCount: int = Field(default=0)
+    duplicateCount: int = Field(default=0)
+    failedCount: int = Field(default=0)
+    elapsedSeconds: float = Field(default=0.0)
+    licensesPerSecond: float = Field(default=0.0)
+    results: List[LicenseBatchItemResult] = Field(default_factory=list)
+
+class LicenseListItem(BaseModel):
+    licenseId: int = Field(default=0)
+    licenseKeyHint: str = Field(default="")
+    licenseType: str = Field(default="")
+    createdDate: Optional[datetime] = Field(default=None)
+    lastUsedDate: Optional[datetime] = Field(default=None)
+    expirationDate: Optional[datetime] = Field(default=None)
+    isUsed: bool = Field(default=False)
+    isBlocked: bool = Field(default=False)
+    isExpired: bool = Field(default=False)
+    useCounts: int = Field(default=0)
+    useLimit: int = Field(default=0)
+
+class LicensePageResponse(BaseModel):
+    items: List[LicenseListItem] = Field(default_factory=list)
+    nextAfterId: Optional[int] = Field(default=None) # pass as after_id to fetch the next page, None on the last page
+
+class LicenseUsageBucket(BaseModel):
+    bucketStart: datetime = Field(default=None)
+    licenseType: str = Field(default="")
+    licenseId: Optional[int] = Field(default=None) # None for per license type buckets
+    acceptedCount: int = Field(default=0)
+    rejectedCount: int = Field(default=0)
+
+class LicenseUsageAnalyticsResponse(BaseModel):
+    granularity: str = Field(default="day")
+    buckets: List[LicenseUsageBucket] = Field(default_factory=list)
+
+class LicenseStatsItem(BaseModel):
+    licenseType: str = Field(default="") # "ALL" for the totals
+    totalCount: int = Field(default=0)
+    usedCount: int = Field(default=0)
+    blockedCount: int = Field(default=0)
+    expiredCount: int = Field(default=0)
+
+class LicenseStatsResponse(BaseModel):
+    totals: LicenseStatsItem = Field(default_factory=lambda: LicenseStatsItem(licenseType="ALL"))
+    byLicenseType: List[LicenseStatsItem] = Field(default_factory=list)
\ No newline at end of file
@@ -5,8 +5,8 @@ from app.enums.slack_message_type import SlackMsgType
 class SlackPostRequest(BaseModel):
     channel: str = Field(
         ...,
-        description="The ID of the channel, private group, or DM to send the message to (e.g., 'C123ABC456').",
-        examples=["C123ABC456", "D123ABC456"]
+        description="The ID of the channel, private group, or DM to send the message to (e.g., 'C123ABC456'), or a channel name as '#name'.",
+        examples=["C123ABC456", "D123ABC456", "#alerts"]
     )
 
     header: Optional[str] = Field(
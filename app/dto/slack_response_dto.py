@@ -0,0 +1,19 @@
+from pydantic import BaseModel, Field
+from datetime import datetime
+from typing import Optional
+
+class SlackQueuedMessageResponse(BaseModel):
+    messageId: Optional[int] = Field(default=None) # None when the post runs in the background; for a suppressed repeat, the original message
+    status: str = Field(default="PENDING")
+    message: str = Field(default="")
+
+class SlackOutboundMessageStatusResponse(BaseModel):
+    messageId: int = Field(default=0)
+    channel: str = Field(default="")
+    status: str = Field(default="")
+    attempts: int = Field(default=0)
+    createdAt: Optional[datetime] = Field(default=None)
+    nextAttemptAt: Optional[datetime] = Field(default=None)
+    sentAt: Optional[datetime] = Field(default=None)
+    slackTs: Optional[str] = Field(default=None)
+    lastError: Optional[str] = Field(default=None)
\ No newline at end of file
@@ -0,0 +1,6 @@
+from enum import Enum
+
+class LicenseBatchItemStatus(Enum):
+    CREATED = "CREATED"
+    DUPLICATE = "DUPLICATE"
+    FAILED = "FAILED"
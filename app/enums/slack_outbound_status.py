@@ -0,0 +1,7 @@
+from enum import Enum
+
+class SlackOutboundStatus(Enum):
+    PENDING = "PENDING"
+    SENDING = "SENDING" # claimed by a worker until next_attempt_at, then claimable again
+    SENT = "SENT"
+    DEAD = "DEAD"
\ No newline at end of file
@@ -1,13 +1,26 @@
 import uvicorn
-from fastapi import FastAPI
+from fastapi import FastAPI, Request
 from contextlib import asynccontextmanager
 
 #from app.api.v1.controller.email_controller import email
 from app.api.v1.controller.slack_controller import slack_router
 from app.api.v1.controller.license_controller import license_router
+from app.api.v1.controller.metrics_controller import metrics_router
 from app.utils.logger import setup_logging
-from app.core.database import init_db
+from app.core.database import init_db, replica_engines, monitor_replica_lag
 from app.core.config import settings
+from app.core.db_metrics import start_request_db_stats, reset_request_db_stats, route_db_histograms
+from app.services.license_usage_write_behind import license_usage_write_behind
+from app.services.license_expiry_sweeper import license_expiry_sweeper
+from app.services.license_token_revocation import license_token_revocations
+from app.services.license_key_filter import license_key_filter
+from app.services.license_usage_events import license_usage_events
+from app.services.license_stats import license_stats_summary
+from app.services.slack_service import open_slack_client, close_slack_client, get_slack_client
+from app.services.slack_channel_directory import slack_channel_directory
+from app.services.slack_outbound_queue import slack_outbound_queue
+from app.services.slack_dedup import slack_deduplicator
+import asyncio
 import logging
 
 #logger initilization
@@ -22,14 +35,71 @@ async def lifespan(app: FastAPI):
     await init_db()
     app_logger.info("Database initialized successfully.")
 
+    await open_slack_client()
+
     #app.include_router(email.router, prefix="/v1")
     app.include_router(slack_router, prefix="/v1")
     app.include_router(license_router, prefix="/v1")
+    app.include_router(metrics_router, prefix="/v1")
+
+    if settings.LICENSE_WRITE_BEHIND_ENABLED:
+        license_usage_write_behind.start()
+    if settings.LICENSE_EXPIRY_SWEEP_ENABLED:
+        license_expiry_sweeper.start()
+    license_token_revocations.start()
+    if settings.LICENSE_KEY_FILTER_ENABLED:
+        license_key_filter.start()
+    if settings.LICENSE_USAGE_EVENTS_ENABLED:
+        license_usage_events.start()
+    if settings.LICENSE_STATS_REPAIR_ENABLED:
+        license_stats_summary.start()
+    if settings.SLACK_OUTBOUND_QUEUE_ENABLED:
+        slack_outbound_queue.start()
+    if settings.SLACK_DEDUP_ENABLED:
+        slack_deduplicator.start()
+    if settings.SLACK_CHANNEL_INDEX_ENABLED:
+        slack_channel_directory.start(get_slack_client())
+    replica_monitor_task = asyncio.create_task(monitor_replica_lag()) if replica_engines else None
 
     yield
 
+    if replica_monitor_task is not None:
+        replica_monitor_task.cancel()
+    await license_expiry_sweeper.stop()
+    await license_token_revocations.stop()
+    await license_key_filter.stop()
+    await license_stats_summary.stop()
+    if settings.LICENSE_USAGE_EVENTS_ENABLED:
+        await license_usage_events.stop(settings.LICENSE_USAGE_EVENT_SHUTDOWN_TIMEOUT_SECONDS)
+
+    if settings.LICENSE_WRITE_BEHIND_ENABLED:
+        app_logger.info("Flushing buffered license usage...")
+        await license_usage_write_behind.stop(settings.LICENSE_WRITE_BEHIND_SHUTDOWN_TIMEOUT_SECONDS)
+
+    await slack_deduplicator.stop()
+    await slack_channel_directory.stop()
+    await slack_outbound_queue.stop()
+    await close_slack_client()
+
 app = FastAPI(lifespan=lifespan)
 
+@app.middleware("http")
+async def db_metrics_middleware(request: Request, call_next):
+    stats, token = start_request_db_stats()
+    try:
+        response = await call_next(request)
+    finally:
+        reset_request_db_stats(token)
+
+    route = request.scope.get("route")
+    route_db_histograms.record(f"{request.method} {route.path if route else 'unmatched'}", stats)
+    if settings.DEBUG:
+        response.headers["X-DB-Statements"] = str(stats.statements)
+        response.headers["X-DB-Round-Trips"] = str(stats.round_trips)
+        response.headers["X-DB-Time-Ms"] = f"{stats.db_time * 1000:.2f}"
+        response.headers["X-DB-Pool-Wait-Ms"] = f"{stats.pool_wait_time * 1000:.2f}"
+    return response
+
 @app.get("/health")
 async def read_root():
     app_logger.info("Root endpoint accessed.")
@@ -12,10 +12,12 @@ class License(BaseModel):
     is_used: bool
     is_blocked: bool
     expiration_date: Optional[datetime]
+    is_expired: bool = False
     use_counts: int
     use_limit: int
     license_key_hint: str
     license_type: str
+    counter_slots: int = 0
 
     model_config = {
         "from_attributes": True, # This replaces orm_mode = True in Pydantic V1
@@ -28,10 +30,12 @@ class License(BaseModel):
                 "is_used": True,
                 "is_blocked": False,
                 "expiration_date": "2025-12-31T23:59:59",
+                "is_expired": False,
                 "use_counts": 5,
                 "use_limit": 50,
                 "license_key_hint": "For premium access",
-                "license_type": "CLIENT_LICENSE_DOWNLOAD"
+                "license_type": "CLIENT_LICENSE_DOWNLOAD",
+                "counter_slots": 0
             }
         }
     }
@@ -2,10 +2,8 @@ from pydantic import BaseModel, Field, StringConstraints
 from typing import Optional
 from datetime import datetime
 from typing_extensions import Annotated
-from sqlalchemy import Column, Integer, String, Boolean, DateTime
-from sqlalchemy.ext.declarative import declarative_base
-
-Base = declarative_base()
+from sqlalchemy import Column, Integer, BigInteger, String, Boolean, DateTime, Date, ForeignKey
+from app.core.database import Base
 
 class License(Base):
     __tablename__ = "client_download_license" # Your table name
@@ -17,16 +15,63 @@ class License(Base):
     is_used = Column(Boolean, default=False, nullable=False)
     is_blocked = Column(Boolean, default=False, nullable=False)
     expiration_date = Column(DateTime, nullable=True) # Matches TIMESTAMP NULL
+    is_expired = Column(Boolean, default=False, nullable=False) # set by the expiry sweeper
     use_counts = Column(Integer, default=0, nullable=False)
     use_limit = Column(Integer, default=10, nullable=False)
     license_key_hint = Column(String(50), nullable=False) # From your ALTER TABLE
     license_type = Column(String(50), nullable=False)
+    counter_slots = Column(Integer, default=0, nullable=False) # 0 = plain use_counts, N = sharded over N slot rows
     # You might want to add a type field to match the LicenseType enum
     # license_type = Column(Integer, default=0, nullable=False) # Or String/Enum type if mapped as such
 
     def __repr__(self):
         return f"<License(id={self.license_id}, key={self.license_key[:10]}, used={self.is_used})>"
 
+class LicenseUsageSlot(Base):
+    __tablename__ = "client_download_license_usage_slot"
+
+    license_id = Column(Integer, ForeignKey("client_download_license.license_id", ondelete="CASCADE"), primary_key=True)
+    slot_id = Column(Integer, primary_key=True)
+    use_counts = Column(Integer, default=0, nullable=False)
+
+class LicenseUsageEvent(Base):
+    __tablename__ = "client_download_license_usage_event"
+
+    event_id = Column(BigInteger, primary_key=True, autoincrement=True)
+    license_id = Column(Integer, nullable=False) # no FK, the history outlives deleted licenses
+    license_type = Column(String(50), nullable=False)
+    used_at = Column(DateTime, nullable=False)
+    accepted = Column(Boolean, nullable=False)
+
+class LicenseUsageHourly(Base):
+    __tablename__ = "client_download_license_usage_hourly"
+
+    license_id = Column(Integer, primary_key=True)
+    bucket_start = Column(DateTime, primary_key=True)
+    license_type = Column(String(50), nullable=False)
+    accepted_count = Column(Integer, default=0, nullable=False)
+    rejected_count = Column(Integer, default=0, nullable=False)
+
+class LicenseUsageDaily(Base):
+    __tablename__ = "client_download_license_usage_daily"
+
+    bucket_date = Column(Date, primary_key=True)
+    license_type = Column(String(50), primary_key=True)
+    accepted_count = Column(BigInteger, default=0, nullable=False)
+    rejected_count = Column(BigInteger, default=0, nullable=False)
+
+class LicenseStats(Base):
+    __tablename__ = "client_download_license_stats"
+
+    # maintained in the same transaction as every license change, see LicenseRepository
+    COUNTER_COLUMNS = ("total_count", "used_count", "blocked_count", "expired_count")
+
+    license_type = Column(String(50), primary_key=True)
+    total_count = Column(BigInteger, default=0, nullable=False)
+    used_count = Column(BigInteger, default=0, nullable=False)
+    blocked_count = Column(BigInteger, default=0, nullable=False)
+    expired_count = Column(BigInteger, default=0, nullable=False)
+
 class LicenseCreate(BaseModel):
     license_key: Annotated[str, StringConstraints(min_length=1, max_length=200)] = Field(
         ...,
@@ -82,6 +127,11 @@ class LicenseUpdate(BaseModel):
         None
     )
 
+    counter_slots: Optional[int] = Field(
+        None,
+        ge=0
+    )
+
     model_config = {
         "json_schema_extra": {
             "example": {
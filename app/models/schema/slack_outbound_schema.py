@@ -0,0 +1,22 @@
+from datetime import datetime
+from sqlalchemy import Column, Integer, BigInteger, String, DateTime, JSON
+from app.core.database import Base
+
+class SlackOutboundMessage(Base):
+    __tablename__ = "slack_outbound_message"
+
+    message_id = Column(BigInteger, primary_key=True, autoincrement=True)
+    channel = Column(String(100), nullable=False)
+    message_type = Column(Integer, nullable=False)
+    payload = Column(JSON, nullable=False) # SlackPostRequest fields
+    status = Column(String(20), default="PENDING", nullable=False)
+    attempts = Column(Integer, default=0, nullable=False)
+    next_attempt_at = Column(DateTime, nullable=False)
+    created_at = Column(DateTime, default=datetime.now, nullable=False)
+    sent_at = Column(DateTime, nullable=True)
+    slack_ts = Column(String(50), nullable=True)
+    last_error = Column(String(500), nullable=True)
+    coalesce_key = Column(String(150), nullable=True) # messages sharing a key and a window are posted as one digest
+
+    def __repr__(self):
+        return f"<SlackOutboundMessage(id={self.message_id}, channel={self.channel}, status={self.status})>"
\ No newline at end of file
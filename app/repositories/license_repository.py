@@ -1,86 +1,509 @@
-from typing import Optional, List
+from typing import Optional, List, Set, Dict
 from sqlalchemy.ext.asyncio import AsyncSession
 from sqlalchemy.future import select
-from sqlalchemy import or_, and_
+from sqlalchemy import or_, and_, update, insert, delete, func, case
+from sqlalchemy.dialects.mysql import match, insert as mysql_insert
 from datetime import datetime
-from app.models.schema.license_schema import LicenseCreate, LicenseUpdate, License as LicenseSchema
-from typing import AsyncGenerator
+from app.models.schema.license_schema import LicenseCreate, LicenseUpdate, License as LicenseSchema, LicenseUsageSlot, LicenseStats
+from typing import AsyncGenerator, Any, Mapping
+
+# must match the server's ngram_token_size used by ft_license_key_hint
+HINT_SEARCH_NGRAM_SIZE = 2
+
+# license flag -> counter column of client_download_license_stats
+STATS_FLAG_COLUMNS = {
+    "is_used": "used_count",
+    "is_blocked": "blocked_count",
+    "is_expired": "expired_count",
+}
 
 class LicenseRepository:
-    def __init__(self, db: AsyncSession):
+    def __init__(self, db: AsyncSession, read_db: Optional[AsyncSession] = None):
         self.db = db
+        self.read_db = read_db if read_db is not None else db
+        self._has_written = False
+
+    def _reader(self, use_primary: bool) -> AsyncSession:
+        # Read-only calls go to the replica session unless the caller goes on to modify
+        # the loaded row, or this repository already wrote (read-your-writes)
+        if use_primary or self._has_written:
+            return self.db
+        return self.read_db
+
+    @property
+    def has_written(self) -> bool:
+        return self._has_written
+
+    async def _commit(self) -> None:
+        self._has_written = True
+        await self.db.commit()
+
+    @staticmethod
+    def _stats_row(license: Any, sign: int = 1) -> Dict[str, int]:
+        # The counters one license row contributes to its license type
+        row = {"total_count": sign}
+        for flag, column in STATS_FLAG_COLUMNS.items():
+            row[column] = sign if getattr(license, flag) else 0
+        return row
+
+    async def _apply_stats_deltas(self, deltas: Dict[str, Dict[str, int]]) -> None:
+        # Runs inside the caller's transaction, so the stats commit or roll back with the change.
+        # Rows are upserted in license_type order, concurrent writers lock them in the same order.
+        rows = [
+            {"license_type": license_type, **{column: delta.get(column, 0) for column in LicenseStats.COUNTER_COLUMNS}}
+            for license_type, delta in sorted(deltas.items())
+            if any(delta.values())
+        ]
+        if not rows:
+            return
+        stmt = mysql_insert(LicenseStats).values(rows)
+        stmt = stmt.on_duplicate_key_update({
+            column: getattr(LicenseStats, column) + stmt.inserted[column]
+            for column in LicenseStats.COUNTER_COLUMNS
+        })
+        await self.db.execute(stmt)
+
+    async def _apply_stats_transition(self, license_type: str, column: str, sign: int) -> None:
+        await self._apply_stats_deltas({license_type: {column: sign}})
+
+    async def _lock_for_stats(self, license: LicenseSchema) -> None:
+        # Reload the row under FOR UPDATE before reading its flags: the caller loaded it without
+        # a lock, and two concurrent transitions from the same stale copy would count twice
+        await self.db.refresh(license, with_for_update=True)
 
     async def create_license(self, license_data: LicenseCreate) -> LicenseSchema:
         db_license = LicenseSchema(**license_data.model_dump()) 
         
         self.db.add(db_license)
-        await self.db.commit()
+        await self.db.flush()
+        await self._apply_stats_deltas({db_license.license_type: self._stats_row(db_license)})
+        await self._commit()
         await self.db.refresh(db_license) # This refreshes db_license with DB-generated IDs, dates, etc.
         return db_license
 
-    async def get_license_by_id(self, license_id: int) -> Optional[LicenseSchema]:
-        result = await self.db.execute(select(LicenseSchema).filter(LicenseSchema.license_id == license_id))
+    async def get_existing_license_keys(self, license_keys: List[str]) -> Set[str]:
+        if not license_keys:
+            return set()
+        result = await self.db.execute(
+            select(LicenseSchema.license_key).filter(LicenseSchema.license_key.in_(license_keys))
+        )
+        return set(result.scalars().all())
+
+    async def create_licenses_bulk(self, licenses_data: List[LicenseCreate]) -> Set[str]:
+        """
+        Inserts the given licenses as one multi-row INSERT in a single transaction.
+        Keys that already exist are skipped and the set of inserted keys is returned.
+        """
+        requested_keys = [license_data.license_key for license_data in licenses_data]
+
+        # A key registered concurrently between the lookup and the insert is ignored by
+        # INSERT IGNORE. The row count would not match then, so the chunk is rolled back
+        # and retried once with a fresh lookup.
+        for _ in range(2):
+            existing_keys = await self.get_existing_license_keys(requested_keys)
+            now = datetime.now()
+            rows = []
+            pending_keys = set()
+            for license_data in licenses_data:
+                if license_data.license_key in existing_keys or license_data.license_key in pending_keys:
+                    continue
+                pending_keys.add(license_data.license_key)
+                rows.append({
+                    **license_data.model_dump(),
+                    "created_date": now,
+                    "last_used_date": now,
+                    "is_used": False,
+                    "is_blocked": False,
+                    "use_counts": 0,
+                })
+
+            if not rows:
+                await self.db.rollback()
+                return set()
+
+            result = await self.db.execute(insert(LicenseSchema.__table__).prefix_with("IGNORE").values(rows))
+            if result.rowcount == len(rows):
+                deltas: Dict[str, Dict[str, int]] = {}
+                for row in rows:
+                    delta = deltas.setdefault(row["license_type"], {})
+                    delta["total_count"] = delta.get("total_count", 0) + 1
+                await self._apply_stats_deltas(deltas)
+                await self._commit()
+                return pending_keys
+            await self.db.rollback()
+
+        raise RuntimeError("Concurrent registration kept colliding with the batch insert")
+
+    async def get_license_by_id(self, license_id: int, use_primary: bool = False) -> Optional[LicenseSchema]:
+        result = await self._reader(use_primary).execute(select(LicenseSchema).filter(LicenseSchema.license_id == license_id))
         return result.scalar_one_or_none()
 
-    async def get_license_by_key(self, license_key: str) -> Optional[LicenseSchema]:
-        result = await self.db.execute(select(LicenseSchema).filter(LicenseSchema.license_key == license_key))
+    async def get_license_by_key(self, license_key: str, use_primary: bool = False) -> Optional[LicenseSchema]:
+        result = await self._reader(use_primary).execute(select(LicenseSchema).filter(LicenseSchema.license_key == license_key))
         return result.scalar_one_or_none()
 
+    async def get_licenses_by_keys(self, license_keys: List[str], use_primary: bool = False) -> List[LicenseSchema]:
+        if not license_keys:
+            return []
+        result = await self._reader(use_primary).execute(select(LicenseSchema).filter(LicenseSchema.license_key.in_(license_keys)))
+        return list(result.scalars().all())
+
     async def get_all_licenses(
         self,
-        skip: int = 0,
+        after_id: Optional[int] = None,
         limit: int = 100,
         is_used: Optional[bool] = None,
         is_blocked: Optional[bool] = None,
         search_query: Optional[str] = None
     ) -> List[LicenseSchema]:
-        query = select(LicenseSchema)
+        # Keyset pagination on the primary key: pass the last license_id of the previous page
+        query = self._filtered_license_query(select(LicenseSchema), is_used, is_blocked)
+        if search_query:
+            query = self._hint_search_query(query, search_query)
+        if after_id is not None:
+            query = query.filter(LicenseSchema.license_id > after_id)
+
+        query = query.order_by(LicenseSchema.license_id).limit(limit)
+        result = await self._reader(False).execute(query)
+        return list(result.scalars().all())
+
+    async def stream_licenses(
+        self,
+        columns: List[str],
+        is_used: Optional[bool] = None,
+        is_blocked: Optional[bool] = None,
+        yield_per: int = 1000
+    ) -> AsyncGenerator[Mapping[str, Any], None]:
+        # Server-side cursor, only yield_per rows are held in memory at a time
+        table_columns = [LicenseSchema.__table__.c[column] for column in columns]
+        query = self._filtered_license_query(select(*table_columns), is_used, is_blocked)
+        query = query.order_by(LicenseSchema.license_id).execution_options(yield_per=yield_per)
+
+        result = await self._reader(False).stream(query)
+        async for row in result:
+            yield row._mapping
+
+    async def count_licenses(self) -> int:
+        result = await self._reader(False).execute(select(func.count()).select_from(LicenseSchema))
+        return result.scalar_one()
+
+    async def stream_license_keys(
+        self,
+        after_id: Optional[int] = None,
+        yield_per: int = 1000
+    ) -> AsyncGenerator[Mapping[str, Any], None]:
+        # Primary key range scan, (license_id, license_key) only
+        query = select(LicenseSchema.license_id, LicenseSchema.license_key)
+        if after_id is not None:
+            query = query.filter(LicenseSchema.license_id > after_id)
+        query = query.order_by(LicenseSchema.license_id).execution_options(yield_per=yield_per)
+
+        result = await self._reader(False).stream(query)
+        async for row in result:
+            yield row._mapping
+
+    @staticmethod
+    def _hint_search_query(query, search_query: str):
+        # license_key only holds SHA-256 digests, so only the hint is searchable.
+        # The ngram FULLTEXT index (V02) narrows the candidates, the LIKE then drops
+        # ngram false positives from that small set instead of scanning the table.
+        term = search_query.replace('"', "").strip()
+        like_filter = LicenseSchema.license_key_hint.contains(term, autoescape=True)
+        if len(term) < HINT_SEARCH_NGRAM_SIZE:
+            return query.filter(like_filter)
+        return query.filter(
+            match(LicenseSchema.license_key_hint, against=f'"{term}"').in_boolean_mode(),
+            like_filter
+        )
+
+    @staticmethod
+    def _filtered_license_query(query, is_used: Optional[bool], is_blocked: Optional[bool]):
         if is_used is not None:
             query = query.filter(LicenseSchema.is_used == is_used)
         if is_blocked is not None:
             query = query.filter(LicenseSchema.is_blocked == is_blocked)
-        if search_query:
-            query = query.filter(
-                or_(
-                    LicenseSchema.license_key.ilike(f"%{search_query}%"),
-                    LicenseSchema.license_key_hint.ilike(f"%{search_query}%")
-                )
-            )
-
-        query = query.offset(skip).limit(limit)
-        result = await self.db.execute(query)
-        return list(result.scalars().all())
+        return query
 
     async def update_license(self, license: LicenseSchema, license_data: LicenseUpdate) -> LicenseSchema:
         update_data = license_data.model_dump(exclude_unset=True)
+        await self._lock_for_stats(license)
+        before = (license.license_type, self._stats_row(license))
         for key, value in update_data.items():
             setattr(license, key, value)
 
-        await self.db.commit()
+        # the license row is written before the stats row, the order recompute_license_stats relies on
+        await self.db.flush()
+        if before != (license.license_type, self._stats_row(license)):
+            deltas: Dict[str, Dict[str, int]] = {before[0]: {k: -v for k, v in before[1].items()}}
+            for column, value in self._stats_row(license).items():
+                delta = deltas.setdefault(license.license_type, {})
+                delta[column] = delta.get(column, 0) + value
+            await self._apply_stats_deltas(deltas)
+        await self._commit()
         await self.db.refresh(license)
         return license
 
     async def delete_license(self, license: LicenseSchema) -> None:
         await self.db.delete(license)
-        await self.db.commit()
+        await self.db.flush()
+        await self._apply_stats_deltas({license.license_type: self._stats_row(license, sign=-1)})
+        await self._commit()
 
     async def mark_license_as_used(self, license: LicenseSchema) -> LicenseSchema:
+        await self._lock_for_stats(license)
         license.use_counts += 1
         license.last_used_date = datetime.now()
-        if license.use_counts >= license.use_limit:
+        first_use = license.use_counts >= license.use_limit and not license.is_used
+        if first_use:
             license.is_used = True
-        await self.db.commit()
+        await self.db.flush()
+        if first_use:
+            await self._apply_stats_transition(license.license_type, "used_count", 1)
+        await self._commit()
+        await self.db.refresh(license)
+        return license
+
+    async def increment_license_usage(self, license_key: str) -> bool:
+        # Limit, block and expiry checks live in the WHERE clause so the increment is a single
+        # conditional UPDATE. The affected-row count tells whether the license could be used.
+        # Repeat uses match the is_used = TRUE variant; only a first use (or a rejection) runs
+        # the second variant, which also moves the license into used_count of the stats.
+        if await self._conditional_increment(license_key, already_used=True):
+            await self._commit()
+            return True
+
+        if await self._conditional_increment(license_key, already_used=False):
+            result = await self.db.execute(
+                select(LicenseSchema.license_type).filter(LicenseSchema.license_key == license_key)
+            )
+            await self._apply_stats_transition(result.scalar_one(), "used_count", 1)
+            await self._commit()
+            return True
+
+        #nothing was written, ending the transaction this way keeps the request's reads off
+        #the primary and lets the rejected use's snapshot lookup join the single-flight
+        await self.db.rollback()
+        return False
+
+    async def _conditional_increment(self, license_key: str, already_used: bool) -> bool:
+        stmt = (
+            update(LicenseSchema)
+            .where(
+                LicenseSchema.license_key == license_key,
+                LicenseSchema.is_used == already_used,
+                LicenseSchema.use_counts < LicenseSchema.use_limit,
+                LicenseSchema.is_blocked == False,
+                LicenseSchema.counter_slots == 0,
+                or_(
+                    LicenseSchema.expiration_date.is_(None),
+                    LicenseSchema.expiration_date > func.now()
+                )
+            )
+            .values(
+                use_counts=LicenseSchema.use_counts + 1,
+                is_used=True,
+                last_used_date=func.now()
+            )
+            .execution_options(synchronize_session=False)
+        )
+        result = await self.db.execute(stmt)
+        return result.rowcount == 1
+
+    async def apply_usage_deltas(self, usage_deltas: Dict[str, int]) -> int:
+        # One UPDATE ... CASE for many keys, used by the write-behind flush.
+        # Limits were already checked against the cached snapshot when the increments were accepted.
+        if not usage_deltas:
+            return 0
+
+        # licenses used for the first time, locked until the commit so the stats stay exact
+        first_uses = await self.db.execute(
+            select(LicenseSchema.license_type, func.count())
+            .filter(LicenseSchema.license_key.in_(list(usage_deltas.keys())), LicenseSchema.is_used == False)
+            .group_by(LicenseSchema.license_type)
+            .with_for_update()
+        )
+        stats_deltas = {license_type: {"used_count": count} for license_type, count in first_uses}
+
+        stmt = (
+            update(LicenseSchema)
+            .where(LicenseSchema.license_key.in_(list(usage_deltas.keys())))
+            .values(
+                use_counts=LicenseSchema.use_counts + case(usage_deltas, value=LicenseSchema.license_key, else_=0),
+                is_used=True,
+                last_used_date=func.now()
+            )
+            .execution_options(synchronize_session=False)
+        )
+        result = await self.db.execute(stmt)
+        await self._apply_stats_deltas(stats_deltas)
+        await self._commit()
+        return result.rowcount
+
+    async def increment_sharded_usage(self, license_id: int, slot_id: int) -> None:
+        # Each increment touches one randomly chosen slot row, so concurrent uses of a
+        # shared license no longer queue up on the client_download_license row lock
+        stmt = mysql_insert(LicenseUsageSlot).values(license_id=license_id, slot_id=slot_id, use_counts=1)
+        stmt = stmt.on_duplicate_key_update(use_counts=LicenseUsageSlot.use_counts + 1)
+        await self.db.execute(stmt)
+        await self._commit()
+
+    async def get_sharded_usage_sum(self, license_id: int) -> int:
+        result = await self.db.execute(
+            select(func.coalesce(func.sum(LicenseUsageSlot.use_counts), 0))
+            .filter(LicenseUsageSlot.license_id == license_id)
+        )
+        return int(result.scalar_one())
+
+    async def fold_sharded_usage(self, license_id: int, use_counts: int) -> None:
+        # Mirrors the slot sum into use_counts so listings and exports stay meaningful
+        current = (await self.db.execute(
+            select(LicenseSchema.license_type, LicenseSchema.is_used)
+            .filter(LicenseSchema.license_id == license_id)
+            .with_for_update()
+        )).one_or_none()
+        if current is not None and current.is_used != (use_counts > 0):
+            await self._apply_stats_transition(current.license_type, "used_count", 1 if use_counts > 0 else -1)
+
+        stmt = (
+            update(LicenseSchema)
+            .where(LicenseSchema.license_id == license_id, LicenseSchema.use_counts != use_counts)
+            .values(use_counts=use_counts, is_used=use_counts > 0, last_used_date=func.now())
+            .execution_options(synchronize_session=False)
+        )
+        await self.db.execute(stmt)
+        await self._commit()
+
+    async def reset_sharded_usage(self, license_id: int) -> None:
+        await self.db.execute(delete(LicenseUsageSlot).where(LicenseUsageSlot.license_id == license_id))
+        await self._commit()
+
+    async def set_counter_slots(self, license: LicenseSchema, counter_slots: int) -> LicenseSchema:
+        # Lock the row so no plain increment slips in while the counter moves between modes
+        await self.db.refresh(license, with_for_update=True)
+
+        if license.counter_slots == 0 and counter_slots > 0:
+            # seed slot 0 with the current count, the slot sum then continues from there
+            await self.db.execute(delete(LicenseUsageSlot).where(LicenseUsageSlot.license_id == license.license_id))
+            await self.db.execute(
+                insert(LicenseUsageSlot).values(license_id=license.license_id, slot_id=0, use_counts=license.use_counts)
+            )
+        elif license.counter_slots > 0 and counter_slots == 0:
+            license.use_counts = await self.get_sharded_usage_sum(license.license_id)
+            await self.db.execute(delete(LicenseUsageSlot).where(LicenseUsageSlot.license_id == license.license_id))
+
+        license.counter_slots = counter_slots
+        await self._commit()
         await self.db.refresh(license)
         return license
 
+    async def mark_expired_licenses(self, batch_size: int) -> int:
+        # Bounded batch served by idx_license_expiration, short transaction per batch.
+        # The rows are locked and read first so the expired counts per license type are exact.
+        expiring = (await self.db.execute(
+            select(LicenseSchema.license_id, LicenseSchema.license_type)
+            .where(
+                LicenseSchema.is_expired == False,
+                LicenseSchema.expiration_date < func.now()
+            )
+            .limit(batch_size)
+            .with_for_update()
+        )).all()
+        if not expiring:
+            await self.db.rollback()
+            return 0
+
+        stmt = (
+            update(LicenseSchema)
+            .where(LicenseSchema.license_id.in_([row.license_id for row in expiring]))
+            .values(is_expired=True)
+            .execution_options(synchronize_session=False)
+        )
+        result = await self.db.execute(stmt)
+
+        stats_deltas: Dict[str, Dict[str, int]] = {}
+        for row in expiring:
+            delta = stats_deltas.setdefault(row.license_type, {"expired_count": 0})
+            delta["expired_count"] += 1
+        await self._apply_stats_deltas(stats_deltas)
+        await self._commit()
+        return result.rowcount
+
+    async def get_revoked_license_keys(self, hint_prefix: str) -> Set[str]:
+        # Only the keys whose hint marks them as signed tokens, so the set stays small
+        # The prefix LIKE is a range scan on idx_license_key_hint (V10), which also holds the revocation columns
+        stmt = select(LicenseSchema.license_key).where(
+            LicenseSchema.license_key_hint.startswith(hint_prefix, autoescape=True),
+            or_(
+                LicenseSchema.is_blocked == True,
+                LicenseSchema.use_counts >= LicenseSchema.use_limit
+            )
+        )
+        result = await self._reader(use_primary=False).execute(stmt)
+        return set(result.scalars().all())
+
     async def block_license(self, license: LicenseSchema) -> LicenseSchema:
+        await self._lock_for_stats(license)
+        newly_blocked = not license.is_blocked
         license.is_blocked = True
-        await self.db.commit()
+        await self.db.flush()
+        if newly_blocked:
+            await self._apply_stats_transition(license.license_type, "blocked_count", 1)
+        await self._commit()
         await self.db.refresh(license)
         return license
 
     async def unblock_license(self, license: LicenseSchema) -> LicenseSchema:
+        await self._lock_for_stats(license)
+        newly_unblocked = license.is_blocked
         license.is_blocked = False
-        await self.db.commit()
+        await self.db.flush()
+        if newly_unblocked:
+            await self._apply_stats_transition(license.license_type, "blocked_count", -1)
+        await self._commit()
         await self.db.refresh(license)
-        return license
\ No newline at end of file
+        return license
+
+    async def get_license_stats(self) -> List[LicenseStats]:
+        result = await self._reader(False).execute(select(LicenseStats).order_by(LicenseStats.license_type))
+        return list(result.scalars().all())
+
+    async def get_stats_license_types(self) -> List[str]:
+        # Every type that has licenses (idx_license_type) or a stats row that may need clearing
+        license_types = await self.db.execute(select(LicenseSchema.license_type).distinct())
+        stats_types = await self.db.execute(select(LicenseStats.license_type))
+        return sorted(set(license_types.scalars().all()) | set(stats_types.scalars().all()))
+
+    async def recompute_license_type_stats(self, license_type: str) -> None:
+        """
+        Rebuilds the client_download_license_stats row of one license type from its licenses.
+        The stats row (or its gap) is locked first. Writers update the license row before the
+        stats row, so a change that is not committed yet stays invisible to the scan and lands
+        on the stats after this commit; nothing is counted twice or lost. Only writers of this
+        license type wait, and only for the scan of its rows.
+        """
+        await self.db.execute(
+            select(LicenseStats.license_type).where(LicenseStats.license_type == license_type).with_for_update()
+        )
+        result = await self.db.execute(
+            select(
+                func.count().label("total_count"),
+                *[
+                    func.coalesce(func.sum(case((getattr(LicenseSchema, flag) == True, 1), else_=0)), 0).label(column)
+                    for flag, column in STATS_FLAG_COLUMNS.items()
+                ]
+            ).where(LicenseSchema.license_type == license_type)
+        )
+        row = dict(result.one()._mapping)
+
+        await self.db.execute(delete(LicenseStats).where(LicenseStats.license_type == license_type))
+        if row["total_count"]:
+            await self.db.execute(insert(LicenseStats.__table__).values(license_type=license_type, **row))
+        await self._commit()
+
+    async def recompute_license_stats(self) -> int:
+        # One short transaction per license type instead of one lock over the whole table
+        license_types = await self.get_stats_license_types()
+        await self._commit()
+        for license_type in license_types:
+            await self.recompute_license_type_stats(license_type)
+        return len(license_types)
\ No newline at end of file
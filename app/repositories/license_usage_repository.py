@@ -0,0 +1,122 @@
+from typing import Optional, List, Dict, Tuple, Any
+from datetime import datetime, date
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy.future import select
+from sqlalchemy import insert, func
+from sqlalchemy.dialects.mysql import insert as mysql_insert
+from app.models.schema.license_schema import License as LicenseSchema, LicenseUsageEvent, LicenseUsageHourly, LicenseUsageDaily
+
+class LicenseUsageRepository:
+    def __init__(self, db: AsyncSession, read_db: Optional[AsyncSession] = None):
+        self.db = db
+        self.read_db = read_db if read_db is not None else db
+
+    async def get_license_refs(self, license_keys: List[str]) -> Dict[str, Tuple[int, str]]:
+        # hashed key -> (license_id, license_type), only the two columns the events need
+        if not license_keys:
+            return {}
+        result = await self.db.execute(
+            select(LicenseSchema.license_key, LicenseSchema.license_id, LicenseSchema.license_type)
+            .filter(LicenseSchema.license_key.in_(license_keys))
+        )
+        return {row.license_key: (row.license_id, row.license_type) for row in result}
+
+    async def record_usage_events(self, events: List[Dict[str, Any]]) -> None:
+        """
+        Appends the events and folds them into the hourly and daily rollups in one transaction,
+        so the rollups never disagree with the event history.
+        Each event has license_id, license_type, used_at and accepted.
+        """
+        if not events:
+            return
+
+        hourly: Dict[Tuple[int, datetime], List] = {}
+        daily: Dict[Tuple[date, str], List[int]] = {}
+        for event in events:
+            bucket_start = event["used_at"].replace(minute=0, second=0, microsecond=0)
+            counts = hourly.setdefault((event["license_id"], bucket_start), [event["license_type"], 0, 0])
+            daily_counts = daily.setdefault((bucket_start.date(), event["license_type"]), [0, 0])
+            if event["accepted"]:
+                counts[1] += 1
+                daily_counts[0] += 1
+            else:
+                counts[2] += 1
+                daily_counts[1] += 1
+
+        await self.db.execute(insert(LicenseUsageEvent.__table__), events)
+
+        # sorted so concurrent flushes of several workers lock rollup rows in the same order
+        hourly_stmt = mysql_insert(LicenseUsageHourly).values([
+            {
+                "license_id": license_id,
+                "bucket_start": bucket_start,
+                "license_type": license_type,
+                "accepted_count": accepted,
+                "rejected_count": rejected
+            }
+            for (license_id, bucket_start), (license_type, accepted, rejected) in sorted(hourly.items())
+        ])
+        hourly_stmt = hourly_stmt.on_duplicate_key_update(
+            accepted_count=LicenseUsageHourly.accepted_count + hourly_stmt.inserted.accepted_count,
+            rejected_count=LicenseUsageHourly.rejected_count + hourly_stmt.inserted.rejected_count
+        )
+        await self.db.execute(hourly_stmt)
+
+        daily_stmt = mysql_insert(LicenseUsageDaily).values([
+            {
+                "bucket_date": bucket_date,
+                "license_type": license_type,
+                "accepted_count": accepted,
+                "rejected_count": rejected
+            }
+            for (bucket_date, license_type), (accepted, rejected) in sorted(daily.items())
+        ])
+        daily_stmt = daily_stmt.on_duplicate_key_update(
+            accepted_count=LicenseUsageDaily.accepted_count + daily_stmt.inserted.accepted_count,
+            rejected_count=LicenseUsageDaily.rejected_count + daily_stmt.inserted.rejected_count
+        )
+        await self.db.execute(daily_stmt)
+        await self.db.commit()
+
+    async def get_daily_usage_by_type(
+        self,
+        start_date: date,
+        end_date: date,
+        license_type: Optional[str] = None
+    ) -> List[LicenseUsageDaily]:
+        # Primary key range scan, at most one row per day and license type
+        query = select(LicenseUsageDaily).filter(
+            LicenseUsageDaily.bucket_date >= start_date,
+            LicenseUsageDaily.bucket_date <= end_date
+        )
+        if license_type is not None:
+            query = query.filter(LicenseUsageDaily.license_type == license_type)
+        result = await self.read_db.execute(query.order_by(LicenseUsageDaily.bucket_date, LicenseUsageDaily.license_type))
+        return list(result.scalars().all())
+
+    async def get_license_usage(
+        self,
+        license_id: int,
+        start: datetime,
+        end: datetime,
+        daily: bool = False
+    ) -> List[Any]:
+        # Primary key range scan of one license, summed per day when asked for daily buckets
+        bucket = func.date(LicenseUsageHourly.bucket_start) if daily else LicenseUsageHourly.bucket_start
+        query = (
+            select(
+                bucket.label("bucket"),
+                func.max(LicenseUsageHourly.license_type).label("license_type"),
+                func.sum(LicenseUsageHourly.accepted_count).label("accepted_count"),
+                func.sum(LicenseUsageHourly.rejected_count).label("rejected_count")
+            )
+            .filter(
+                LicenseUsageHourly.license_id == license_id,
+                LicenseUsageHourly.bucket_start >= start,
+                LicenseUsageHourly.bucket_start < end
+            )
+            .group_by(bucket)
+            .order_by(bucket)
+        )
+        result = await self.read_db.execute(query)
+        return list(result.all())
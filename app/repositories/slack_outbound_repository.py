@@ -0,0 +1,158 @@
+from typing import Optional, List, Dict, Any, Tuple
+from datetime import datetime, timedelta
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy.future import select
+from sqlalchemy import update, func
+from app.models.schema.slack_outbound_schema import SlackOutboundMessage
+from app.enums.slack_outbound_status import SlackOutboundStatus
+
+# statuses a worker may claim, SENDING rows only once their lease ran out
+CLAIMABLE_STATUSES = [SlackOutboundStatus.PENDING.value, SlackOutboundStatus.SENDING.value]
+
+class SlackOutboundRepository:
+    def __init__(self, db: AsyncSession):
+        self.db = db
+
+    async def enqueue(
+        self,
+        channel: str,
+        message_type: int,
+        payload: Dict[str, Any],
+        next_attempt_at: Optional[datetime] = None,
+        coalesce_key: Optional[str] = None
+    ) -> int:
+        now = datetime.now()
+        message = SlackOutboundMessage(
+            channel=channel,
+            message_type=message_type,
+            payload=payload,
+            status=SlackOutboundStatus.PENDING.value,
+            next_attempt_at=next_attempt_at or now,
+            created_at=now,
+            coalesce_key=coalesce_key
+        )
+        self.db.add(message)
+        await self.db.commit()
+        return message.message_id
+
+    async def get_message(self, message_id: int) -> Optional[SlackOutboundMessage]:
+        result = await self.db.execute(select(SlackOutboundMessage).filter(SlackOutboundMessage.message_id == message_id))
+        return result.scalar_one_or_none()
+
+    async def get_delivery_states(self, message_ids: List[int]) -> Dict[int, Tuple[str, Optional[str]]]:
+        # message_id -> (status, slack_ts) for many messages in one primary key IN (...) query
+        if not message_ids:
+            return {}
+        result = await self.db.execute(
+            select(SlackOutboundMessage.message_id, SlackOutboundMessage.status, SlackOutboundMessage.slack_ts)
+            .where(SlackOutboundMessage.message_id.in_(message_ids))
+        )
+        return {message_id: (status, slack_ts) for message_id, status, slack_ts in result}
+
+    async def claim_due_messages(self, limit: int, lease_seconds: float) -> List[SlackOutboundMessage]:
+        # SKIP LOCKED lets every worker of every process claim a disjoint batch without waiting
+        now = datetime.now()
+        result = await self.db.execute(
+            select(SlackOutboundMessage)
+            .filter(
+                SlackOutboundMessage.status.in_(CLAIMABLE_STATUSES),
+                SlackOutboundMessage.next_attempt_at <= now
+            )
+            .order_by(SlackOutboundMessage.next_attempt_at)
+            .limit(limit)
+            .with_for_update(skip_locked=True)
+        )
+        messages = list(result.scalars().all())
+        for message in messages:
+            message.status = SlackOutboundStatus.SENDING.value
+            message.next_attempt_at = now + timedelta(seconds=lease_seconds)
+        await self.db.commit()
+        return messages
+
+    async def claim_coalesced_messages(
+        self,
+        coalesce_key: str,
+        exclude_ids: List[int],
+        limit: int,
+        lease_seconds: float
+    ) -> List[SlackOutboundMessage]:
+        # The rest of a coalescing window that another claim did not pick up, oldest first
+        now = datetime.now()
+        result = await self.db.execute(
+            select(SlackOutboundMessage)
+            .filter(
+                SlackOutboundMessage.coalesce_key == coalesce_key,
+                SlackOutboundMessage.status.in_(CLAIMABLE_STATUSES),
+                SlackOutboundMessage.next_attempt_at <= now,
+                SlackOutboundMessage.message_id.not_in(exclude_ids)
+            )
+            .order_by(SlackOutboundMessage.message_id)
+            .limit(limit)
+            .with_for_update(skip_locked=True)
+        )
+        messages = list(result.scalars().all())
+        for message in messages:
+            message.status = SlackOutboundStatus.SENDING.value
+            message.next_attempt_at = now + timedelta(seconds=lease_seconds)
+        await self.db.commit()
+        return messages
+
+    async def mark_sent(self, message_ids: List[int], slack_ts: Optional[str]) -> None:
+        await self._update(
+            message_ids,
+            status=SlackOutboundStatus.SENT.value,
+            sent_at=datetime.now(),
+            slack_ts=slack_ts,
+            attempts=SlackOutboundMessage.attempts + 1
+        )
+
+    async def reschedule(self, message_ids: List[int], delay_seconds: float, error: Optional[str] = None, count_attempt: bool = True) -> None:
+        values = {
+            "status": SlackOutboundStatus.PENDING.value,
+            "next_attempt_at": datetime.now() + timedelta(seconds=delay_seconds),
+        }
+        if error is not None:
+            values["last_error"] = error[:500]
+        if count_attempt:
+            values["attempts"] = SlackOutboundMessage.attempts + 1
+        await self._update(message_ids, **values)
+
+    async def split_coalesced(self, message_ids: List[int], error: str) -> None:
+        # Back to PENDING without a digest key, each message is then claimed and posted on its own
+        await self._update(
+            message_ids,
+            status=SlackOutboundStatus.PENDING.value,
+            next_attempt_at=datetime.now(),
+            coalesce_key=None,
+            last_error=error[:500]
+        )
+
+    async def mark_dead(self, message_ids: List[int], error: str) -> None:
+        await self._update(
+            message_ids,
+            status=SlackOutboundStatus.DEAD.value,
+            last_error=error[:500],
+            attempts=SlackOutboundMessage.attempts + 1
+        )
+
+    async def _update(self, message_ids: List[int], **values: Any) -> None:
+        await self.db.execute(
+            update(SlackOutboundMessage)
+            .where(SlackOutboundMessage.message_id.in_(message_ids))
+            .values(**values)
+            .execution_options(synchronize_session=False)
+        )
+        await self.db.commit()
+
+    async def count_by_status(self) -> Dict[str, int]:
+        result = await self.db.execute(
+            select(SlackOutboundMessage.status, func.count()).group_by(SlackOutboundMessage.status)
+        )
+        return {status: count for status, count in result}
+
+    async def get_oldest_due_at(self) -> Optional[datetime]:
+        result = await self.db.execute(
+            select(func.min(SlackOutboundMessage.next_attempt_at))
+            .filter(SlackOutboundMessage.status == SlackOutboundStatus.PENDING.value)
+        )
+        return result.scalar_one()
@@ -0,0 +1,83 @@
+import asyncio
+from typing import Any, Dict, Optional
+
+from app.core.config import settings
+from app.core.database import AsyncSessionLocal
+from app.repositories.license_repository import LicenseRepository
+import logging
+
+logger = logging.getLogger(__name__)
+
+class LicenseExpirySweeper:
+    """
+    Periodically marks licenses past their expiration_date as expired.
+    Every batch is a single bounded UPDATE ... LIMIT in its own short transaction,
+    with a pause in between so row locks are never held for long.
+    """
+
+    def __init__(self, interval_seconds: float, batch_size: int, max_batches: int, batch_pause_ms: int):
+        self.interval_seconds = interval_seconds
+        self.batch_size = batch_size
+        self.max_batches = max_batches
+        self.batch_pause_seconds = batch_pause_ms / 1000
+        self._task: Optional[asyncio.Task] = None
+
+        self.runs = 0
+        self.expired_total = 0
+        self.last_run_expired = 0
+
+    async def sweep(self) -> int:
+        expired = 0
+        for _ in range(self.max_batches):
+            async with AsyncSessionLocal() as session:
+                marked = await LicenseRepository(db=session).mark_expired_licenses(self.batch_size)
+            expired += marked
+            if marked < self.batch_size:
+                break
+            await asyncio.sleep(self.batch_pause_seconds)
+
+        self.runs += 1
+        self.expired_total += expired
+        self.last_run_expired = expired
+        if expired:
+            logger.info(f"License expiry sweep marked {expired} licenses as expired")
+        return expired
+
+    async def _run(self) -> None:
+        while True:
+            try:
+                await self.sweep()
+            except Exception as e:
+                logger.error(f"License expiry sweep failed: {e}", exc_info=True)
+            await asyncio.sleep(self.interval_seconds)
+
+    def start(self) -> None:
+        if self._task is None:
+            logger.info(f"Starting license expiry sweeper, running every {self.interval_seconds}s")
+            self._task = asyncio.create_task(self._run())
+
+    async def stop(self) -> None:
+        if self._task is None:
+            return
+        self._task.cancel()
+        try:
+            await self._task
+        except asyncio.CancelledError:
+            pass
+        self._task = None
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            "enabled": settings.LICENSE_EXPIRY_SWEEP_ENABLED,
+            "runs": self.runs,
+            "expiredTotal": self.expired_total,
+            "lastRunExpired": self.last_run_expired,
+        }
+
+
+license_expiry_sweeper = LicenseExpirySweeper(
+    interval_seconds=settings.LICENSE_EXPIRY_SWEEP_INTERVAL_SECONDS,
+    batch_size=settings.LICENSE_EXPIRY_SWEEP_BATCH_SIZE,
+    max_batches=settings.LICENSE_EXPIRY_SWEEP_MAX_BATCHES,
+    batch_pause_ms=settings.LICENSE_EXPIRY_SWEEP_BATCH_PAUSE_MS,
+)
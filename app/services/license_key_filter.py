@@ -0,0 +1,172 @@
+import asyncio
+import time
+from typing import Any, Dict, List, Optional
+
+from app.core.config import settings
+from app.core.database import get_read_sessionmaker, AsyncSessionLocal
+from app.repositories.license_repository import LicenseRepository
+from app.utils.bloom_filter import BloomFilter
+import logging
+
+logger = logging.getLogger(__name__)
+
+# the tail sync re-reads this many ids below the high-water mark, so rows whose
+# insert committed after a higher id was already seen are not missed
+SYNC_ID_OVERLAP = 1000
+
+# when this many sync intervals pass without a successful sync, misses fall through to the DB
+STALE_AFTER_SYNC_INTERVALS = 5
+
+class LicenseKeyFilter:
+    """
+    Bloom filter of every known hashed license key, so lookups of made-up keys are
+    rejected without a session checkout or a query. Built with a streaming scan,
+    kept current by local adds and a tail sync on license_id, and rebuilt periodically
+    to drop deleted keys and restore the false positive rate.
+    Until the first build completes, or while syncing keeps failing, every key is
+    reported as possibly known. The tail sync reads the primary, so a key created by
+    another worker or the CLI is known here within one sync interval.
+    """
+
+    def __init__(
+        self,
+        false_positive_rate: float,
+        headroom: float,
+        sync_interval_seconds: float,
+        rebuild_interval_seconds: float
+    ):
+        self.false_positive_rate = false_positive_rate
+        self.headroom = headroom
+        self.sync_interval_seconds = sync_interval_seconds
+        self.rebuild_interval_seconds = rebuild_interval_seconds
+        self._filter: Optional[BloomFilter] = None
+        self._high_water_id = 0
+        self._synced_at = 0.0 # monotonic time of the last successful build or sync
+        self._added_during_rebuild: Optional[List[str]] = None
+        self._task: Optional[asyncio.Task] = None
+
+        self.rejected = 0
+        self.passed = 0
+        self.rebuilds = 0
+        self.last_rebuild_seconds = 0.0
+
+    @property
+    def ready(self) -> bool:
+        return self._filter is not None
+
+    def might_exist(self, hashed_license_key: str) -> bool:
+        if self._filter is None:
+            return True
+        if time.monotonic() - self._synced_at > self.sync_interval_seconds * STALE_AFTER_SYNC_INTERVALS:
+            #the filter may be missing recent keys, let the DB answer
+            self.passed += 1
+            return True
+        if hashed_license_key in self._filter:
+            self.passed += 1
+            return True
+        self.rejected += 1
+        return False
+
+    def add(self, hashed_license_key: str) -> None:
+        if self._filter is not None:
+            self._filter.add(hashed_license_key)
+        if self._added_during_rebuild is not None:
+            self._added_during_rebuild.append(hashed_license_key)
+
+    async def rebuild(self) -> int:
+        started_at = time.perf_counter()
+        self._added_during_rebuild = []
+        try:
+            async with get_read_sessionmaker()() as session:
+                repo = LicenseRepository(db=session)
+                key_count = await repo.count_licenses()
+                bloom = BloomFilter(int(key_count * self.headroom), self.false_positive_rate)
+                high_water_id = 0
+                async for row in repo.stream_license_keys(yield_per=settings.LICENSE_EXPORT_YIELD_PER):
+                    bloom.add(row["license_key"])
+                    high_water_id = row["license_id"]
+
+            for hashed_license_key in self._added_during_rebuild:
+                bloom.add(hashed_license_key)
+        finally:
+            self._added_during_rebuild = None
+
+        self._filter = bloom
+        self._high_water_id = high_water_id
+        self._synced_at = time.monotonic()
+        self.rebuilds += 1
+        self.last_rebuild_seconds = time.perf_counter() - started_at
+        logger.info(f"License key filter built with {bloom.count} keys in {self.last_rebuild_seconds:.2f}s ({bloom.memory_bytes} bytes)")
+        return bloom.count
+
+    async def sync(self) -> int:
+        bloom = self._filter
+        if bloom is None:
+            return 0
+        added = 0
+        #a small primary key range scan, read from the primary so a new key is not hidden by replica lag
+        async with AsyncSessionLocal() as session:
+            repo = LicenseRepository(db=session)
+            async for row in repo.stream_license_keys(after_id=max(0, self._high_water_id - SYNC_ID_OVERLAP)):
+                #the overlap rows and locally added keys are already in, add() does not count them again
+                if bloom.add(row["license_key"]):
+                    added += 1
+                if row["license_id"] > self._high_water_id:
+                    self._high_water_id = row["license_id"]
+        self._synced_at = time.monotonic()
+        return added
+
+    async def _run(self) -> None:
+        last_rebuild_at = None
+        while True:
+            try:
+                if (
+                    last_rebuild_at is None
+                    or time.monotonic() - last_rebuild_at >= self.rebuild_interval_seconds
+                    or self._filter.count > self._filter.capacity
+                ):
+                    await self.rebuild()
+                    last_rebuild_at = time.monotonic()
+                else:
+                    await self.sync()
+            except Exception as e:
+                logger.error(f"License key filter refresh failed: {e}", exc_info=True)
+            await asyncio.sleep(self.sync_interval_seconds)
+
+    def start(self) -> None:
+        if self._task is None:
+            logger.info("Starting license key filter")
+            self._task = asyncio.create_task(self._run())
+
+    async def stop(self) -> None:
+        if self._task is None:
+            return
+        self._task.cancel()
+        try:
+            await self._task
+        except asyncio.CancelledError:
+            pass
+        self._task = None
+
+    def stats(self) -> Dict[str, Any]:
+        stats = {
+            "enabled": settings.LICENSE_KEY_FILTER_ENABLED,
+            "ready": self.ready,
+            "rejected": self.rejected,
+            "passed": self.passed,
+            "rebuilds": self.rebuilds,
+            "lastRebuildSeconds": self.last_rebuild_seconds,
+            "highWaterId": self._high_water_id,
+            "secondsSinceSync": time.monotonic() - self._synced_at if self._synced_at else None,
+        }
+        if self._filter is not None:
+            stats.update(self._filter.stats())
+        return stats
+
+
+license_key_filter = LicenseKeyFilter(
+    false_positive_rate=settings.LICENSE_KEY_FILTER_FALSE_POSITIVE_RATE,
+    headroom=settings.LICENSE_KEY_FILTER_HEADROOM,
+    sync_interval_seconds=settings.LICENSE_KEY_FILTER_SYNC_INTERVAL_SECONDS,
+    rebuild_interval_seconds=settings.LICENSE_KEY_FILTER_REBUILD_INTERVAL_SECONDS,
+)
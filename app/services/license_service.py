@@ -1,12 +1,25 @@
+import time
 from datetime import datetime
-from typing import Optional
+from typing import Optional, List, AsyncGenerator, Any, Mapping, Tuple
 from passlib.context import CryptContext
-from app.utils.license_key_generator import convert_to_hashed_license_key
+from app.utils.license_key_generator import convert_to_hashed_license_key, build_license_key_hint, generate_signed_license_token, is_signed_license_token, decode_signed_license_token, build_signed_token_hint
+from app.utils.license_cache import license_cache
+from app.utils.single_flight import SingleFlight
+from app.core.database import get_read_sessionmaker, AsyncSessionLocal
+from app.services.license_usage_write_behind import license_usage_write_behind
+from app.services.license_sharded_usage import license_sharded_usage
+from app.services.license_key_filter import license_key_filter
+from app.services.license_usage_events import license_usage_events
+from app.services.license_token_revocation import license_token_revocations, SIGNED_TOKEN_HINT_PREFIX
 from sqlalchemy.ext.asyncio import AsyncSession
 from app.repositories.license_repository import LicenseRepository
+from app.repositories.license_usage_repository import LicenseUsageRepository
 from app.models.license import License
 from app.models.schema.license_schema import LicenseCreate, LicenseUpdate, License as LicenseSchema
 from app.enums.license_type import LicenseType
+from app.enums.license_batch_item_status import LicenseBatchItemStatus
+from app.dto.license_request_dto import LicenseGenerateRequest
+from pydantic import ValidationError
 from dateutil.relativedelta import relativedelta
 from app.core.config import settings
 from fastapi import HTTPException
@@ -14,11 +27,15 @@ import logging
 
 logger = logging.getLogger(__name__)
 
+# concurrent cache misses for the same key share one lookup, process wide
+license_lookup_flight = SingleFlight()
+
 class LicenseService:
-    def __init__(self, db: AsyncSession):
+    def __init__(self, db: AsyncSession, read_db: Optional[AsyncSession] = None):
         self.db = db
         self.pwd_context = CryptContext(schemes=[settings.ALGORITHM], deprecated="auto")
-        self.license_repo: LicenseRepository = LicenseRepository(db=self.db)
+        self.license_repo: LicenseRepository = LicenseRepository(db=self.db, read_db=read_db)
+        self.usage_repo: LicenseUsageRepository = LicenseUsageRepository(db=self.db, read_db=read_db)
         
     async def verify_license(
         self,
@@ -26,42 +43,301 @@ class LicenseService:
     ) -> bool:
         logging.debug("verifying a given license")
 
+        if license_token_revocations.loaded and is_signed_license_token(raw_license_key):
+            return self._verify_signed_token(raw_license_key)
+
         hashed_license_key = convert_to_hashed_license_key(raw_license_key)
-        licenseData : LicenseSchema = await self.license_repo.get_license_by_key(hashed_license_key)
+        licenseData : Optional[License] = await self.get_license_snapshot(hashed_license_key)
     
         #Todo: instead of return None, return exception types that represents the issue
         if licenseData is None:
             return None
         
-        if licenseData.use_counts >= licenseData.use_limit:
+        if self._current_use_counts(licenseData) >= licenseData.use_limit:
+            return None
+
+        if self._is_expired(licenseData):
             return None
 
         return licenseData
 
+    @staticmethod
+    def _verify_signed_token(token: str) -> Optional[License]:
+        #signature, expiry and revocation are all checked in memory, the DB is not touched
+        claims = decode_signed_license_token(token)
+        if claims is None:
+            return None
+        if claims["exp"] is not None and claims["exp"] <= time.time():
+            return None
+        if license_token_revocations.is_revoked(convert_to_hashed_license_key(token)):
+            return None
+
+        try:
+            license_type = LicenseType(claims["typ"]).name
+        except ValueError:
+            license_type = LicenseType.UNKNOWN_LICENSE.name
+
+        #built from the claims, usage counts are only known to the DB
+        return License(
+            license_id=None,
+            license_key="",
+            created_date=datetime.fromtimestamp(claims["iat"]),
+            last_used_date=None,
+            is_used=False,
+            is_blocked=False,
+            expiration_date=datetime.fromtimestamp(claims["exp"]) if claims["exp"] is not None else None,
+            use_counts=0,
+            use_limit=claims["lim"],
+            license_key_hint=build_signed_token_hint(claims),
+            license_type=license_type
+        )
+
+    @staticmethod
+    def license_key_hint(raw_license_key: str) -> str:
+        #the stored hint is derived from the raw key, so it is known without reading the row
+        claims = decode_signed_license_token(raw_license_key) if is_signed_license_token(raw_license_key) else None
+        if claims is not None:
+            return build_signed_token_hint(claims)
+        return build_license_key_hint(raw_license_key)
+
+    @staticmethod
+    def _sync_token_revocation(licenseData: LicenseSchema) -> None:
+        #keeps this process' revocation set current without waiting for the next refresh
+        if not licenseData.license_key_hint.startswith(SIGNED_TOKEN_HINT_PREFIX):
+            return
+        if licenseData.is_blocked or licenseData.use_counts >= licenseData.use_limit:
+            license_token_revocations.revoke(licenseData.license_key)
+        else:
+            license_token_revocations.discard(licenseData.license_key)
+
+    @staticmethod
+    def _is_expired(snapshot: License) -> bool:
+        #checked on the cached snapshot, so the hot path needs no extra query
+        if snapshot.is_expired:
+            return True
+        return snapshot.expiration_date is not None and snapshot.expiration_date <= datetime.now()
+
+    @staticmethod
+    def _current_use_counts(snapshot: License) -> int:
+        #sharded licenses keep a fresher slot sum in the counter than the folded use_counts column
+        if snapshot.counter_slots > 0:
+            return max(snapshot.use_counts, license_sharded_usage.cached_sum(snapshot.license_id) or 0)
+        return snapshot.use_counts
+
+    async def iter_verified_licenses(
+        self,
+        raw_license_keys: List[str]
+    ) -> AsyncGenerator[List[Optional[License]], None]:
+        """
+        Verifies the given keys chunk by chunk, yielding one result per key in input order.
+        Cache misses of a chunk are resolved with a single IN (...) query.
+        """
+        chunk_size = settings.LICENSE_BULK_VALIDATE_CHUNK_SIZE
+        for start in range(0, len(raw_license_keys), chunk_size):
+            hashed_keys = [
+                convert_to_hashed_license_key(raw_license_key)
+                for raw_license_key in raw_license_keys[start:start + chunk_size]
+            ]
+
+            snapshots = {}
+            missing_keys = []
+            for hashed_key in hashed_keys:
+                snapshot = license_cache.get(hashed_key)
+                if snapshot is None:
+                    missing_keys.append(hashed_key)
+                else:
+                    snapshots[hashed_key] = snapshot
+
+            #keys the filter has never seen cannot exist, they are left out of the query
+            missing_keys = [hashed_key for hashed_key in set(missing_keys) if license_key_filter.might_exist(hashed_key)]
+            #keys written moments ago are read from the primary, a replica may still return the old row
+            primary_keys = [hashed_key for hashed_key in missing_keys if license_cache.recently_invalidated(hashed_key)]
+            replica_keys = [hashed_key for hashed_key in missing_keys if not license_cache.recently_invalidated(hashed_key)]
+            loaded = await self.license_repo.get_licenses_by_keys(replica_keys)
+            loaded += await self.license_repo.get_licenses_by_keys(primary_keys, use_primary=True)
+            for licenseData in loaded:
+                snapshot = License.model_validate(licenseData)
+                license_cache.put(licenseData.license_key, snapshot)
+                snapshots[licenseData.license_key] = snapshot
+
+            results = []
+            for hashed_key in hashed_keys:
+                snapshot = snapshots.get(hashed_key)
+                if (
+                    snapshot is None
+                    or self._current_use_counts(snapshot) >= snapshot.use_limit
+                    or self._is_expired(snapshot)
+                ):
+                    results.append(None)
+                else:
+                    results.append(snapshot)
+            yield results
+
+    async def get_license_snapshot(self, hashed_license_key: str) -> Optional[License]:
+        #served from the in-process cache, falls back to the DB and populates the cache
+        snapshot = license_cache.get(hashed_license_key)
+        if snapshot is not None:
+            return snapshot
+
+        if not license_key_filter.might_exist(hashed_license_key):
+            return None
+
+        #after a write this request has to read its own write from the primary, so it does not join
+        if self.license_repo.has_written:
+            licenseData : LicenseSchema = await self.license_repo.get_license_by_key(hashed_license_key)
+            return self._cache_snapshot(hashed_license_key, licenseData)
+
+        return await license_lookup_flight.do(
+            hashed_license_key,
+            lambda: self._load_snapshot(hashed_license_key)
+        )
+
+    @classmethod
+    async def _load_snapshot(cls, hashed_license_key: str) -> Optional[License]:
+        #runs in its own session, the shared lookup must not depend on the session of whichever request started it
+        #right after an invalidation a lagged replica could put the pre-write row back for the whole TTL
+        sessionmaker = AsyncSessionLocal if license_cache.recently_invalidated(hashed_license_key) else get_read_sessionmaker()
+        async with sessionmaker() as session:
+            licenseData : LicenseSchema = await LicenseRepository(db=session).get_license_by_key(hashed_license_key)
+            return cls._cache_snapshot(hashed_license_key, licenseData)
+
+    @staticmethod
+    def _cache_snapshot(hashed_license_key: str, licenseData: Optional[LicenseSchema]) -> Optional[License]:
+        if licenseData is None:
+            return None
+        snapshot = License.model_validate(licenseData)
+        license_cache.put(hashed_license_key, snapshot)
+        return snapshot
+
     async def verify_and_use_license(
         self,
         raw_license_key: str,
-    ) -> Optional[License]:
+    ) -> bool:
         logging.debug("verifying a given license and incrementing the usage")
 
         hashed_license_key = convert_to_hashed_license_key(raw_license_key)
+        used, known = await self._use_license(hashed_license_key)
+        #made-up keys are not recorded, they would crowd real events out of the bounded buffer
+        if settings.LICENSE_USAGE_EVENTS_ENABLED and known:
+            license_usage_events.record(hashed_license_key, used)
 
-        licenseData : LicenseSchema = await self.license_repo.get_license_by_key(hashed_license_key)
-        
-        if licenseData is None:
-            return None
-        
-        if licenseData.use_counts >= licenseData.use_limit:
+        #a rejected token stays rejected until an admin resets or raises its limit
+        if not used and is_signed_license_token(raw_license_key):
+            license_token_revocations.revoke(hashed_license_key)
+        return used
+
+    async def _use_license(self, hashed_license_key: str) -> Tuple[bool, bool]:
+        """
+        Returns (used, known): whether the use was accepted, and whether the key
+        resolved to a license at all.
+        """
+        #sharded licenses are known from the cache without a query
+        cached_snapshot = license_cache.get(hashed_license_key)
+        if cached_snapshot is not None and cached_snapshot.counter_slots > 0:
+            return await license_sharded_usage.try_use(cached_snapshot, self.license_repo), True
+
+        if settings.LICENSE_WRITE_BEHIND_ENABLED:
+            return await self._use_license_write_behind(hashed_license_key)
+
+        if cached_snapshot is None and not license_key_filter.might_exist(hashed_license_key):
+            return False, False
+
+        #limit, block and expiry are checked by the conditional update itself
+        used = await self.license_repo.increment_license_usage(hashed_license_key)
+        if used:
+            license_cache.invalidate(hashed_license_key)
+            return True, True
+
+        #the update also skips sharded licenses, only a rejected use pays for the lookup
+        snapshot = await self.get_license_snapshot(hashed_license_key)
+        if snapshot is not None and snapshot.counter_slots > 0:
+            return await license_sharded_usage.try_use(snapshot, self.license_repo), True
+        return False, snapshot is not None
+
+    async def _use_license_write_behind(self, hashed_license_key: str) -> Tuple[bool, bool]:
+        #the increment is checked against the cached snapshot and written by the periodic flush
+        if license_usage_write_behind.needs_flush(hashed_license_key):
+            await license_usage_write_behind.flush()
+
+        snapshot = await self.get_license_snapshot(hashed_license_key)
+        if snapshot is None:
+            return False, False
+        if snapshot.counter_slots > 0:
+            return await license_sharded_usage.try_use(snapshot, self.license_repo), True
+        return license_usage_write_behind.try_use(hashed_license_key, snapshot), True
+
+    async def issue_signed_license_token(
+        self,
+        license_type: LicenseType,
+        expiration_date: Optional[datetime] = None,
+        use_limit: int = 10
+    ) -> Optional[str]:
+        logger.debug("issuing a new signed license token")
+
+        #the expiry is signed into the token, so the default has to be resolved before signing
+        if expiration_date is None:
+            expiration_date = datetime.now() + relativedelta(months=1)
+
+        token = generate_signed_license_token(license_type.value, expiration_date, use_limit)
+        claims = decode_signed_license_token(token)
+
+        #the row still backs usage increments, admin operations and revocation
+        created = await self.convert_to_hashed_license_entry(
+            token,
+            expiration_date,
+            use_limit,
+            build_signed_token_hint(claims),
+            license_type.name
+        )
+        if created is None:
             return None
-    
+        return token
 
+    async def list_licenses(
+        self,
+        after_id: Optional[int] = None,
+        limit: int = 100,
+        is_used: Optional[bool] = None,
+        is_blocked: Optional[bool] = None,
+        search_query: Optional[str] = None
+    ) -> List[LicenseSchema]:
+        return await self.license_repo.get_all_licenses(
+            after_id=after_id,
+            limit=limit,
+            is_used=is_used,
+            is_blocked=is_blocked,
+            search_query=search_query
+        )
 
-        #on valid license, increase current usage by one - set db
-        licenseUpdate : LicenseUpdate = LicenseUpdate()
-        if (licenseData.use_counts >= 0):
-            licenseUpdate.is_used = True
-        licenseUpdate.use_counts = licenseData.use_counts + 1
-        return await self.license_repo.update_license(licenseData, licenseUpdate)
+    async def get_usage_analytics(
+        self,
+        start: datetime,
+        end: datetime,
+        hourly: bool = False,
+        license_type: Optional[LicenseType] = None,
+        license_id: Optional[int] = None
+    ) -> List[Any]:
+        #served from the rollup tables only, the event table is never scanned
+        if license_id is not None:
+            return await self.usage_repo.get_license_usage(license_id, start, end, daily=not hourly)
+        return await self.usage_repo.get_daily_usage_by_type(
+            start.date(),
+            end.date(),
+            license_type.name if license_type is not None else None
+        )
+
+    def stream_license_rows(
+        self,
+        columns: List[str],
+        is_used: Optional[bool] = None,
+        is_blocked: Optional[bool] = None
+    ) -> AsyncGenerator[Mapping[str, Any], None]:
+        return self.license_repo.stream_licenses(
+            columns,
+            is_used=is_used,
+            is_blocked=is_blocked,
+            yield_per=settings.LICENSE_EXPORT_YIELD_PER
+        )
 
     async def convert_to_hashed_license_entry(
         self,
@@ -76,7 +352,7 @@ class LicenseService:
         hashed_key = convert_to_hashed_license_key(raw_key)
 
         if (expiration_date is None):
-            expiration_date = datetime.now + relativedelta(months=1)
+            expiration_date = datetime.now() + relativedelta(months=1)
 
         license_data = LicenseCreate(
             license_key=hashed_key,
@@ -89,6 +365,8 @@ class LicenseService:
         #Add into DB
         try:
             created_orm_license: License = await self.license_repo.create_license(license_data)
+            license_cache.invalidate(hashed_key)
+            license_key_filter.add(hashed_key)
             logger.debug(f"Created ORM License: {created_orm_license}")
             created_orm_license.license_key = "" #Security! Do not disclose license_key
             return created_orm_license
@@ -99,13 +377,68 @@ class LicenseService:
             logger.error(f"An unexpected error occurred during license creation: {e}", exc_info=True)
             return None
         
+    async def convert_to_hashed_license_entries(
+        self,
+        license_requests: List[LicenseGenerateRequest]
+    ) -> List[LicenseBatchItemStatus]:
+        logger.debug(f"creating {len(license_requests)} licenses in batch")
+
+        statuses = [LicenseBatchItemStatus.FAILED] * len(license_requests)
+        default_expiration_date = datetime.now() + relativedelta(months=1)
+
+        #hash and validate everything up front, duplicates inside the batch are reported per item
+        pending = []
+        seen_keys = set()
+        for index, license_request in enumerate(license_requests):
+            hashed_key = convert_to_hashed_license_key(license_request.raw_key)
+            if hashed_key in seen_keys:
+                statuses[index] = LicenseBatchItemStatus.DUPLICATE
+                continue
+            seen_keys.add(hashed_key)
+
+            try:
+                license_data = LicenseCreate(
+                    license_key=hashed_key,
+                    license_type=license_request.license_type.name,
+                    license_key_hint=build_license_key_hint(license_request.raw_key),
+                    expiration_date=license_request.expiration_date or default_expiration_date,
+                    use_limit=license_request.use_limit
+                )
+            except ValidationError as e:
+                logger.info(f"Invalid license data at batch index {index}: {e}")
+                continue
+            pending.append((index, license_data))
+
+        #one multi-row insert and one transaction per chunk
+        chunk_size = settings.LICENSE_BATCH_CHUNK_SIZE
+        for start in range(0, len(pending), chunk_size):
+            chunk = pending[start:start + chunk_size]
+            try:
+                inserted_keys = await self.license_repo.create_licenses_bulk(
+                    [license_data for _, license_data in chunk]
+                )
+            except Exception as e:
+                logger.error(f"Batch license insert failed for items {start}-{start + len(chunk) - 1}: {e}", exc_info=True)
+                await self.db.rollback()
+                continue
+
+            for hashed_key in inserted_keys:
+                license_key_filter.add(hashed_key)
+            for index, license_data in chunk:
+                if license_data.license_key in inserted_keys:
+                    statuses[index] = LicenseBatchItemStatus.CREATED
+                else:
+                    statuses[index] = LicenseBatchItemStatus.DUPLICATE
+
+        return statuses
+
     async def toggle_license(self, license_key_raw : str, toggleBlock: bool) -> bool:
         logger.debug(f"Setting toggle to disable/enable license use")
 
         hashed_key = convert_to_hashed_license_key(license_key_raw)
 
         #first, verify if licnese exists
-        licenseData : LicenseSchema = await self.license_repo.get_license_by_key(hashed_key)
+        licenseData : LicenseSchema = await self.license_repo.get_license_by_key(hashed_key, use_primary=True)
 
         if licenseData is None:
             logger.info(f"License not found. provided licnese key={license_key_raw}")
@@ -120,13 +453,15 @@ class LicenseService:
             await self.license_repo.block_license(licenseData)
         else:
             await self.license_repo.unblock_license(licenseData)
+        license_cache.invalidate(hashed_key)
+        self._sync_token_revocation(licenseData)
         return True
     
     async def reset_usage(self, license_key_raw: str) -> bool:
         logger.debug(f"Resetting license key usage")
 
         hashed_key = convert_to_hashed_license_key(license_key_raw)
-        licenseData : LicenseSchema = await self.license_repo.get_license_by_key(hashed_key)
+        licenseData : LicenseSchema = await self.license_repo.get_license_by_key(hashed_key, use_primary=True)
 
         if licenseData is None:
             logger.info(f"License not found. provided licnese key={license_key_raw}")
@@ -135,13 +470,18 @@ class LicenseService:
         licenseUpdate : LicenseUpdate = LicenseUpdate()
         licenseUpdate.use_counts = 0
         await self.license_repo.update_license(licenseData, licenseUpdate)
+        if licenseData.counter_slots > 0:
+            await self.license_repo.reset_sharded_usage(licenseData.license_id)
+            license_sharded_usage.forget(licenseData.license_id)
+        license_cache.invalidate(hashed_key)
+        self._sync_token_revocation(licenseData)
         return True
     
     async def increase_usage_limit(self, license_key_raw: str, increase_amt: int) -> bool:
         logger.debug(f"Increasing license key usage limit")
 
         hashed_key = convert_to_hashed_license_key(license_key_raw)
-        licenseData : LicenseSchema = await self.license_repo.get_license_by_key(hashed_key)
+        licenseData : LicenseSchema = await self.license_repo.get_license_by_key(hashed_key, use_primary=True)
 
         if licenseData is None or licenseData.use_limit is None:
             logger.info(f"License not found. provided licnese key={license_key_raw}")
@@ -150,6 +490,8 @@ class LicenseService:
         licenseUpdate : LicenseUpdate = LicenseUpdate()
         licenseUpdate.use_limit = licenseData.use_limit + increase_amt
         await self.license_repo.update_license(licenseData, licenseUpdate)
+        license_cache.invalidate(hashed_key)
+        self._sync_token_revocation(licenseData)
         return True
     
 
@@ -157,7 +499,7 @@ class LicenseService:
         logger.debug(f"Decreasing license key usage limit")
 
         hashed_key = convert_to_hashed_license_key(license_key_raw)
-        licenseData : LicenseSchema = await self.license_repo.get_license_by_key(hashed_key)
+        licenseData : LicenseSchema = await self.license_repo.get_license_by_key(hashed_key, use_primary=True)
 
         if licenseData is None:
             logger.info(f"License not found. provided licnese key={license_key_raw}")
@@ -174,4 +516,21 @@ class LicenseService:
             logger.warning(f"You are decresing the limit under the current usage for license_key={license_key_raw}")
 
         await self.license_repo.update_license(licenseData, licenseUpdate)
+        license_cache.invalidate(hashed_key)
+        self._sync_token_revocation(licenseData)
+        return True
+
+    async def set_counter_slots(self, license_key_raw: str, counter_slots: int) -> bool:
+        logger.debug(f"Setting license usage counter slots to {counter_slots}")
+
+        hashed_key = convert_to_hashed_license_key(license_key_raw)
+        licenseData : LicenseSchema = await self.license_repo.get_license_by_key(hashed_key, use_primary=True)
+
+        if licenseData is None:
+            logger.info(f"License not found. provided licnese key={license_key_raw}")
+            return False
+
+        await self.license_repo.set_counter_slots(licenseData, counter_slots)
+        license_sharded_usage.forget(licenseData.license_id)
+        license_cache.invalidate(hashed_key)
         return True
\ No newline at end of file
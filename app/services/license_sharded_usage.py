@@ -0,0 +1,102 @@
+import random
+import time
+from datetime import datetime
+from typing import Any, Dict, List, Optional
+
+from app.core.config import settings
+from app.core.database import AsyncSessionLocal
+from app.models.license import License
+from app.repositories.license_repository import LicenseRepository
+from app.utils.single_flight import SingleFlight
+import logging
+
+logger = logging.getLogger(__name__)
+
+class LicenseShardedUsageCounter:
+    """
+    Usage counting for licenses whose use_counts is spread over counter_slots slot rows.
+
+    The limit check runs against a cached slot sum per license. Increments made by this
+    worker are added to the cached sum right away, increments made by other workers are
+    picked up when the sum is re-read every refresh_seconds. Concurrent requests that find
+    the sum stale share one re-read per license, so the fold's row lock is taken once.
+    """
+
+    def __init__(self, refresh_seconds: float):
+        self.refresh_seconds = refresh_seconds
+        # license_id -> [cached slot sum, monotonic time of the last full read]
+        self._sums: Dict[int, List[float]] = {}
+        self._refresh_flight = SingleFlight()
+
+        self.accepted = 0
+        self.rejected = 0
+        self.sum_refreshes = 0
+
+    def cached_sum(self, license_id: int) -> Optional[int]:
+        entry = self._sums.get(license_id)
+        return int(entry[0]) if entry is not None else None
+
+    def forget(self, license_id: int) -> None:
+        self._sums.pop(license_id, None)
+
+    async def _current_sum(self, snapshot: License) -> int:
+        entry = self._sums.get(snapshot.license_id)
+        if entry is not None and time.monotonic() - entry[1] < self.refresh_seconds:
+            return int(entry[0])
+
+        return await self._refresh_flight.do(snapshot.license_id, lambda: self._refresh_sum(snapshot.license_id))
+
+    async def _refresh_sum(self, license_id: int) -> int:
+        #runs in its own session, the shared refresh must not depend on the session of whichever request started it
+        async with AsyncSessionLocal() as session:
+            license_repo = LicenseRepository(db=session)
+            total = await license_repo.get_sharded_usage_sum(license_id)
+            await license_repo.fold_sharded_usage(license_id, total)
+        # keep local reservations made while the sum was being read
+        entry = self._sums.get(license_id)
+        if entry is not None and entry[0] > total:
+            total = int(entry[0])
+        self._sums[license_id] = [total, time.monotonic()]
+        self.sum_refreshes += 1
+        return total
+
+    async def try_use(self, snapshot: License, license_repo: LicenseRepository) -> bool:
+        if snapshot.is_blocked:
+            self.rejected += 1
+            return False
+        if snapshot.expiration_date is not None and snapshot.expiration_date <= datetime.now():
+            self.rejected += 1
+            return False
+
+        if await self._current_sum(snapshot) >= snapshot.use_limit:
+            self.rejected += 1
+            return False
+
+        #reserve before awaiting the insert so concurrent requests see the increment
+        entry = self._sums[snapshot.license_id]
+        entry[0] += 1
+        try:
+            await license_repo.increment_sharded_usage(
+                snapshot.license_id,
+                random.randrange(max(1, snapshot.counter_slots))
+            )
+        except Exception:
+            entry[0] -= 1
+            raise
+
+        self.accepted += 1
+        return True
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            "trackedLicenses": len(self._sums),
+            "accepted": self.accepted,
+            "rejected": self.rejected,
+            "sumRefreshes": self.sum_refreshes,
+            "refreshFlight": self._refresh_flight.stats(),
+        }
+
+
+license_sharded_usage = LicenseShardedUsageCounter(
+    refresh_seconds=settings.LICENSE_SHARDED_SUM_REFRESH_SECONDS,
+)
@@ -0,0 +1,111 @@
+import asyncio
+import time
+from typing import Any, Dict, List, Optional, Tuple
+
+from app.core.config import settings
+from sqlalchemy import text
+
+from app.core.database import AsyncSessionLocal, async_engine
+from app.models.schema.license_schema import LicenseStats
+from app.repositories.license_repository import LicenseRepository
+import logging
+
+logger = logging.getLogger(__name__)
+
+# only one process at a time recomputes, the others skip their turn
+STATS_REPAIR_LOCK_NAME = "event_bridge_license_stats_repair"
+
+class LicenseStatsSummary:
+    """
+    Serves the per license type counters of client_download_license_stats with a short
+    response cache, and optionally recomputes the table in the background to repair any
+    drift (manual SQL, failed migrations, bugs). The repair goes one license type at a
+    time and runs in a single process, guarded by a MySQL named lock.
+    """
+
+    def __init__(self, cache_ttl_seconds: float, repair_interval_seconds: float):
+        self.cache_ttl_seconds = cache_ttl_seconds
+        self.repair_interval_seconds = repair_interval_seconds
+        self._cached: Optional[Tuple[float, List[Dict[str, Any]]]] = None
+        self._task: Optional[asyncio.Task] = None
+
+        self.cache_hits = 0
+        self.cache_misses = 0
+        self.repairs = 0
+        self.repairs_skipped = 0
+        self.last_repair_seconds = 0.0
+
+    async def get(self, license_repo: LicenseRepository) -> List[Dict[str, Any]]:
+        cached = self._cached
+        if cached is not None and cached[0] > time.monotonic():
+            self.cache_hits += 1
+            return cached[1]
+
+        self.cache_misses += 1
+        rows = [
+            {"license_type": stats.license_type, **{column: getattr(stats, column) for column in LicenseStats.COUNTER_COLUMNS}}
+            for stats in await license_repo.get_license_stats()
+        ]
+        self._cached = (time.monotonic() + self.cache_ttl_seconds, rows)
+        return rows
+
+    async def repair(self) -> int:
+        started_at = time.perf_counter()
+        #the named lock belongs to this connection, so it is held on its own connection
+        #while the recompute commits per license type in a session
+        async with async_engine.connect() as lock_conn:
+            result = await lock_conn.execute(text("SELECT GET_LOCK(:name, 0)"), {"name": STATS_REPAIR_LOCK_NAME})
+            if result.scalar_one() != 1:
+                self.repairs_skipped += 1
+                logger.info("License stats repair is running in another process, skipped")
+                return 0
+            try:
+                async with AsyncSessionLocal() as session:
+                    license_types = await LicenseRepository(db=session).recompute_license_stats()
+            finally:
+                await lock_conn.execute(text("SELECT RELEASE_LOCK(:name)"), {"name": STATS_REPAIR_LOCK_NAME})
+                await lock_conn.commit()
+        self._cached = None
+        self.repairs += 1
+        self.last_repair_seconds = time.perf_counter() - started_at
+        logger.info(f"License stats recomputed for {license_types} license types in {self.last_repair_seconds:.2f}s")
+        return license_types
+
+    async def _run(self) -> None:
+        while True:
+            await asyncio.sleep(self.repair_interval_seconds)
+            try:
+                await self.repair()
+            except Exception as e:
+                logger.error(f"License stats repair failed: {e}", exc_info=True)
+
+    def start(self) -> None:
+        if self._task is None:
+            logger.info(f"Starting license stats repair, running every {self.repair_interval_seconds}s")
+            self._task = asyncio.create_task(self._run())
+
+    async def stop(self) -> None:
+        if self._task is None:
+            return
+        self._task.cancel()
+        try:
+            await self._task
+        except asyncio.CancelledError:
+            pass
+        self._task = None
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            "repairEnabled": settings.LICENSE_STATS_REPAIR_ENABLED,
+            "cacheHits": self.cache_hits,
+            "cacheMisses": self.cache_misses,
+            "repairs": self.repairs,
+            "repairsSkipped": self.repairs_skipped,
+            "lastRepairSeconds": self.last_repair_seconds,
+        }
+
+
+license_stats_summary = LicenseStatsSummary(
+    cache_ttl_seconds=settings.LICENSE_STATS_CACHE_TTL_SECONDS,
+    repair_interval_seconds=settings.LICENSE_STATS_REPAIR_INTERVAL_SECONDS,
+)
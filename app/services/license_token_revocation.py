@@ -0,0 +1,83 @@
+import asyncio
+from typing import Any, Dict, Optional, Set
+
+from app.core.config import settings
+from app.core.database import get_read_sessionmaker
+from app.repositories.license_repository import LicenseRepository
+import logging
+
+logger = logging.getLogger(__name__)
+
+# license_key_hint prefix of licenses issued as signed tokens
+SIGNED_TOKEN_HINT_PREFIX = "TKN-"
+
+class LicenseTokenRevocationSet:
+    """
+    Hashed keys of signed-token licenses that must no longer validate (blocked or used up).
+    Reloaded periodically from the DB; changes made by this process are applied right away.
+    Until the first load succeeds, tokens are verified through the DB like any other key.
+    """
+
+    def __init__(self, refresh_seconds: float):
+        self.refresh_seconds = refresh_seconds
+        self._revoked: Set[str] = set()
+        self._task: Optional[asyncio.Task] = None
+
+        self.loaded = False
+        self.refreshes = 0
+        self.refresh_failures = 0
+
+    def is_revoked(self, hashed_license_key: str) -> bool:
+        return hashed_license_key in self._revoked
+
+    def revoke(self, hashed_license_key: str) -> None:
+        self._revoked.add(hashed_license_key)
+
+    def discard(self, hashed_license_key: str) -> None:
+        self._revoked.discard(hashed_license_key)
+
+    async def refresh(self) -> int:
+        async with get_read_sessionmaker()() as session:
+            revoked = await LicenseRepository(db=session).get_revoked_license_keys(SIGNED_TOKEN_HINT_PREFIX)
+        #swapped in one assignment, readers never see a half-built set
+        self._revoked = revoked
+        self.loaded = True
+        self.refreshes += 1
+        return len(revoked)
+
+    async def _run(self) -> None:
+        while True:
+            try:
+                await self.refresh()
+            except Exception as e:
+                self.refresh_failures += 1
+                logger.error(f"License token revocation refresh failed: {e}", exc_info=True)
+            await asyncio.sleep(self.refresh_seconds)
+
+    def start(self) -> None:
+        if self._task is None:
+            logger.info(f"Starting license token revocation refresh, running every {self.refresh_seconds}s")
+            self._task = asyncio.create_task(self._run())
+
+    async def stop(self) -> None:
+        if self._task is None:
+            return
+        self._task.cancel()
+        try:
+            await self._task
+        except asyncio.CancelledError:
+            pass
+        self._task = None
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            "loaded": self.loaded,
+            "revokedCount": len(self._revoked),
+            "refreshes": self.refreshes,
+            "refreshFailures": self.refresh_failures,
+        }
+
+
+license_token_revocations = LicenseTokenRevocationSet(
+    refresh_seconds=settings.LICENSE_TOKEN_REVOCATION_REFRESH_SECONDS,
+)
@@ -0,0 +1,123 @@
+import asyncio
+from collections import deque
+from datetime import datetime
+from typing import Any, Deque, Dict, Optional, Tuple
+
+from app.core.config import settings
+from app.core.database import AsyncSessionLocal
+from app.repositories.license_usage_repository import LicenseUsageRepository
+import logging
+
+logger = logging.getLogger(__name__)
+
+class LicenseUsageEventRecorder:
+    """
+    Buffers license use attempts in memory and writes them periodically as batched
+    event inserts plus incremental hourly and daily rollup upserts.
+    Recording is a plain append, so the usage path gets no extra round trip.
+    The buffer is bounded; when the DB falls behind, new events are dropped and counted,
+    and a failed batch is put back only as far as the bound allows.
+    """
+
+    def __init__(self, flush_interval_ms: int, flush_batch_size: int, max_buffered: int):
+        self.flush_interval_seconds = flush_interval_ms / 1000
+        self.flush_batch_size = flush_batch_size
+        self.max_buffered = max_buffered
+        self._buffer: Deque[Tuple[str, datetime, bool]] = deque()
+        self._flush_lock = asyncio.Lock()
+        self._task: Optional[asyncio.Task] = None
+
+        self.recorded = 0
+        self.dropped = 0
+        self.unknown_keys = 0
+        self.flushes = 0
+        self.flushed_events = 0
+        self.failed_flushes = 0
+
+    def record(self, hashed_license_key: str, accepted: bool) -> None:
+        if len(self._buffer) >= self.max_buffered:
+            self.dropped += 1
+            return
+        self._buffer.append((hashed_license_key, datetime.now(), accepted))
+        self.recorded += 1
+
+    async def flush(self) -> None:
+        async with self._flush_lock:
+            while self._buffer:
+                batch = [self._buffer.popleft() for _ in range(min(self.flush_batch_size, len(self._buffer)))]
+                try:
+                    async with AsyncSessionLocal() as session:
+                        usage_repo = LicenseUsageRepository(db=session)
+                        #license_id and license_type are resolved here, not on the usage path
+                        license_refs = await usage_repo.get_license_refs(list({key for key, _, _ in batch}))
+                        events = []
+                        for hashed_license_key, used_at, accepted in batch:
+                            license_ref = license_refs.get(hashed_license_key)
+                            if license_ref is None:
+                                self.unknown_keys += 1
+                                continue
+                            events.append({
+                                "license_id": license_ref[0],
+                                "license_type": license_ref[1],
+                                "used_at": used_at,
+                                "accepted": accepted
+                            })
+                        await usage_repo.record_usage_events(events)
+                    self.flushes += 1
+                    self.flushed_events += len(events)
+                except Exception as e:
+                    self.failed_flushes += 1
+                    logger.error(f"Failed to write {len(batch)} license usage events, retrying on next flush: {e}", exc_info=True)
+                    #put back in order at the front, as much as fits under the buffer bound;
+                    #the oldest events of the batch are the ones dropped and counted
+                    room = max(0, self.max_buffered - len(self._buffer))
+                    requeued = batch[len(batch) - room:] if room else []
+                    self.dropped += len(batch) - len(requeued)
+                    self._buffer.extendleft(reversed(requeued))
+                    return
+
+    async def _run(self) -> None:
+        while True:
+            await asyncio.sleep(self.flush_interval_seconds)
+            try:
+                await self.flush()
+            except Exception as e:
+                logger.error(f"License usage event flush loop error: {e}", exc_info=True)
+
+    def start(self) -> None:
+        if self._task is None:
+            logger.info(f"Starting license usage event recorder, flushing every {self.flush_interval_seconds}s")
+            self._task = asyncio.create_task(self._run())
+
+    async def stop(self, timeout_seconds: float) -> None:
+        if self._task is not None:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+            self._task = None
+
+        try:
+            await asyncio.wait_for(self.flush(), timeout=timeout_seconds)
+        except asyncio.TimeoutError:
+            logger.error(f"Final license usage event flush timed out, {len(self._buffer)} events were not written")
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            "enabled": settings.LICENSE_USAGE_EVENTS_ENABLED,
+            "buffered": len(self._buffer),
+            "recorded": self.recorded,
+            "dropped": self.dropped,
+            "unknownKeys": self.unknown_keys,
+            "flushes": self.flushes,
+            "flushedEvents": self.flushed_events,
+            "failedFlushes": self.failed_flushes,
+        }
+
+
+license_usage_events = LicenseUsageEventRecorder(
+    flush_interval_ms=settings.LICENSE_USAGE_EVENT_FLUSH_INTERVAL_MS,
+    flush_batch_size=settings.LICENSE_USAGE_EVENT_FLUSH_BATCH_SIZE,
+    max_buffered=settings.LICENSE_USAGE_EVENT_MAX_BUFFERED,
+)
@@ -0,0 +1,142 @@
+import asyncio
+from datetime import datetime
+from typing import Any, Dict, Optional
+
+from app.core.config import settings
+from app.core.database import AsyncSessionLocal
+from app.models.license import License
+from app.repositories.license_repository import LicenseRepository
+from app.utils.license_cache import license_cache
+import logging
+
+logger = logging.getLogger(__name__)
+
+class LicenseUsageWriteBehind:
+    """
+    Accumulates accepted usage increments per hashed key in memory and writes them
+    to the DB periodically as one batched UPDATE per flush batch.
+
+    Increments are accepted against the cached license snapshot plus the deltas that
+    are not flushed yet. Other workers cannot see those deltas, so every worker may
+    overshoot a limit by at most max_overuse unflushed increments per key.
+    """
+
+    def __init__(self, flush_interval_ms: int, flush_batch_size: int, max_overuse: int):
+        self.flush_interval_seconds = flush_interval_ms / 1000
+        self.flush_batch_size = flush_batch_size
+        self.max_overuse = max(1, max_overuse)
+        self._pending: Dict[str, int] = {}
+        self._in_flight: Dict[str, int] = {}
+        self._flush_lock = asyncio.Lock()
+        self._task: Optional[asyncio.Task] = None
+        self._stopping = asyncio.Event()
+
+        self.accepted = 0
+        self.rejected = 0
+        self.flushes = 0
+        self.flushed_increments = 0
+        self.failed_flushes = 0
+
+    def unflushed_count(self, hashed_license_key: str) -> int:
+        return self._pending.get(hashed_license_key, 0) + self._in_flight.get(hashed_license_key, 0)
+
+    def needs_flush(self, hashed_license_key: str) -> bool:
+        return self._pending.get(hashed_license_key, 0) >= self.max_overuse
+
+    def try_use(self, hashed_license_key: str, snapshot: License) -> bool:
+        #no awaits in here, so the check and the increment cannot interleave with other requests
+        if snapshot.is_blocked:
+            self.rejected += 1
+            return False
+        if snapshot.expiration_date is not None and snapshot.expiration_date <= datetime.now():
+            self.rejected += 1
+            return False
+        if self.needs_flush(hashed_license_key):
+            #flushing keeps failing, refuse rather than exceed the over-use budget
+            self.rejected += 1
+            return False
+
+        if snapshot.use_counts + self.unflushed_count(hashed_license_key) >= snapshot.use_limit:
+            self.rejected += 1
+            return False
+
+        self._pending[hashed_license_key] = self._pending.get(hashed_license_key, 0) + 1
+        self.accepted += 1
+        return True
+
+    async def flush(self) -> None:
+        async with self._flush_lock:
+            if not self._pending:
+                return
+            self._in_flight, self._pending = self._pending, {}
+
+            keys = list(self._in_flight.keys())
+            try:
+                for start in range(0, len(keys), self.flush_batch_size):
+                    batch = {key: self._in_flight[key] for key in keys[start:start + self.flush_batch_size]}
+                    try:
+                        async with AsyncSessionLocal() as session:
+                            await LicenseRepository(db=session).apply_usage_deltas(batch)
+                        self.flushes += 1
+                        self.flushed_increments += sum(batch.values())
+                        for key in batch:
+                            del self._in_flight[key]
+                            #the DB now holds these increments, the cached snapshot must be reloaded
+                            license_cache.invalidate(key)
+                    except Exception as e:
+                        self.failed_flushes += 1
+                        logger.error(f"Failed to flush {len(batch)} license usage deltas, retrying on next flush: {e}", exc_info=True)
+            finally:
+                #failed batches, and the rest of a flush cancelled by the shutdown timeout, go back to pending
+                for key, delta in self._in_flight.items():
+                    self._pending[key] = self._pending.get(key, 0) + delta
+                self._in_flight = {}
+
+    async def _run(self) -> None:
+        while not self._stopping.is_set():
+            try:
+                await asyncio.wait_for(self._stopping.wait(), timeout=self.flush_interval_seconds)
+                return
+            except asyncio.TimeoutError:
+                pass
+            try:
+                await self.flush()
+            except Exception as e:
+                logger.error(f"License usage write-behind flush loop error: {e}", exc_info=True)
+
+    def start(self) -> None:
+        if self._task is None:
+            logger.info(f"Starting license usage write-behind, flushing every {self.flush_interval_seconds}s")
+            self._task = asyncio.create_task(self._run())
+
+    async def stop(self, timeout_seconds: float) -> None:
+        if self._task is not None:
+            #a running flush finishes its batches instead of being cancelled halfway
+            self._stopping.set()
+            await self._task
+            self._task = None
+            self._stopping.clear()
+
+        try:
+            await asyncio.wait_for(self.flush(), timeout=timeout_seconds)
+        except asyncio.TimeoutError:
+            logger.error(f"Final license usage flush timed out, {sum(self._pending.values())} increments were not written")
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            "enabled": settings.LICENSE_WRITE_BEHIND_ENABLED,
+            "pendingKeys": len(self._pending),
+            "pendingIncrements": sum(self._pending.values()),
+            "accepted": self.accepted,
+            "rejected": self.rejected,
+            "flushes": self.flushes,
+            "flushedIncrements": self.flushed_increments,
+            "failedFlushes": self.failed_flushes,
+        }
+
+
+license_usage_write_behind = LicenseUsageWriteBehind(
+    flush_interval_ms=settings.LICENSE_WRITE_BEHIND_FLUSH_INTERVAL_MS,
+    flush_batch_size=settings.LICENSE_WRITE_BEHIND_FLUSH_BATCH_SIZE,
+    max_overuse=settings.LICENSE_WRITE_BEHIND_MAX_OVERUSE,
+)
@@ -0,0 +1,238 @@
+import asyncio
+import time
+from collections import OrderedDict
+from typing import Any, Dict, Optional, Tuple
+
+from slack_sdk.errors import SlackApiError
+from slack_sdk.web.async_client import AsyncWebClient
+
+from app.core.config import settings
+from app.utils.single_flight import SingleFlight
+import logging
+
+logger = logging.getLogger(__name__)
+
+CHANNEL_NAME_PREFIX = "#"
+CONVERSATIONS_LIST_PAGE_SIZE = 1000 # the most Slack returns per page
+CONVERSATIONS_LIST_TYPES = "public_channel,private_channel"
+
+class SlackChannelDirectory:
+    """
+    Per-worker cache of Slack channel metadata. conversations.info results are kept for
+    info_ttl_seconds in a size-bounded LRU map, and a name -> ID index is built by paging
+    conversations.list, refreshed in the background every refresh_seconds. Lookups are
+    dict reads; an unknown name or a channel_not_found forces a refresh, at most once per
+    min_refresh_interval_seconds and shared by every caller waiting on it.
+    """
+
+    def __init__(
+        self,
+        info_ttl_seconds: float,
+        info_max_entries: int,
+        refresh_seconds: float,
+        min_refresh_interval_seconds: float
+    ):
+        self.info_ttl_seconds = info_ttl_seconds
+        self.info_max_entries = info_max_entries
+        self.refresh_seconds = refresh_seconds
+        self.min_refresh_interval_seconds = min_refresh_interval_seconds
+        self._info: "OrderedDict[str, Tuple[float, Dict[str, Any]]]" = OrderedDict()
+        self._name_to_id: Dict[str, str] = {}
+        self._last_refresh_at = 0.0 # monotonic, 0 until the first refresh
+        self._refresh_flight = SingleFlight()
+        self._slack_client: Optional[AsyncWebClient] = None
+        self._task: Optional[asyncio.Task] = None
+        self._forced_refresh_task: Optional[asyncio.Task] = None
+
+        self.info_hits = 0
+        self.info_misses = 0
+        self.name_hits = 0
+        self.name_misses = 0
+        self.refreshes = 0
+        self.forced_refreshes = 0
+        self.refresh_errors = 0
+        self.channel_not_found = 0
+
+    @staticmethod
+    def is_channel_name(channel: str) -> bool:
+        return channel.startswith(CHANNEL_NAME_PREFIX)
+
+    @staticmethod
+    def normalize_name(channel: str) -> str:
+        return channel[len(CHANNEL_NAME_PREFIX):].strip().lower()
+
+    def _cache_info(self, channel: Dict[str, Any], now: float) -> None:
+        self._info[channel["id"]] = (now + self.info_ttl_seconds, channel)
+        self._info.move_to_end(channel["id"])
+        while len(self._info) > self.info_max_entries:
+            self._info.popitem(last=False)
+
+    async def get_info(self, slack_client: AsyncWebClient, channel_id: str) -> Optional[Dict[str, Any]]:
+        """
+        Returns the conversations.info channel object, from the cache while it is fresh.
+        Raises SlackApiError like the client does; failures are not cached.
+        """
+        now = time.monotonic()
+        cached = self._info.get(channel_id)
+        if cached is not None and cached[0] > now:
+            self.info_hits += 1
+            return cached[1]
+
+        self.info_misses += 1
+        result = await slack_client.conversations_info(channel=channel_id)
+        channel = result.get("channel")
+        if channel:
+            self._cache_info(channel, time.monotonic())
+        return channel
+
+    async def _list_channels(self, slack_client: AsyncWebClient) -> Dict[str, str]:
+        name_to_id: Dict[str, str] = {}
+        cursor = None
+        now = time.monotonic()
+        while True:
+            try:
+                result = await slack_client.conversations_list(
+                    types=CONVERSATIONS_LIST_TYPES,
+                    exclude_archived=True,
+                    limit=CONVERSATIONS_LIST_PAGE_SIZE,
+                    cursor=cursor
+                )
+            except SlackApiError as e:
+                if e.response.get("error") != "ratelimited":
+                    raise
+                #conversations.list is a tier 2 method, wait as told and ask for the same page again
+                retry_after = e.response.headers.get("Retry-After") or e.response.headers.get("retry-after") or 1
+                await asyncio.sleep(float(retry_after))
+                continue
+
+            for channel in result.get("channels", []):
+                name_to_id[channel["name"].lower()] = channel["id"]
+                #the list returns the same channel objects as conversations.info
+                self._cache_info(channel, now)
+            cursor = (result.get("response_metadata") or {}).get("next_cursor")
+            if not cursor:
+                return name_to_id
+
+    async def _do_refresh(self, slack_client: AsyncWebClient) -> None:
+        try:
+            name_to_id = await self._list_channels(slack_client)
+        except Exception:
+            self.refresh_errors += 1
+            raise
+        finally:
+            #a failed refresh also waits out the interval, so it does not hammer Slack
+            self._last_refresh_at = time.monotonic()
+        self._name_to_id = name_to_id
+        self.refreshes += 1
+        logger.info(f"Slack channel index refreshed: {len(name_to_id)} channels")
+
+    async def refresh(self, slack_client: Optional[AsyncWebClient] = None, force: bool = False) -> bool:
+        """
+        Rebuilds the name index. A forced refresh is skipped if the last one is more recent
+        than min_refresh_interval_seconds; returns whether a refresh ran or was joined.
+        """
+        slack_client = slack_client or self._slack_client
+        if slack_client is None:
+            return False
+        if force:
+            if time.monotonic() - self._last_refresh_at < self.min_refresh_interval_seconds:
+                return False
+            self.forced_refreshes += 1
+        await self._refresh_flight.do("refresh", lambda: self._do_refresh(slack_client))
+        return True
+
+    async def resolve(self, channel: str, slack_client: Optional[AsyncWebClient] = None) -> Optional[str]:
+        """
+        Maps "#name" to its channel ID, anything else is returned as it is.
+        Returns None for a name that is unknown even after a forced refresh.
+        """
+        if not self.is_channel_name(channel):
+            return channel
+        name = self.normalize_name(channel)
+        channel_id = self._name_to_id.get(name)
+        if channel_id is not None:
+            self.name_hits += 1
+            return channel_id
+
+        self.name_misses += 1
+        try:
+            #a channel created since the last refresh
+            await self.refresh(slack_client, force=True)
+        except Exception as e:
+            logger.error(f"Failed to refresh Slack channel index for {channel}: {e}", exc_info=True)
+        return self._name_to_id.get(name)
+
+    def invalidate(self, channel_id: str) -> None:
+        """
+        Drops what is cached about a channel Slack no longer knows, so the next refresh
+        maps its name to whatever channel has it now.
+        """
+        self.channel_not_found += 1
+        self._info.pop(channel_id, None)
+        for name, cached_id in list(self._name_to_id.items()):
+            if cached_id == channel_id:
+                del self._name_to_id[name]
+
+    def handle_channel_not_found(self, channel_id: str, slack_client: Optional[AsyncWebClient] = None) -> None:
+        # called from the post path, the refresh runs in the background instead of delaying the caller
+        self.invalidate(channel_id)
+        if self._forced_refresh_task is None or self._forced_refresh_task.done():
+            self._forced_refresh_task = asyncio.create_task(self._forced_refresh(slack_client))
+
+    async def _forced_refresh(self, slack_client: Optional[AsyncWebClient]) -> None:
+        try:
+            await self.refresh(slack_client, force=True)
+        except Exception as e:
+            logger.error(f"Failed to refresh Slack channel index after channel_not_found: {e}", exc_info=True)
+
+    async def _run(self) -> None:
+        while True:
+            try:
+                await self.refresh()
+            except Exception as e:
+                logger.error(f"Slack channel index refresh error: {e}", exc_info=True)
+            await asyncio.sleep(self.refresh_seconds)
+
+    def start(self, slack_client: AsyncWebClient) -> None:
+        self._slack_client = slack_client
+        if self._task is None:
+            logger.info(f"Starting Slack channel index, refreshing every {self.refresh_seconds}s")
+            self._task = asyncio.create_task(self._run())
+
+    async def stop(self) -> None:
+        if self._task is not None:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+            self._task = None
+        if self._forced_refresh_task is not None:
+            self._forced_refresh_task.cancel()
+            self._forced_refresh_task = None
+        self._slack_client = None
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            "indexEnabled": settings.SLACK_CHANNEL_INDEX_ENABLED,
+            "indexedChannels": len(self._name_to_id),
+            "lastRefreshAgeSeconds": time.monotonic() - self._last_refresh_at if self._last_refresh_at else None,
+            "cachedInfo": len(self._info),
+            "infoHits": self.info_hits,
+            "infoMisses": self.info_misses,
+            "nameHits": self.name_hits,
+            "nameMisses": self.name_misses,
+            "refreshes": self.refreshes,
+            "forcedRefreshes": self.forced_refreshes,
+            "refreshErrors": self.refresh_errors,
+            "channelNotFound": self.channel_not_found,
+            "refreshFlight": self._refresh_flight.stats(),
+        }
+
+
+slack_channel_directory = SlackChannelDirectory(
+    info_ttl_seconds=settings.SLACK_CHANNEL_INFO_TTL_SECONDS,
+    info_max_entries=settings.SLACK_CHANNEL_INFO_MAX_ENTRIES,
+    refresh_seconds=settings.SLACK_CHANNEL_INDEX_REFRESH_SECONDS,
+    min_refresh_interval_seconds=settings.SLACK_CHANNEL_INDEX_MIN_REFRESH_INTERVAL_SECONDS,
+)
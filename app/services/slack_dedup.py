@@ -0,0 +1,226 @@
+import asyncio
+import hashlib
+import json
+import time
+from collections import OrderedDict
+from typing import Any, Dict, List, Optional, Tuple
+
+from app.core.config import settings
+from app.core.database import AsyncSessionLocal
+from app.dto.slack_request_dto import SlackPostRequest
+from app.enums.slack_message_type import SlackMsgType
+from app.enums.slack_outbound_status import SlackOutboundStatus
+from app.repositories.slack_outbound_repository import SlackOutboundRepository
+from app.services.slack_outbound_queue import slack_outbound_queue
+from app.services.slack_service import SlackService
+import logging
+
+logger = logging.getLogger(__name__)
+
+# queued originals looked up per IN (...) query
+RESOLVE_BATCH_SIZE = 1000
+
+class _Fingerprint:
+    __slots__ = ("key", "channel", "thread_ts", "message_id", "slack_ts", "pending", "expires_at", "suppressed", "reported")
+
+    def __init__(self, key: bytes, channel: str, thread_ts: Optional[str], expires_at: float):
+        self.key = key
+        self.channel = channel
+        self.thread_ts = thread_ts
+        self.message_id: Optional[int] = None # queued original
+        self.slack_ts: Optional[str] = None # ts of the posted original, once known
+        self.pending = True # the original is not posted or given up on yet
+        self.expires_at = expires_at
+        self.suppressed = 0
+        self.reported = 0
+
+class SlackDeduplicator:
+    """
+    Suppresses repeats of a Slack post with the same (channel, thread_ts, header, content,
+    message_type, blocks) for ttl_seconds after the first one. Fingerprints live in a size-bounded LRU map.
+    Suppressed repeats are summarised periodically as an "N repeats suppressed" reply in
+    the thread of the original post. The map is per worker process.
+    """
+
+    def __init__(self, ttl_seconds: float, max_entries: int, summary_interval_seconds: float):
+        self.ttl_seconds = ttl_seconds
+        self.max_entries = max_entries
+        self.summary_interval_seconds = summary_interval_seconds
+        self._entries: "OrderedDict[bytes, _Fingerprint]" = OrderedDict()
+        self._retired: List[_Fingerprint] = [] # expired entries whose repeats are not reported yet
+        self._task: Optional[asyncio.Task] = None
+
+        self.passed = 0
+        self.suppressed = 0
+        self.summaries_posted = 0
+        self.evicted_unreported = 0
+        self.failed_originals = 0
+        self.lost_with_failed_original = 0
+
+    @staticmethod
+    def fingerprint(slack_data: SlackPostRequest) -> bytes:
+        message_type = slack_data.message_type.value if isinstance(slack_data.message_type, SlackMsgType) else slack_data.message_type
+        #blocks as canonical JSON, block-kit alerts often share an empty or generic content;
+        #thread_ts keeps the same reply in different threads apart
+        material = json.dumps(
+            [slack_data.channel, slack_data.thread_ts, slack_data.header, slack_data.content, message_type, slack_data.blocks],
+            ensure_ascii=False,
+            sort_keys=True,
+            separators=(",", ":")
+        )
+        return hashlib.blake2b(material.encode("utf-8"), digest_size=16).digest()
+
+    def check(self, slack_data: SlackPostRequest) -> Tuple[bool, _Fingerprint]:
+        """
+        Returns (is_repeat, entry). For a first post the caller records where the original
+        went: message_id when queued, or slack_ts and pending=False when posted directly,
+        and calls release(entry) when the original could not be queued or posted.
+        """
+        now = time.monotonic()
+        key = self.fingerprint(slack_data)
+        entry = self._entries.get(key)
+        if entry is not None and entry.expires_at > now:
+            entry.suppressed += 1
+            self.suppressed += 1
+            self._entries.move_to_end(key) #a storming alert stays in the map
+            return True, entry
+
+        if entry is not None:
+            #expired, the next post starts a new window; unreported repeats get a last summary
+            if entry.suppressed > entry.reported:
+                self._retired.append(entry)
+                if len(self._retired) > self.max_entries:
+                    dropped = self._retired.pop(0)
+                    self.evicted_unreported += dropped.suppressed - dropped.reported
+            del self._entries[key]
+
+        entry = _Fingerprint(key, slack_data.channel, slack_data.thread_ts, now + self.ttl_seconds)
+        self._entries[key] = entry
+        while len(self._entries) > self.max_entries:
+            _, evicted = self._entries.popitem(last=False)
+            if evicted.suppressed > evicted.reported:
+                self.evicted_unreported += evicted.suppressed - evicted.reported
+        self.passed += 1
+        return False, entry
+
+    def release(self, entry: _Fingerprint) -> None:
+        """
+        Forgets the fingerprint of an original that never reached Slack, so the next
+        occurrence is sent instead of being suppressed for the rest of the ttl.
+        Repeats suppressed in the meantime have no post to be summarised under.
+        """
+        if self._entries.get(entry.key) is entry:
+            del self._entries[entry.key]
+        self.failed_originals += 1
+        self.lost_with_failed_original += entry.suppressed - entry.reported
+        entry.reported = entry.suppressed
+        entry.pending = False
+
+    async def _resolve_slack_ts(self, entries: List[_Fingerprint]) -> None:
+        pending = [entry for entry in entries if entry.pending and entry.message_id is not None]
+        if not pending:
+            return
+        async with AsyncSessionLocal() as session:
+            repo = SlackOutboundRepository(db=session)
+            for start in range(0, len(pending), RESOLVE_BATCH_SIZE):
+                batch = pending[start:start + RESOLVE_BATCH_SIZE]
+                states = await repo.get_delivery_states([entry.message_id for entry in batch])
+                for entry in batch:
+                    state = states.get(entry.message_id)
+                    if state is None or state[0] == SlackOutboundStatus.DEAD.value:
+                        self.release(entry)
+                    elif state[0] == SlackOutboundStatus.SENT.value:
+                        entry.slack_ts = state[1]
+                        entry.pending = False
+
+    async def _summarise(self, entries: List[_Fingerprint]) -> None:
+        await self._resolve_slack_ts(entries)
+        for entry in entries:
+            unreported = entry.suppressed - entry.reported
+            if unreported <= 0:
+                continue
+            if entry.pending:
+                #the original is still on its way, summarise once it is posted
+                continue
+
+            summary = SlackPostRequest(
+                channel=entry.channel,
+                content=f":mute: {unreported} repeats of this message suppressed",
+                thread_ts=entry.thread_ts or entry.slack_ts,
+                message_type=SlackMsgType.INFO
+            )
+            entry.reported = entry.suppressed
+            self.summaries_posted += 1
+            try:
+                if settings.SLACK_OUTBOUND_QUEUE_ENABLED:
+                    async with AsyncSessionLocal() as session:
+                        await slack_outbound_queue.enqueue(SlackOutboundRepository(db=session), summary)
+                else:
+                    await SlackService().post_formatted_message(summary)
+            except Exception as e:
+                logger.error(f"Failed to post Slack repeat summary to {entry.channel}: {e}", exc_info=True)
+
+    async def _run(self) -> None:
+        while True:
+            await asyncio.sleep(self.summary_interval_seconds)
+            try:
+                now = time.monotonic()
+                expired = [key for key, entry in self._entries.items() if entry.expires_at <= now]
+                #every queued original is checked, one that went DEAD is forgotten before it suppresses anything
+                await self._resolve_slack_ts(list(self._entries.values()))
+                retired, self._retired = self._retired, []
+                await self._summarise(retired + [entry for entry in self._entries.values() if entry.suppressed > entry.reported])
+                for entry in retired:
+                    if entry.suppressed == entry.reported:
+                        continue
+                    if entry.expires_at + self.ttl_seconds > now:
+                        self._retired.append(entry)
+                    else:
+                        self.evicted_unreported += entry.suppressed - entry.reported
+                for key in expired:
+                    entry = self._entries.get(key)
+                    if entry is None:
+                        continue
+                    #kept until its repeats are reported, a stuck original is given up on after another ttl
+                    if entry.suppressed == entry.reported or entry.expires_at + self.ttl_seconds <= now:
+                        if entry.suppressed > entry.reported:
+                            self.evicted_unreported += entry.suppressed - entry.reported
+                        del self._entries[key]
+            except Exception as e:
+                logger.error(f"Slack dedup summary loop error: {e}", exc_info=True)
+
+    def start(self) -> None:
+        if self._task is None:
+            logger.info(f"Starting Slack dedup, suppressing repeats for {self.ttl_seconds}s")
+            self._task = asyncio.create_task(self._run())
+
+    async def stop(self) -> None:
+        if self._task is None:
+            return
+        self._task.cancel()
+        try:
+            await self._task
+        except asyncio.CancelledError:
+            pass
+        self._task = None
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            "enabled": settings.SLACK_DEDUP_ENABLED,
+            "fingerprints": len(self._entries),
+            "retiredFingerprints": len(self._retired),
+            "maxFingerprints": self.max_entries,
+            "passed": self.passed,
+            "suppressed": self.suppressed,
+            "summariesPosted": self.summaries_posted,
+            "evictedUnreported": self.evicted_unreported,
+            "failedOriginals": self.failed_originals,
+            "lostWithFailedOriginal": self.lost_with_failed_original,
+        }
+
+
+slack_deduplicator = SlackDeduplicator(
+    ttl_seconds=settings.SLACK_DEDUP_TTL_SECONDS,
+    max_entries=settings.SLACK_DEDUP_MAX_FINGERPRINTS,
+    summary_interval_seconds=settings.SLACK_DEDUP_SUMMARY_INTERVAL_SECONDS,
+)
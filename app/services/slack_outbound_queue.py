@@ -0,0 +1,283 @@
+import asyncio
+import math
+import random
+import time
+from datetime import datetime
+from typing import Any, Dict, List, Optional
+
+from slack_sdk.errors import SlackApiError
+
+from app.core.config import settings
+from app.core.database import AsyncSessionLocal
+from app.core.db_metrics import Histogram
+from app.dto.slack_request_dto import SlackPostRequest
+from app.enums.slack_message_type import SlackMsgType
+from app.models.schema.slack_outbound_schema import SlackOutboundMessage
+from app.repositories.slack_outbound_repository import SlackOutboundRepository
+from app.services.slack_service import SlackService, SLACK_MAX_BLOCKS
+from app.utils.token_bucket import TokenBucketLimiter
+import logging
+
+logger = logging.getLogger(__name__)
+
+# Slack errors that no retry can fix, the message goes straight to DEAD
+NON_RETRYABLE_ERRORS = {
+    "channel_not_found",
+    "not_in_channel",
+    "is_archived",
+    "invalid_auth",
+    "not_authed",
+    "account_inactive",
+    "token_revoked",
+    "missing_scope",
+    "invalid_blocks",
+    "invalid_blocks_format",
+    "msg_too_long",
+    "no_text",
+}
+
+# every merged message takes at least a content block and a divider
+MAX_DIGEST_MESSAGES = (SLACK_MAX_BLOCKS + 1) // 2
+
+DELIVERY_LATENCY_SECONDS_BUCKETS = [0.1, 0.5, 1, 2, 5, 10, 30, 60, 300, 1800]
+
+class SlackOutboundQueue:
+    """
+    Durable outbound Slack delivery backed by the slack_outbound_message table.
+    Messages are persisted before the POST returns, then drained by a pool of async
+    workers that claim due rows with SKIP LOCKED, pace each channel with a token bucket,
+    honour Slack's Retry-After and retry other failures with exponential backoff until
+    they are dead-lettered. Delivery is at-least-once: a worker that dies after posting
+    but before recording the result leaves the row to be sent again when its lease ends.
+    """
+
+    def __init__(
+        self,
+        worker_count: int,
+        claim_batch_size: int,
+        lease_seconds: float,
+        poll_interval_seconds: float,
+        channel_rate_per_second: float,
+        channel_burst: float,
+        max_attempts: int,
+        backoff_base_seconds: float,
+        backoff_max_seconds: float,
+        coalesce_windows: Dict[str, float]
+    ):
+        self.worker_count = worker_count
+        self.claim_batch_size = claim_batch_size
+        self.lease_seconds = lease_seconds
+        self.poll_interval_seconds = poll_interval_seconds
+        self.max_attempts = max_attempts
+        self.backoff_base_seconds = backoff_base_seconds
+        self.backoff_max_seconds = backoff_max_seconds
+        self.coalesce_windows = coalesce_windows
+        self.channel_limiter = TokenBucketLimiter(
+            rate_per_second=channel_rate_per_second,
+            burst=channel_burst,
+            max_buckets=10000
+        )
+        self._wakeup = asyncio.Event()
+        self._tasks: List[asyncio.Task] = []
+
+        self.enqueued = 0
+        self.sent = 0
+        self.retried = 0
+        self.rate_limited = 0
+        self.paced = 0
+        self.dead = 0
+        self.coalesced_posts = 0
+        self.coalesced_messages = 0
+        self.split_digests = 0
+        self.delivery_latency = Histogram(DELIVERY_LATENCY_SECONDS_BUCKETS)
+
+    @staticmethod
+    def to_payload(slack_data: SlackPostRequest) -> Dict[str, Any]:
+        # messageType is a leftover mrkdwn flag with a non-enum default, it does not round-trip
+        return slack_data.model_dump(mode="json", exclude={"messageType"})
+
+    def coalesce_window_seconds(self, slack_data: SlackPostRequest) -> float:
+        # CRITICAL messages, thread replies and custom block layouts are never held back
+        if slack_data.message_type == SlackMsgType.CRITICAL or slack_data.thread_ts or slack_data.blocks:
+            return 0.0
+        type_name = slack_data.message_type.name
+        for key in (f"{slack_data.channel}:{type_name}", f"{slack_data.channel}:*", f"*:{type_name}", "*:*"):
+            if key in self.coalesce_windows:
+                return self.coalesce_windows[key]
+        return 0.0
+
+    async def enqueue(self, repo: SlackOutboundRepository, slack_data: SlackPostRequest) -> int:
+        next_attempt_at = None
+        coalesce_key = None
+        window_seconds = self.coalesce_window_seconds(slack_data)
+        if window_seconds > 0:
+            #windows are aligned to the epoch, so every process puts a message into the same window
+            #without sharing state, and all of them become due together at the window's end
+            window_end = math.ceil(time.time() / window_seconds) * window_seconds
+            next_attempt_at = datetime.fromtimestamp(window_end)
+            coalesce_key = f"{slack_data.channel}:{slack_data.message_type.name}:{slack_data.username or ''}"
+
+        message_id = await repo.enqueue(
+            slack_data.channel,
+            slack_data.message_type.value,
+            self.to_payload(slack_data),
+            next_attempt_at=next_attempt_at,
+            coalesce_key=coalesce_key
+        )
+        self.enqueued += 1
+        if next_attempt_at is None:
+            self._wakeup.set()
+        return message_id
+
+    def backoff_seconds(self, attempts: int) -> float:
+        # full jitter keeps retries of a burst from hitting Slack at the same moment again
+        return random.uniform(0, min(self.backoff_max_seconds, self.backoff_base_seconds * (2 ** attempts)))
+
+    async def _deliver(self, repo: SlackOutboundRepository, service: SlackService, messages: List[SlackOutboundMessage]) -> None:
+        message_ids = [message.message_id for message in messages]
+        wait_seconds = self.channel_limiter.acquire(messages[0].channel)
+        if wait_seconds > 0:
+            #the channel's budget is used up, hand the rows back without counting an attempt
+            self.paced += 1
+            await repo.reschedule(message_ids, wait_seconds, count_attempt=False)
+            return
+
+        requests = [SlackPostRequest.model_validate(message.payload) for message in messages]
+        if len(requests) == 1:
+            payload = service.build_message_payload(requests[0])
+        else:
+            payload, included = service.build_digest_payload(requests)
+            if included < len(messages):
+                #past the block limit, the rest goes out with the next post
+                await repo.reschedule(message_ids[included:], 0, count_attempt=False)
+                messages, message_ids = messages[:included], message_ids[:included]
+
+        attempts = max(message.attempts for message in messages)
+        try:
+            result = await service.post_payload(payload)
+        except SlackApiError as e:
+            error = e.response.get("error") or str(e)
+            if error == "ratelimited":
+                self.rate_limited += 1
+                retry_after = e.response.headers.get("Retry-After") or e.response.headers.get("retry-after") or 1
+                await repo.reschedule(message_ids, float(retry_after), error, count_attempt=False)
+            elif error in NON_RETRYABLE_ERRORS and len(messages) > 1:
+                #one bad message must not sink the whole digest, the messages are retried one by one
+                self.split_digests += 1
+                logger.warning(f"Slack digest {message_ids} to {messages[0].channel} failed with {error}, sending separately")
+                await repo.split_coalesced(message_ids, error)
+            elif error in NON_RETRYABLE_ERRORS or attempts + 1 >= self.max_attempts:
+                self.dead += len(messages)
+                logger.error(f"Slack messages {message_ids} to {messages[0].channel} dead-lettered: {error}")
+                await repo.mark_dead(message_ids, error)
+            else:
+                self.retried += 1
+                await repo.reschedule(message_ids, self.backoff_seconds(attempts), error)
+            return
+        except Exception as e:
+            #network errors and timeouts
+            if attempts + 1 >= self.max_attempts:
+                self.dead += len(messages)
+                logger.error(f"Slack messages {message_ids} to {messages[0].channel} dead-lettered: {e}")
+                await repo.mark_dead(message_ids, str(e))
+            else:
+                self.retried += 1
+                logger.warning(f"Slack messages {message_ids} failed, retrying: {e}")
+                await repo.reschedule(message_ids, self.backoff_seconds(attempts), str(e))
+            return
+
+        await repo.mark_sent(message_ids, result.get("ts"))
+        self.sent += len(messages)
+        if len(messages) > 1:
+            self.coalesced_posts += 1
+            self.coalesced_messages += len(messages)
+        now = datetime.now()
+        for message in messages:
+            self.delivery_latency.observe((now - message.created_at).total_seconds())
+
+    async def _claim_groups(self, repo: SlackOutboundRepository) -> List[List[SlackOutboundMessage]]:
+        messages = await repo.claim_due_messages(self.claim_batch_size, self.lease_seconds)
+        groups: Dict[Any, List[SlackOutboundMessage]] = {}
+        for message in messages:
+            key = message.coalesce_key if message.coalesce_key is not None else ("single", message.message_id)
+            groups.setdefault(key, []).append(message)
+
+        for key, group in groups.items():
+            if isinstance(key, str) and len(group) < MAX_DIGEST_MESSAGES:
+                #claim the rest of the window that other claims did not pick up
+                group.extend(await repo.claim_coalesced_messages(
+                    key,
+                    [message.message_id for message in group],
+                    MAX_DIGEST_MESSAGES - len(group),
+                    self.lease_seconds
+                ))
+        return list(groups.values())
+
+    async def _work(self) -> None:
+        service = SlackService()
+        while True:
+            groups = []
+            try:
+                async with AsyncSessionLocal() as session:
+                    repo = SlackOutboundRepository(db=session)
+                    groups = await self._claim_groups(repo)
+                    for group in groups:
+                        await self._deliver(repo, service, group)
+            except asyncio.CancelledError:
+                raise
+            except Exception as e:
+                logger.error(f"Slack outbound worker error: {e}", exc_info=True)
+
+            if not groups:
+                #idle until the poll interval passes or this process enqueues something
+                self._wakeup.clear()
+                try:
+                    await asyncio.wait_for(self._wakeup.wait(), timeout=self.poll_interval_seconds)
+                except asyncio.TimeoutError:
+                    pass
+
+    def start(self) -> None:
+        if not self._tasks:
+            logger.info(f"Starting {self.worker_count} Slack outbound workers")
+            self._tasks = [asyncio.create_task(self._work()) for _ in range(self.worker_count)]
+
+    async def stop(self) -> None:
+        #claimed rows that were not delivered become claimable again when their lease ends
+        for task in self._tasks:
+            task.cancel()
+        await asyncio.gather(*self._tasks, return_exceptions=True)
+        self._tasks = []
+
+    async def stats(self, repo: SlackOutboundRepository) -> Dict[str, Any]:
+        oldest_due_at = await repo.get_oldest_due_at()
+        return {
+            "enabled": settings.SLACK_OUTBOUND_QUEUE_ENABLED,
+            "workers": len(self._tasks),
+            "depthByStatus": await repo.count_by_status(),
+            "oldestPendingAgeSeconds": max(0.0, (datetime.now() - oldest_due_at).total_seconds()) if oldest_due_at else 0.0,
+            "enqueued": self.enqueued,
+            "sent": self.sent,
+            "retried": self.retried,
+            "rateLimited": self.rate_limited,
+            "paced": self.paced,
+            "dead": self.dead,
+            "coalescedPosts": self.coalesced_posts,
+            "coalescedMessages": self.coalesced_messages,
+            "splitDigests": self.split_digests,
+            "deliveryLatencySeconds": self.delivery_latency.to_dict(),
+            "channelBuckets": self.channel_limiter.stats(),
+        }
+
+
+slack_outbound_queue = SlackOutboundQueue(
+    worker_count=settings.SLACK_OUTBOUND_WORKERS,
+    claim_batch_size=settings.SLACK_OUTBOUND_CLAIM_BATCH_SIZE,
+    lease_seconds=settings.SLACK_OUTBOUND_LEASE_SECONDS,
+    poll_interval_seconds=settings.SLACK_OUTBOUND_POLL_INTERVAL_SECONDS,
+    channel_rate_per_second=settings.SLACK_OUTBOUND_CHANNEL_RATE_PER_SECOND,
+    channel_burst=settings.SLACK_OUTBOUND_CHANNEL_BURST,
+    max_attempts=settings.SLACK_OUTBOUND_MAX_ATTEMPTS,
+    backoff_base_seconds=settings.SLACK_OUTBOUND_BACKOFF_BASE_SECONDS,
+    backoff_max_seconds=settings.SLACK_OUTBOUND_BACKOFF_MAX_SECONDS,
+    coalesce_windows=settings.SLACK_COALESCE_WINDOWS,
+)
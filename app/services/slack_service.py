@@ -1,12 +1,54 @@
-from typing import Any, Dict, List, Optional, Union
+from typing import Any, Dict, List, Optional, Tuple, Union
 from app.core.config import settings
 from app.enums.slack_message_type import SlackMsgType
-from slack_sdk import WebClient
+from slack_sdk.web.async_client import AsyncWebClient
+from slack_sdk.web.async_slack_response import AsyncSlackResponse
+from slack_sdk.errors import SlackApiError
 from app.dto.slack_request_dto import SlackPostRequest
+from app.services.slack_channel_directory import slack_channel_directory
+import aiohttp
 import logging
 
 logger = logging.getLogger(__name__)
 
+# Slack message limits
+SLACK_MAX_BLOCKS = 50
+SLACK_MAX_SECTION_TEXT = 3000
+SLACK_MAX_FALLBACK_TEXT = 3000 # the top-level text is only the notification fallback, keep it short
+
+# One client and keep-alive connection pool per worker, opened and closed by the app lifespan
+_slack_http_session: Optional[aiohttp.ClientSession] = None
+_slack_client: Optional[AsyncWebClient] = None
+
+async def open_slack_client() -> None:
+    global _slack_http_session, _slack_client
+    if _slack_client is not None:
+        return
+    _slack_http_session = aiohttp.ClientSession(
+        connector=aiohttp.TCPConnector(
+            limit=settings.SLACK_HTTP_MAX_CONNECTIONS,
+            keepalive_timeout=settings.SLACK_HTTP_KEEPALIVE_SECONDS
+        )
+    )
+    _slack_client = AsyncWebClient(
+        token=settings.SLACK_BOT_TOKEN,
+        session=_slack_http_session,
+        timeout=settings.SLACK_HTTP_TIMEOUT_SECONDS
+    )
+    logger.info("Slack client opened")
+
+async def close_slack_client() -> None:
+    global _slack_http_session, _slack_client
+    if _slack_http_session is not None:
+        await _slack_http_session.close()
+    _slack_http_session = None
+    _slack_client = None
+
+def get_slack_client() -> AsyncWebClient:
+    if _slack_client is None:
+        raise RuntimeError("Slack client is not open, open_slack_client() runs in the app lifespan")
+    return _slack_client
+
 class SlackService:
 
     EMOJI_MAP = {
@@ -16,20 +58,20 @@ class SlackService:
     }
 
 
-    def __init__(self):
-        self.slack_client = WebClient(token=settings.SLACK_BOT_TOKEN)
+    def __init__(self, slack_client: Optional[AsyncWebClient] = None):
+        self.slack_client = slack_client or get_slack_client()
 
-    async def get_conversations_info(self, channel_id: str) -> None:
+    async def get_conversations_info(self, channel_id: str) -> Optional[Dict[str, Any]]:
         try:
-            result = await self.slack_client.conversations_info(channel=channel_id)
-
-            if result.get("ok"):
-                logger.info(f"Successfully retrieved info for channel ID: {channel_id}")
-                return result.get("channel") # Return the 'channel' dictionary from the result
-            else:
-                error_msg = result.get("error", "Unknown error during conversations_info")
-                logger.error(f"Slack API error in get_conversations_info for {channel_id}: {error_msg}")
+            resolved_id = await slack_channel_directory.resolve(channel_id, self.slack_client)
+            if resolved_id is None:
+                logger.error(f"Unknown Slack channel name in get_conversations_info: {channel_id}")
                 return None
+            # served from the channel cache while it is fresh
+            return await slack_channel_directory.get_info(self.slack_client, resolved_id)
+        except SlackApiError as e:
+            logger.error(f"Slack API error in get_conversations_info for {channel_id}: {e.response.get('error')}")
+            return None
         except Exception as e:
             logger.error(f"An unexpected error occurred in get_conversations_info for {channel_id}: {e}", exc_info=True)
             return None
@@ -49,8 +91,11 @@ class SlackService:
                 error_msg = result.get("error", "Unknown error from Slack API")
                 logger.error(f"Failed to send message to channel {channel_id}: {error_msg}")
             
-            return result # Return the full Slack API response
+            return result.data # Return the full Slack API response
 
+        except SlackApiError as e:
+            logger.error(f"Failed to send message to channel {channel_id}: {e.response.get('error')}")
+            return e.response.data
         except Exception as e:
             logger.error(f"An unexpected error occurred while sending Slack message to {channel_id}: {e}", exc_info=True)
             # Return a consistent error format
@@ -61,6 +106,7 @@ class SlackService:
         if not header:
             return {}
         
+        formatted_text = header
         if emoji:
             formatted_text = f"{emoji} {header}"
 
@@ -110,38 +156,90 @@ class SlackService:
             params["icon_emoji"] = icon_emoji
         return params
 
-    def post_formatted_message(self, slack_data: SlackPostRequest) -> Dict[str, Any]:
+    def build_message_payload(self, slack_data: SlackPostRequest) -> Dict[str, Any]:
+        optional_params = {
+            "thread_ts": slack_data.thread_ts,
+            "reply_broadcast": slack_data.reply_broadcast,
+            "username": slack_data.username,
+        }
+        filtered_params = {k: v for k, v in optional_params.items() if v is not None}
+        payload: Dict[str, Any] = self.set_message_parameters(
+            channel=slack_data.channel, **filtered_params
+        )
+
+        if slack_data.blocks:
+            payload["blocks"] = slack_data.blocks
+            payload["text"] = slack_data.content or "Message with custom blocks."
+        else:
+            emoji_icon = self.EMOJI_MAP.get(slack_data.message_type)
+            generated_blocks = []
+            
+            if slack_data.header:
+                generated_blocks.append(self.form_header_message(slack_data.header, emoji_icon))
+            generated_blocks.append(self.form_main_content_message(slack_data.content))
+            
+            payload["blocks"] = generated_blocks
+            payload["text"] = slack_data.content
+        return payload
+
+    @classmethod
+    def build_digest_payload(cls, messages: List[SlackPostRequest]) -> Tuple[Dict[str, Any], int]:
+        """
+        Merges messages bound for the same channel into one post, built from the same
+        header and content blocks as single messages and separated by dividers.
+        Stops before Slack's block limit; returns the payload and how many messages it holds.
+        """
+        first = messages[0]
+        payload: Dict[str, Any] = cls.set_message_parameters(channel=first.channel, username=first.username)
+        emoji_icon = cls.EMOJI_MAP.get(first.message_type)
+
+        blocks: List[Dict[str, Any]] = []
+        fallback_lines: List[str] = []
+        included = 0
+        for message in messages:
+            message_blocks = []
+            if blocks:
+                message_blocks.append({"type": "divider"})
+            if message.header:
+                message_blocks.append(cls.form_header_message(message.header, emoji_icon))
+            content = message.content
+            if len(content) > SLACK_MAX_SECTION_TEXT:
+                content = content[:SLACK_MAX_SECTION_TEXT - 1] + "…"
+            if content:
+                #an empty section block is rejected by Slack and would fail the whole digest
+                message_blocks.append(cls.form_main_content_message(content))
+
+            if len(blocks) + len(message_blocks) > SLACK_MAX_BLOCKS:
+                break
+            blocks.extend(message_blocks)
+            fallback_lines.append(message.header or message.content)
+            included += 1
+
+        fallback_text = f"{included} messages: " + " | ".join(fallback_lines)
+        payload["blocks"] = blocks
+        payload["text"] = fallback_text[:SLACK_MAX_FALLBACK_TEXT]
+        return payload, included
+
+    async def post_payload(self, payload: Dict[str, Any]) -> AsyncSlackResponse:
+        # Raises SlackApiError, callers that retry need the error code and the Retry-After header
+        try:
+            return await self.slack_client.chat_postMessage(**payload)
+        except SlackApiError as e:
+            if e.response.get("error") == "channel_not_found":
+                #the cached ID may belong to a deleted channel, the next lookup of its name sees the new one
+                slack_channel_directory.handle_channel_not_found(payload.get("channel"), self.slack_client)
+            raise
+
+    async def post_message(self, slack_data: SlackPostRequest) -> AsyncSlackResponse:
+        return await self.post_payload(self.build_message_payload(slack_data))
+
+    async def post_formatted_message(self, slack_data: SlackPostRequest) -> Dict[str, Any]:
             try:
-                # This part is unchanged
-                optional_params = {
-                    "thread_ts": slack_data.thread_ts,
-                    "reply_broadcast": slack_data.reply_broadcast,
-                    "username": slack_data.username,
-                }
-                filtered_params = {k: v for k, v in optional_params.items() if v is not None}
-                payload: Dict[str, Any] = self.set_message_parameters(
-                    channel=slack_data.channel, **filtered_params
-                )
-
-                if slack_data.blocks:
-                    payload["blocks"] = slack_data.blocks
-                    payload["text"] = slack_data.content or "Message with custom blocks."
-                else:
-                    emoji_icon = self.EMOJI_MAP.get(slack_data.message_type)
-                    generated_blocks = []
-                    
-                    if slack_data.header:
-                        generated_blocks.append(self.form_header_message(slack_data.header, emoji_icon))
-                    generated_blocks.append(self.form_main_content_message(slack_data.content))
-                    
-                    payload["blocks"] = generated_blocks
-                    payload["text"] = slack_data.content
-
-                result = self.slack_client.chat_postMessage(**payload)
-                return result
+                result = await self.post_message(slack_data)
+                return result.data
+            except SlackApiError as e:
+                logger.error(f"Slack API error while posting to {slack_data.channel}: {e.response.get('error')}")
+                return e.response.data
             except Exception as e:
                 logger.error(f"An unexpected error occurred: {e}", exc_info=True)
-                return {"ok": False, "error": str(e)}
-
-
-        
\ No newline at end of file
+                return {"ok": False, "error": str(e)}
\ No newline at end of file
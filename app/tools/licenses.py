@@ -0,0 +1,259 @@
+"""
+Offline bulk license import and export.
+
+    python -m app.tools.licenses import keys.csv [--checkpoint keys.ckpt] [--duplicates keys.dup.csv]
+    python -m app.tools.licenses export licenses.ndjson.gz [--is-used true]
+
+Import input is CSV with a header or NDJSON, one license per row:
+rawKey (required), licenseType, expirationDate, useLimit. Missing columns fall back
+to the command line defaults. Keys are hashed in a process pool and written in
+chunked multi-row inserts; the checkpoint records how many input rows are done,
+so an interrupted import resumes where it stopped. Memory use is bounded by the
+chunk size and the number of chunks in flight, not by the input size.
+"""
+import argparse
+import asyncio
+import csv
+import gzip
+import json
+import os
+import sys
+import time
+from concurrent.futures import ProcessPoolExecutor
+from collections import deque
+from datetime import datetime
+from itertools import islice
+from typing import Any, Dict, Iterator, List, Optional, Tuple
+
+from dateutil.relativedelta import relativedelta
+from pydantic import ValidationError
+
+from app.core.config import settings
+from app.core.database import AsyncSessionLocal, async_engine, get_read_sessionmaker
+from app.enums.license_type import LicenseType
+from app.models.schema.license_schema import LicenseCreate
+from app.repositories.license_repository import LicenseRepository
+from app.utils.license_export import LICENSE_EXPORT_COLUMNS, EXPORT_FORMATS, encode_license_rows, gzip_chunks
+from app.utils.license_key_generator import convert_to_hashed_license_key, build_license_key_hint
+from app.utils.logger import setup_logging
+import logging
+
+logger = logging.getLogger(__name__)
+
+def _open_text(path: str, mode: str):
+    if path.endswith(".gz"):
+        return gzip.open(path, mode + "t", encoding="utf-8", newline="")
+    return open(path, mode, encoding="utf-8", newline="")
+
+def _detect_format(path: str, requested: Optional[str]) -> str:
+    if requested:
+        return requested
+    name = path[:-3] if path.endswith(".gz") else path
+    return "csv" if name.endswith(".csv") else "ndjson"
+
+def _read_rows(path: str, input_format: str) -> Iterator[Dict[str, Any]]:
+    with _open_text(path, "r") as file:
+        if input_format == "csv":
+            yield from csv.DictReader(file)
+        else:
+            for line in file:
+                if line.strip():
+                    yield json.loads(line)
+
+def _hash_keys(raw_keys: List[str]) -> List[Tuple[str, str]]:
+    # runs in a worker process, hints are built the same way as /register-license
+    return [(convert_to_hashed_license_key(raw_key), build_license_key_hint(raw_key)) for raw_key in raw_keys]
+
+def _parse_license_type(value: Any, default: LicenseType) -> LicenseType:
+    if value in (None, ""):
+        return default
+    if isinstance(value, int) or str(value).isdigit():
+        return LicenseType(int(value))
+    return LicenseType[str(value)]
+
+def _load_checkpoint(path: Optional[str], input_path: str) -> Dict[str, Any]:
+    checkpoint = {"input": os.path.abspath(input_path), "rowsDone": 0, "created": 0, "duplicates": 0, "failed": 0}
+    if path and os.path.exists(path):
+        with open(path, "r", encoding="utf-8") as file:
+            saved = json.load(file)
+        if saved.get("input") != checkpoint["input"]:
+            raise SystemExit(f"Checkpoint {path} belongs to {saved.get('input')}, not {checkpoint['input']}")
+        checkpoint.update(saved)
+    return checkpoint
+
+def _save_checkpoint(path: Optional[str], checkpoint: Dict[str, Any]) -> None:
+    if not path:
+        return
+    # written next to the target and renamed, a crash never leaves a torn checkpoint
+    temp_path = path + ".tmp"
+    with open(temp_path, "w", encoding="utf-8") as file:
+        json.dump(checkpoint, file)
+    os.replace(temp_path, path)
+
+async def import_licenses(args: argparse.Namespace) -> int:
+    input_format = _detect_format(args.path, args.format)
+    checkpoint = _load_checkpoint(args.checkpoint, args.path)
+    default_type = _parse_license_type(args.license_type, LicenseType.UNKNOWN_LICENSE)
+    default_expiration = (
+        datetime.fromisoformat(args.expiration_date) if args.expiration_date
+        else datetime.now() + relativedelta(months=1)
+    )
+
+    rows = enumerate(_read_rows(args.path, input_format))
+    if checkpoint["rowsDone"]:
+        logger.info(f"Resuming after {checkpoint['rowsDone']} rows")
+        rows = islice(rows, checkpoint["rowsDone"], None)
+
+    report_file = _open_text(args.duplicates, "a") if args.duplicates else None
+    report = csv.writer(report_file, lineterminator="\n") if report_file else None
+    if report is not None and report_file.tell() == 0:
+        report.writerow(["row", "licenseKeyHint", "reason"])
+
+    loop = asyncio.get_running_loop()
+    started_at = time.perf_counter()
+    started_rows = checkpoint["rowsDone"]
+
+    with ProcessPoolExecutor(max_workers=args.workers) as pool:
+        # hashing runs ahead of the inserts by at most max_pending chunks
+        pending = deque()
+        max_pending = args.workers * 2
+
+        async def write_chunk(chunk: List[Tuple[int, Dict[str, Any]]], hashed: List[Tuple[str, str]]) -> None:
+            licenses_data = []
+            seen_keys = set()
+            for (row_number, row), (hashed_key, hint) in zip(chunk, hashed):
+                if not (row.get("rawKey") or row.get("raw_key")):
+                    checkpoint["failed"] += 1
+                    if report is not None:
+                        report.writerow([row_number, "", "invalid: missing rawKey"])
+                    continue
+                if hashed_key in seen_keys:
+                    #the bulk insert writes a key once, every repeat in the chunk is reported here
+                    checkpoint["duplicates"] += 1
+                    if report is not None:
+                        report.writerow([row_number, hint, "duplicate"])
+                    continue
+                try:
+                    licenses_data.append((row_number, LicenseCreate(
+                        license_key=hashed_key,
+                        license_key_hint=hint,
+                        license_type=_parse_license_type(row.get("licenseType"), default_type).name,
+                        expiration_date=row.get("expirationDate") or default_expiration,
+                        use_limit=row.get("useLimit") or args.use_limit
+                    )))
+                    seen_keys.add(hashed_key)
+                except (ValidationError, ValueError, KeyError) as e:
+                    checkpoint["failed"] += 1
+                    if report is not None:
+                        report.writerow([row_number, hint, f"invalid: {e}".replace("\n", " ")])
+
+            inserted_keys = set()
+            if licenses_data:
+                async with AsyncSessionLocal() as session:
+                    inserted_keys = await LicenseRepository(db=session).create_licenses_bulk(
+                        [license_data for _, license_data in licenses_data]
+                    )
+            checkpoint["created"] += len(inserted_keys)
+            for row_number, license_data in licenses_data:
+                if license_data.license_key not in inserted_keys:
+                    checkpoint["duplicates"] += 1
+                    if report is not None:
+                        report.writerow([row_number, license_data.license_key_hint, "duplicate"])
+
+            #chunks are written in input order, so everything up to the chunk's last row is done
+            checkpoint["rowsDone"] = chunk[-1][0] + 1
+            if report_file is not None:
+                report_file.flush()
+            _save_checkpoint(args.checkpoint, checkpoint)
+
+            done = checkpoint["rowsDone"] - started_rows
+            elapsed = time.perf_counter() - started_at
+            logger.info(f"{checkpoint['rowsDone']} rows done, {checkpoint['created']} created, "
+                        f"{checkpoint['duplicates']} duplicates, {checkpoint['failed']} failed "
+                        f"({done / elapsed if elapsed > 0 else 0:.0f} rows/sec)")
+
+        while True:
+            chunk = list(islice(rows, args.chunk_size))
+            if chunk:
+                raw_keys = [str(row.get("rawKey") or row.get("raw_key") or "") for _, row in chunk]
+                pending.append((chunk, loop.run_in_executor(pool, _hash_keys, raw_keys)))
+            if pending and (len(pending) >= max_pending or not chunk):
+                done_chunk, hashing = pending.popleft()
+                await write_chunk(done_chunk, await hashing)
+            if not chunk and not pending:
+                break
+
+    if report_file is not None:
+        report_file.close()
+    logger.info(f"Import finished: {checkpoint['created']} created, {checkpoint['duplicates']} duplicates, {checkpoint['failed']} failed")
+    return 0
+
+def _parse_optional_bool(value: Optional[str]) -> Optional[bool]:
+    if value is None:
+        return None
+    return value.lower() in ("1", "true", "yes")
+
+async def export_licenses(args: argparse.Namespace) -> int:
+    export_format = _detect_format(args.path, args.format)
+    compress = args.path.endswith(".gz")
+    exported = 0
+
+    async with get_read_sessionmaker()() as session:
+        rows = LicenseRepository(db=session).stream_licenses(
+            LICENSE_EXPORT_COLUMNS,
+            is_used=_parse_optional_bool(args.is_used),
+            is_blocked=_parse_optional_bool(args.is_blocked),
+            yield_per=settings.LICENSE_EXPORT_YIELD_PER
+        )
+
+        async def counted(rows):
+            nonlocal exported
+            async for row in rows:
+                exported += 1
+                yield row
+
+        chunks = encode_license_rows(counted(rows), export_format)
+        if compress:
+            chunks = gzip_chunks(chunks)
+        with open(args.path, "wb") as file:
+            async for chunk in chunks:
+                file.write(chunk)
+
+    logger.info(f"Exported {exported} licenses to {args.path}")
+    return 0
+
+def build_parser() -> argparse.ArgumentParser:
+    parser = argparse.ArgumentParser(prog="python -m app.tools.licenses", description="Bulk license import and export")
+    commands = parser.add_subparsers(dest="command", required=True)
+
+    import_parser = commands.add_parser("import", help="Import raw license keys from CSV or NDJSON (.gz allowed)")
+    import_parser.add_argument("path")
+    import_parser.add_argument("--format", choices=EXPORT_FORMATS, help="Defaults to the file extension")
+    import_parser.add_argument("--chunk-size", type=int, default=settings.LICENSE_BATCH_CHUNK_SIZE)
+    import_parser.add_argument("--workers", type=int, default=os.cpu_count() or 1, help="Hashing processes")
+    import_parser.add_argument("--checkpoint", help="Resume file, created if missing")
+    import_parser.add_argument("--duplicates", help="CSV report of duplicate and invalid rows, appended to")
+    import_parser.add_argument("--license-type", help="Default license type, name or value")
+    import_parser.add_argument("--expiration-date", help="Default expiration date (ISO 8601), one month from now if omitted")
+    import_parser.add_argument("--use-limit", type=int, default=10, help="Default use limit")
+
+    export_parser = commands.add_parser("export", help="Export licenses as CSV or NDJSON, gzip when the path ends in .gz")
+    export_parser.add_argument("path")
+    export_parser.add_argument("--format", choices=EXPORT_FORMATS, help="Defaults to the file extension")
+    export_parser.add_argument("--is-used")
+    export_parser.add_argument("--is-blocked")
+    return parser
+
+async def main(argv: Optional[List[str]] = None) -> int:
+    args = build_parser().parse_args(argv)
+    try:
+        if args.command == "import":
+            return await import_licenses(args)
+        return await export_licenses(args)
+    finally:
+        await async_engine.dispose()
+
+
+if __name__ == "__main__":
+    setup_logging()
+    sys.exit(asyncio.run(main()))
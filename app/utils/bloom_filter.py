@@ -0,0 +1,63 @@
+# app/utils/bloom_filter.py
+import hashlib
+import math
+from typing import Any, Dict
+
+
+class BloomFilter:
+    """
+    Fixed-size Bloom filter over strings. No false negatives; a false positive rate of
+    about false_positive_rate while no more than capacity keys were added.
+    Bit positions come from double hashing one 128-bit blake2b digest per key.
+    """
+
+    def __init__(self, capacity: int, false_positive_rate: float):
+        self.capacity = max(1, capacity)
+        self.false_positive_rate = false_positive_rate
+        self.bit_count = max(8, math.ceil(-self.capacity * math.log(false_positive_rate) / (math.log(2) ** 2)))
+        self.hash_count = max(1, round(self.bit_count / self.capacity * math.log(2)))
+        self._bits = bytearray((self.bit_count + 7) // 8)
+        self.count = 0
+
+    def _positions(self, key: str):
+        digest = hashlib.blake2b(key.encode('utf-8'), digest_size=16).digest()
+        h1 = int.from_bytes(digest[:8], "little")
+        h2 = int.from_bytes(digest[8:], "little") | 1
+        for i in range(self.hash_count):
+            yield (h1 + i * h2) % self.bit_count
+
+    def add(self, key: str) -> bool:
+        # only a key that sets a new bit is counted, re-adding a known key is a no-op
+        added = False
+        for position in self._positions(key):
+            mask = 1 << (position & 7)
+            if not self._bits[position >> 3] & mask:
+                self._bits[position >> 3] |= mask
+                added = True
+        if added:
+            self.count += 1
+        return added
+
+    def __contains__(self, key: str) -> bool:
+        for position in self._positions(key):
+            if not self._bits[position >> 3] & (1 << (position & 7)):
+                return False
+        return True
+
+    @property
+    def memory_bytes(self) -> int:
+        return len(self._bits)
+
+    def estimated_false_positive_rate(self) -> float:
+        # (1 - e^(-kn/m))^k for the keys added so far
+        return (1 - math.exp(-self.hash_count * self.count / self.bit_count)) ** self.hash_count
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            "capacity": self.capacity,
+            "count": self.count,
+            "hashCount": self.hash_count,
+            "memoryBytes": self.memory_bytes,
+            "targetFalsePositiveRate": self.false_positive_rate,
+            "estimatedFalsePositiveRate": self.estimated_false_positive_rate(),
+        }
@@ -0,0 +1,103 @@
+# app/utils/license_cache.py
+import time
+from collections import OrderedDict
+from typing import Any, Dict, Optional, Tuple
+
+from app.core.config import settings
+from app.models.license import License
+
+
+class LicenseCache:
+    """
+    Size-capped LRU cache with a TTL for license snapshots, keyed by hashed license key.
+    Entries are detached pydantic snapshots so they can outlive the request session.
+    Invalidations are remembered for replica_lag_window_seconds, a replica can still
+    return the pre-write row in that window, so misses of those keys read the primary.
+    """
+
+    def __init__(self, max_size: int, ttl_seconds: float, replica_lag_window_seconds: float = 0.0):
+        self.max_size = max_size
+        self.ttl_seconds = ttl_seconds
+        self.replica_lag_window_seconds = replica_lag_window_seconds
+        self._entries: "OrderedDict[str, Tuple[float, License]]" = OrderedDict()
+        self._invalidated_at: "OrderedDict[str, float]" = OrderedDict()
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self.expirations = 0
+        self.invalidations = 0
+
+    def get(self, hashed_license_key: str) -> Optional[License]:
+        entry = self._entries.get(hashed_license_key)
+        if entry is None:
+            self.misses += 1
+            return None
+
+        expires_at, snapshot = entry
+        if expires_at <= time.monotonic():
+            del self._entries[hashed_license_key]
+            self.expirations += 1
+            self.misses += 1
+            return None
+
+        self._entries.move_to_end(hashed_license_key)
+        self.hits += 1
+        return snapshot
+
+    def put(self, hashed_license_key: str, snapshot: License) -> None:
+        if self.max_size <= 0:
+            return
+        self._entries[hashed_license_key] = (time.monotonic() + self.ttl_seconds, snapshot)
+        self._entries.move_to_end(hashed_license_key)
+        while len(self._entries) > self.max_size:
+            self._entries.popitem(last=False)
+            self.evictions += 1
+
+    def invalidate(self, hashed_license_key: str) -> None:
+        if self._entries.pop(hashed_license_key, None) is not None:
+            self.invalidations += 1
+        if self.replica_lag_window_seconds <= 0:
+            return
+        #recorded even when nothing was cached, the next miss must not read a lagged copy either
+        now = time.monotonic()
+        self._invalidated_at[hashed_license_key] = now
+        self._invalidated_at.move_to_end(hashed_license_key)
+        while self._invalidated_at:
+            oldest_key, invalidated_at = next(iter(self._invalidated_at.items()))
+            if invalidated_at > now - self.replica_lag_window_seconds and len(self._invalidated_at) <= self.max_size:
+                break
+            del self._invalidated_at[oldest_key]
+
+    def recently_invalidated(self, hashed_license_key: str) -> bool:
+        invalidated_at = self._invalidated_at.get(hashed_license_key)
+        return invalidated_at is not None and invalidated_at > time.monotonic() - self.replica_lag_window_seconds
+
+    def clear(self) -> None:
+        self._entries.clear()
+        self._invalidated_at.clear()
+
+    def stats(self) -> Dict[str, Any]:
+        lookups = self.hits + self.misses
+        return {
+            "size": len(self._entries),
+            "maxSize": self.max_size,
+            "ttlSeconds": self.ttl_seconds,
+            "hits": self.hits,
+            "misses": self.misses,
+            "hitRatio": (self.hits / lookups) if lookups else 0.0,
+            "evictions": self.evictions,
+            "expirations": self.expirations,
+            "invalidations": self.invalidations,
+            "recentInvalidations": len(self._invalidated_at),
+        }
+
+
+license_cache = LicenseCache(
+    max_size=settings.LICENSE_CACHE_MAX_SIZE,
+    ttl_seconds=settings.LICENSE_CACHE_TTL_SECONDS,
+    #a replica in rotation lags at most the threshold, as of the last lag check
+    replica_lag_window_seconds=(
+        settings.DB_REPLICA_MAX_LAG_SECONDS + settings.DB_REPLICA_LAG_CHECK_INTERVAL_SECONDS
+        if settings.DATABASE_REPLICA_URLS else 0.0
+    ),
+)
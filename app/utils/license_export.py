@@ -0,0 +1,81 @@
+# app/utils/license_export.py
+import csv
+import io
+import json
+import zlib
+from datetime import datetime
+from typing import Any, AsyncIterator, Iterable, List, Mapping
+
+# license_key is the SHA-256 digest, raw keys are never stored
+LICENSE_EXPORT_COLUMNS: List[str] = [
+    "license_id",
+    "license_key",
+    "license_key_hint",
+    "license_type",
+    "created_date",
+    "last_used_date",
+    "expiration_date",
+    "is_used",
+    "is_blocked",
+    "is_expired",
+    "use_counts",
+    "use_limit",
+    "counter_slots",
+]
+
+EXPORT_FORMATS = ("ndjson", "csv")
+EXPORT_MEDIA_TYPES = {
+    "ndjson": "application/x-ndjson",
+    "csv": "text/csv",
+}
+
+def _to_plain_value(value: Any) -> Any:
+    if isinstance(value, datetime):
+        return value.isoformat()
+    return value
+
+def encode_ndjson_row(row: Mapping[str, Any], columns: List[str]) -> str:
+    return json.dumps({column: _to_plain_value(row[column]) for column in columns}, ensure_ascii=False) + "\n"
+
+def encode_csv_rows(rows: Iterable[Iterable[Any]]) -> str:
+    buffer = io.StringIO()
+    writer = csv.writer(buffer, lineterminator="\n")
+    for row in rows:
+        writer.writerow([_to_plain_value(value) for value in row])
+    return buffer.getvalue()
+
+async def encode_license_rows(
+    rows: AsyncIterator[Mapping[str, Any]],
+    export_format: str,
+    columns: List[str] = LICENSE_EXPORT_COLUMNS,
+    rows_per_chunk: int = 500
+) -> AsyncIterator[bytes]:
+    """
+    Encodes license rows as NDJSON or CSV. Rows are grouped so each yielded chunk
+    holds up to rows_per_chunk rows instead of one tiny write per row.
+    """
+    if export_format == "csv":
+        yield encode_csv_rows([columns]).encode("utf-8")
+
+    batch = []
+    async for row in rows:
+        batch.append(row)
+        if len(batch) >= rows_per_chunk:
+            yield _encode_batch(batch, export_format, columns)
+            batch = []
+    if batch:
+        yield _encode_batch(batch, export_format, columns)
+
+def _encode_batch(batch: List[Mapping[str, Any]], export_format: str, columns: List[str]) -> bytes:
+    if export_format == "csv":
+        return encode_csv_rows([row[column] for column in columns] for row in batch).encode("utf-8")
+    return "".join(encode_ndjson_row(row, columns) for row in batch).encode("utf-8")
+
+async def gzip_chunks(chunks: AsyncIterator[bytes]) -> AsyncIterator[bytes]:
+    # wbits=16+MAX_WBITS writes a gzip header and trailer instead of a raw zlib stream
+    compressor = zlib.compressobj(6, zlib.DEFLATED, 16 + zlib.MAX_WBITS)
+    async for chunk in chunks:
+        compressed = compressor.compress(chunk)
+        if compressed:
+            yield compressed
+    yield compressor.flush()
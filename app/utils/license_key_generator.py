@@ -2,7 +2,13 @@
 import hashlib
 import hmac
 import base64
+import json
+import secrets
+import string
+import time
 from datetime import datetime
+from functools import lru_cache
+from typing import Any, Dict, Optional
 
 from app.core.config import settings
 
@@ -18,6 +24,15 @@ def convert_to_hashed_license_key(
     
     return encoded_key
 
+LICENSE_KEY_ALPHABET = string.ascii_uppercase + string.digits
+
+def generate_raw_license_key(length: int = 20) -> str:
+    return "".join(secrets.choice(LICENSE_KEY_ALPHABET) for _ in range(length))
+
+def build_license_key_hint(raw_key: str) -> str:
+    # Masks the first four and the last two characters of the raw key
+    return "X" * 4 + raw_key[4:-2] + "X" * 2
+
 def verify_secure_license_key_hmac(
     full_license_key: str,
     original_data_for_key: str # The *exact* data string used during generation for this key
@@ -40,12 +55,78 @@ def verify_secure_license_key_hmac(
     secret_bytes = settings.SECRET_KEY.encode('utf-8')
     message_bytes = message_to_verify.encode('utf-8')
 
-    try:
-        hash_func = getattr(hashlib, settings.ALGORITHM.lower())
-    except AttributeError:
-        raise ValueError(f"Unsupported hash algorithm: {settings.ALGORITHM}. Choose from hashlib.")
+    hash_func = resolve_hmac_digest(settings.ALGORITHM)
 
     expected_signer = hmac.new(secret_bytes, message_bytes, hash_func)
     expected_signature = expected_signer.hexdigest()
 
-    return hmac.compare_digest(expected_signature, received_signature)
\ No newline at end of file
+    return hmac.compare_digest(expected_signature, received_signature)
+
+@lru_cache(maxsize=None)
+def resolve_hmac_digest(algorithm: str):
+    name = algorithm.lower()
+    hash_func = getattr(hashlib, name, None)
+    if hash_func is None and "_" in name:
+        # passlib scheme names such as "pbkdf2_sha256" end with the digest name
+        hash_func = getattr(hashlib, name.rsplit("_", 1)[1], None)
+    if hash_func is None:
+        raise ValueError(f"Unsupported hash algorithm: {algorithm}. Choose from hashlib.")
+    return hash_func
+
+# Signed license token: "VS1.<base64url claims>.<base64url HMAC of 'VS1.<claims>'>"
+# Claims: jti (random id), typ (LicenseType value), exp (epoch seconds or null), lim (use limit), iat
+SIGNED_TOKEN_PREFIX = "VS1"
+
+def _b64encode(data: bytes) -> str:
+    return base64.urlsafe_b64encode(data).decode('utf-8').rstrip('=')
+
+def _b64decode(data: str) -> bytes:
+    return base64.urlsafe_b64decode(data + "=" * (-len(data) % 4))
+
+def _sign(signing_input: str) -> bytes:
+    if not settings.SECRET_KEY or not settings.ALGORITHM:
+        raise ValueError("License token signing settings are not configured.")
+    return hmac.new(
+        settings.SECRET_KEY.encode('utf-8'),
+        signing_input.encode('utf-8'),
+        resolve_hmac_digest(settings.ALGORITHM)
+    ).digest()
+
+def generate_signed_license_token(
+    license_type: int,
+    expiration_date: Optional[datetime],
+    use_limit: int
+) -> str:
+    claims = {
+        "jti": secrets.token_hex(8),
+        "typ": license_type,
+        "exp": int(expiration_date.timestamp()) if expiration_date else None,
+        "lim": use_limit,
+        "iat": int(time.time()),
+    }
+    signing_input = f"{SIGNED_TOKEN_PREFIX}.{_b64encode(json.dumps(claims, separators=(',', ':')).encode('utf-8'))}"
+    return f"{signing_input}.{_b64encode(_sign(signing_input))}"
+
+def is_signed_license_token(license_key: str) -> bool:
+    return license_key.startswith(SIGNED_TOKEN_PREFIX + ".") and license_key.count(".") == 2
+
+def decode_signed_license_token(token: str) -> Optional[Dict[str, Any]]:
+    """
+    Returns the claims of a signed license token, or None when the token is malformed
+    or its signature does not match. Expiry is left to the caller.
+    """
+    if not is_signed_license_token(token):
+        return None
+    signing_input, _, received_signature = token.rpartition(".")
+    try:
+        if not hmac.compare_digest(_sign(signing_input), _b64decode(received_signature)):
+            return None
+        claims = json.loads(_b64decode(signing_input.split(".", 1)[1]))
+    except (ValueError, TypeError):
+        return None
+    if not isinstance(claims, dict) or not {"jti", "typ", "exp", "lim", "iat"} <= claims.keys():
+        return None
+    return claims
+
+def build_signed_token_hint(claims: Dict[str, Any]) -> str:
+    return f"TKN-{claims['jti']}"
@@ -0,0 +1,44 @@
+# app/utils/single_flight.py
+import asyncio
+from typing import Any, Awaitable, Callable, Dict, Hashable
+
+
+class SingleFlight:
+    """
+    Coalesces concurrent calls with the same key into one execution whose result,
+    or exception, is handed to every caller. The call runs as its own task behind
+    asyncio.shield, so a cancelled caller does not cancel it for the others.
+    The key is released as soon as the call finishes; results are not cached.
+    """
+
+    def __init__(self):
+        self._calls: Dict[Hashable, asyncio.Future] = {}
+        self.executions = 0
+        self.shared = 0
+        self.errors = 0
+
+    async def do(self, key: Hashable, fn: Callable[[], Awaitable[Any]]) -> Any:
+        call = self._calls.get(key)
+        if call is None:
+            call = asyncio.ensure_future(fn())
+            self._calls[key] = call
+            self.executions += 1
+            call.add_done_callback(lambda done, key=key: self._finish(key, done))
+        else:
+            self.shared += 1
+        return await asyncio.shield(call)
+
+    def _finish(self, key: Hashable, call: asyncio.Future) -> None:
+        if self._calls.get(key) is call:
+            del self._calls[key]
+        #retrieving the exception also keeps an unawaited failure from being logged as never retrieved
+        if not call.cancelled() and call.exception() is not None:
+            self.errors += 1
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            "inFlight": len(self._calls),
+            "executions": self.executions,
+            "shared": self.shared,
+            "errors": self.errors,
+        }
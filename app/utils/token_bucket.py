@@ -0,0 +1,72 @@
+# app/utils/token_bucket.py
+import time
+from collections import OrderedDict
+from typing import Any, Dict, Hashable
+
+
+class _Bucket:
+    __slots__ = ("tokens", "updated_at")
+
+    def __init__(self, tokens: float, updated_at: float):
+        self.tokens = tokens
+        self.updated_at = updated_at
+
+
+class TokenBucketLimiter:
+    """
+    Token buckets keyed by an arbitrary hashable, refilled at rate_per_second up to burst.
+    Buckets are kept in least-recently-used order. A bucket idle long enough to be full
+    again behaves like a new one, so those are evicted from the front, and the oldest
+    are dropped past max_buckets.
+    """
+
+    def __init__(self, rate_per_second: float, burst: float, max_buckets: int):
+        self.rate_per_second = rate_per_second
+        self.burst = max(1.0, burst)
+        self.max_buckets = max_buckets
+        self.refill_seconds = self.burst / rate_per_second
+        self._buckets: "OrderedDict[Hashable, _Bucket]" = OrderedDict()
+        self.allowed = 0
+        self.rejected = 0
+        self.evictions = 0
+
+    def acquire(self, key: Hashable, tokens: float = 1.0) -> float:
+        """
+        Takes tokens from the key's bucket. Returns 0 when allowed, otherwise the seconds
+        until enough tokens are available; nothing is taken on rejection.
+        """
+        now = time.monotonic()
+        bucket = self._buckets.get(key)
+        if bucket is None:
+            bucket = _Bucket(self.burst, now)
+            self._buckets[key] = bucket
+            self._evict(now)
+        else:
+            bucket.tokens = min(self.burst, bucket.tokens + (now - bucket.updated_at) * self.rate_per_second)
+            bucket.updated_at = now
+            self._buckets.move_to_end(key)
+
+        if bucket.tokens >= tokens:
+            bucket.tokens -= tokens
+            self.allowed += 1
+            return 0.0
+        self.rejected += 1
+        return (tokens - bucket.tokens) / self.rate_per_second
+
+    def _evict(self, now: float) -> None:
+        while self._buckets:
+            key, oldest = next(iter(self._buckets.items()))
+            if len(self._buckets) <= self.max_buckets and now - oldest.updated_at < self.refill_seconds:
+                break
+            del self._buckets[key]
+            self.evictions += 1
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            "ratePerSecond": self.rate_per_second,
+            "burst": self.burst,
+            "buckets": len(self._buckets),
+            "allowed": self.allowed,
+            "rejected": self.rejected,
+            "evictions": self.evictions,
+        }